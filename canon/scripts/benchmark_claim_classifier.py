@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Claim Classifier Benchmark
+Measures sentence throughput of the single-scan ClaimClassifier against the
+per-pattern findall / substring scans it replaced, on a synthetic corpus, and
+checks that both classify every sentence identically.
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from claim_extractor import ClaimExtractor
+
+FILLER = [
+    "the", "scalar", "field", "couples", "to", "matter", "through", "a", "portal",
+    "with", "strength", "set", "by", "the", "mixing", "angle", "and", "range",
+    "of", "order", "microns", "in", "torsion", "balance", "experiments",
+]
+
+
+def legacy_classify(text: str) -> Tuple[str, float]:
+    """The previous classifier: one findall per pattern, one substring scan per keyword."""
+    text_lower = text.lower()
+    scores = {}
+    for claim_type, patterns in ClaimExtractor.CLAIM_PATTERNS.items():
+        scores[claim_type] = sum(len(re.findall(p, text_lower, re.IGNORECASE)) for p in patterns)
+    if max(scores.values()) == 0:
+        return 'Derived', 0.5
+    claim_type = ClaimExtractor.TYPE_MAPPING.get(max(scores, key=scores.get), 'Derived')
+    confidence = ClaimExtractor.BASE_CONFIDENCE.get(claim_type, 0.50)
+    for level, keywords in ClaimExtractor.CONFIDENCE_KEYWORDS.items():
+        if any(keyword in text_lower for keyword in keywords):
+            confidence += ClaimExtractor.CONFIDENCE_ADJUSTMENTS.get(level, 0)
+    return claim_type, max(0.0, min(1.0, confidence))
+
+
+def synthetic_sentences(n: int, seed: int = 0) -> List[str]:
+    """Sentences of filler words salted with claim and confidence keywords."""
+    rng = random.Random(seed)
+    keywords = [token.replace('\\s+', ' ')
+                for patterns in ClaimExtractor.CLAIM_PATTERNS.values()
+                for pattern in patterns
+                for token in pattern[3:-1].split('|')]
+    keywords += [k for ks in ClaimExtractor.CONFIDENCE_KEYWORDS.values() for k in ks]
+    sentences = []
+    for _ in range(n):
+        words = rng.choices(FILLER, k=rng.randint(12, 40))
+        for _ in range(rng.randint(0, 4)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(keywords))
+        sentences.append(" ".join(words).capitalize())
+    return sentences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark claim classification throughput")
+    parser.add_argument("--sentences", type=int, default=50000, help="Synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sentences = synthetic_sentences(args.sentences, args.seed)
+    extractor = ClaimExtractor()
+
+    start = time.perf_counter()
+    legacy = [legacy_classify(s) for s in sentences]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = [extractor._classify_claim(s) for s in sentences]
+    single_s = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy, single) if a != b)
+    print(f"Sentences:        {len(sentences)}")
+    print(f"Per-pattern scan: {len(sentences) / legacy_s:,.0f} sentences/s")
+    print(f"Single scan:      {len(sentences) / single_s:,.0f} sentences/s")
+    print(f"Speedup:          {legacy_s / single_s:.2f}x")
+    if mismatches:
+        print(f"✗ {mismatches} sentences classified differently")
+        sys.exit(1)
+    print("✓ Identical classifications")
+
+
+if __name__ == '__main__':
+    main()
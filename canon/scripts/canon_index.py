@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Canon Index for Zora Canon
+ID, section, type and claim/equation link indexes over the per-document claim
+and equation files, kept up to date by ingestion and persisted as
+canon/index.json next to them.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+INDEX_VERSION = 1
+INDEX_NAME = "index.json"
+
+
+def _add(index: Dict[str, Dict[str, None]], key: str, item_id: str):
+    # Dicts with None values are insertion-ordered sets with O(1) removal
+    index.setdefault(key, {})[item_id] = None
+
+
+def _discard(index: Dict[str, Dict[str, None]], key: str, item_id: str):
+    items = index.get(key)
+    if items is not None:
+        items.pop(item_id, None)
+        if not items:
+            del index[key]
+
+
+class CanonIndex:
+    """In-memory indexes over a canon directory (the one holding claims/ and equations/)."""
+
+    def __init__(self):
+        # claim_id -> {'doc_id', 'position', 'section', 'type'}
+        self.claims: Dict[str, Dict] = {}
+        # equation_id -> {'doc_id', 'position', 'section'}
+        self.equations: Dict[str, Dict] = {}
+        # doc_id -> {'claims': [...], 'equations': [...]}
+        self.documents: Dict[str, Dict[str, List[str]]] = {}
+        self.claims_by_section: Dict[str, Dict[str, None]] = {}
+        self.claims_by_type: Dict[str, Dict[str, None]] = {}
+        self.equations_by_section: Dict[str, Dict[str, None]] = {}
+        # Links in both directions
+        self.claims_by_equation: Dict[str, Dict[str, None]] = {}
+        self.equations_by_claim: Dict[str, Dict[str, None]] = {}
+
+    def add_document(self, doc_id: str, claims: Iterable[Dict], equations: Iterable[Dict]):
+        """
+        Index one document's claim and equation records (as written to its
+        claims/equations files), replacing any earlier version of it.
+        """
+        self.remove_document(doc_id)
+        doc = self.documents[doc_id] = {'claims': [], 'equations': []}
+        for position, claim in enumerate(claims):
+            claim_id = claim['claim_id']
+            self.claims[claim_id] = {'doc_id': doc_id, 'position': position,
+                                     'section': claim.get('source_section'),
+                                     'type': claim.get('claim_type')}
+            doc['claims'].append(claim_id)
+            _add(self.claims_by_section, claim.get('source_section'), claim_id)
+            _add(self.claims_by_type, claim.get('claim_type'), claim_id)
+        for position, equation in enumerate(equations):
+            equation_id = equation['equation_id']
+            self.equations[equation_id] = {'doc_id': doc_id, 'position': position,
+                                           'section': equation.get('section')}
+            doc['equations'].append(equation_id)
+            _add(self.equations_by_section, equation.get('section'), equation_id)
+            for claim_id in equation.get('related_claims') or []:
+                self.link(equation_id, claim_id)
+
+    def remove_document(self, doc_id: str):
+        """Drop a document's claims, equations and their links."""
+        doc = self.documents.pop(doc_id, None)
+        if doc is None:
+            return
+        for claim_id in doc['claims']:
+            # Older ingests could reuse a claim ID in another document, which
+            # then owns the entry; leave it (and its links) to that document
+            entry = self.claims.get(claim_id)
+            if entry is None or entry['doc_id'] != doc_id:
+                continue
+            del self.claims[claim_id]
+            _discard(self.claims_by_section, entry['section'], claim_id)
+            _discard(self.claims_by_type, entry['type'], claim_id)
+            for equation_id in list(self.equations_by_claim.get(claim_id, {})):
+                self.unlink(equation_id, claim_id)
+        for equation_id in doc['equations']:
+            entry = self.equations.get(equation_id)
+            if entry is None or entry['doc_id'] != doc_id:
+                continue
+            del self.equations[equation_id]
+            _discard(self.equations_by_section, entry['section'], equation_id)
+            for claim_id in list(self.claims_by_equation.get(equation_id, {})):
+                self.unlink(equation_id, claim_id)
+
+    def link(self, equation_id: str, claim_id: str) -> bool:
+        """Record an equation-claim link (returns False if it already existed)."""
+        if claim_id in self.claims_by_equation.get(equation_id, {}):
+            return False
+        _add(self.claims_by_equation, equation_id, claim_id)
+        _add(self.equations_by_claim, claim_id, equation_id)
+        return True
+
+    def clear_links(self):
+        self.claims_by_equation = {}
+        self.equations_by_claim = {}
+
+    def unlink(self, equation_id: str, claim_id: str):
+        _discard(self.claims_by_equation, equation_id, claim_id)
+        _discard(self.equations_by_claim, claim_id, equation_id)
+
+    def claim_ids_for_section(self, section: str) -> List[str]:
+        return list(self.claims_by_section.get(section, {}))
+
+    def claim_ids_by_type(self, claim_type: str) -> List[str]:
+        return list(self.claims_by_type.get(claim_type, {}))
+
+    def equation_ids_for_section(self, section: str) -> List[str]:
+        return list(self.equations_by_section.get(section, {}))
+
+    def claim_ids_for_equation(self, equation_id: str) -> List[str]:
+        return list(self.claims_by_equation.get(equation_id, {}))
+
+    def equation_ids_for_claim(self, claim_id: str) -> List[str]:
+        return list(self.equations_by_claim.get(claim_id, {}))
+
+    def to_dict(self) -> Dict:
+        def lists(index):
+            return {key: list(items) for key, items in index.items()}
+        return {
+            'version': INDEX_VERSION,
+            'documents': self.documents,
+            'claims': self.claims,
+            'equations': self.equations,
+            'claims_by_section': lists(self.claims_by_section),
+            'claims_by_type': lists(self.claims_by_type),
+            'equations_by_section': lists(self.equations_by_section),
+            'claims_by_equation': lists(self.claims_by_equation),
+            'equations_by_claim': lists(self.equations_by_claim)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CanonIndex':
+        def sets(index):
+            return {key: dict.fromkeys(items) for key, items in index.items()}
+        index = cls()
+        index.documents = data['documents']
+        index.claims = data['claims']
+        index.equations = data['equations']
+        for name in ('claims_by_section', 'claims_by_type', 'equations_by_section',
+                     'claims_by_equation', 'equations_by_claim'):
+            setattr(index, name, sets(data[name]))
+        return index
+
+    def save(self, canon_dir: Path) -> Path:
+        """Atomically write canon_dir/index.json."""
+        path = Path(canon_dir) / INDEX_NAME
+        tmp_path = path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, canon_dir: Path) -> Optional['CanonIndex']:
+        """The saved index, or None if missing or written by another index version."""
+        path = Path(canon_dir) / INDEX_NAME
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != INDEX_VERSION:
+            return None
+        return cls.from_dict(data)
+
+    @classmethod
+    def build(cls, canon_dir: Path) -> 'CanonIndex':
+        """Rebuild the index from the claims/ and equations/ files."""
+        canon_dir = Path(canon_dir)
+        index = cls()
+        doc_ids = sorted({p.name[:-len('_claims.json')] for p in (canon_dir / 'claims').glob('*_claims.json')}
+                         | {p.name[:-len('_equations.json')]
+                            for p in (canon_dir / 'equations').glob('*_equations.json')})
+        for doc_id in doc_ids:
+            claims, equations = load_document_records(canon_dir, doc_id)
+            index.add_document(doc_id, claims, equations)
+        return index
+
+    @classmethod
+    def open(cls, canon_dir: Path) -> 'CanonIndex':
+        """Load the saved index, rebuilding it from the canon files if needed."""
+        return cls.load(canon_dir) or cls.build(canon_dir)
+
+
+def load_document_records(canon_dir: Path, doc_id: str):
+    """(claims, equations) records of one document ([] for a missing file)."""
+    records = []
+    for kind in ('claims', 'equations'):
+        path = Path(canon_dir) / kind / f"{doc_id}_{kind}.json"
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                records.append(json.load(f).get(kind, []))
+        else:
+            records.append([])
+    return records[0], records[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the canon index")
+    parser.add_argument("--canon-dir", required=True, help="Directory holding claims/ and equations/")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild index.json from the canon files")
+    parser.add_argument("--claim", help="Show the equations linked to a claim_id")
+    parser.add_argument("--equation", help="Show the claims linked to an equation_id")
+    parser.add_argument("--section", help="List claims and equations of a section")
+
+    args = parser.parse_args()
+    canon_dir = Path(args.canon_dir)
+    index = CanonIndex.build(canon_dir) if args.rebuild else CanonIndex.open(canon_dir)
+
+    if args.claim:
+        print(json.dumps({'claim': index.claims.get(args.claim),
+                          'equations': index.equation_ids_for_claim(args.claim)}, indent=2))
+    elif args.equation:
+        print(json.dumps({'equation': index.equations.get(args.equation),
+                          'claims': index.claim_ids_for_equation(args.equation)}, indent=2))
+    elif args.section:
+        print(json.dumps({'claims': index.claim_ids_for_section(args.section),
+                          'equations': index.equation_ids_for_section(args.section)}, indent=2))
+    else:
+        print(f"{len(index.documents)} documents, {len(index.claims)} claims, "
+              f"{len(index.equations)} equations, "
+              f"{sum(len(c) for c in index.claims_by_equation.values())} links")
+
+    if args.rebuild:
+        print(f"✓ Index saved to: {index.save(canon_dir)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,18 @@ Main script for extracting, structuring, and versioning ToE documents.
 """
 
 import argparse
+import gzip
 import hashlib
 import json
 import os
 import re
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
 # Optional imports with fallbacks
 try:
@@ -38,6 +43,21 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from equation_parser import EquationParser
 from claim_extractor import ClaimExtractor
+from canon_index import CanonIndex
+from canon_link import link_canon
+
+
+# Bump when sectioning or the per-document outputs change
+INGEST_VERSION = "0.2"
+
+# Bump when normalize_text or per-page extraction changes (invalidates extracted/text)
+TEXT_CACHE_VERSION = "1"
+
+CONTENT_TYPES = {
+    '.pdf': "application/pdf",
+    '.docx': "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    '.txt': "text/plain",
+}
 
 
 def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
@@ -130,6 +150,134 @@ def extract_pdf_text(path: Path) -> Tuple[str, Optional[int]]:
     )
 
 
+def extraction_backend(path: Path) -> str:
+    """Name of the library that will extract a file's text."""
+    ext = path.suffix.lower()
+    if ext == ".pdf":
+        if PDF_AVAILABLE:
+            return "pymupdf"
+        if PYPDF_AVAILABLE:
+            return "pypdf"
+        raise RuntimeError(
+            "No PDF extractor available. Install one of: "
+            "pip install pymupdf  OR  pip install pypdf"
+        )
+    if ext == ".docx":
+        return "python-docx"
+    if ext == ".txt":
+        return "text"
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+def extract_pages(path: Path) -> Tuple[Dict, Iterator[str]]:
+    """
+    Open a document for page-by-page extraction.
+    
+    Returns:
+        (meta, pages): meta has pages (page count), content_type and backend;
+        pages yields the normalized text of each page. DOCX and TXT files have
+        no fixed pagination and come out as a single page.
+    """
+    backend = extraction_backend(path)
+    meta = {'content_type': CONTENT_TYPES[path.suffix.lower()], 'backend': backend}
+    
+    if backend == "pymupdf":
+        doc = fitz.open(path)
+        meta['pages'] = doc.page_count
+        
+        def pages():
+            try:
+                for i in range(doc.page_count):
+                    yield normalize_text(doc.load_page(i).get_text("text"))
+            finally:
+                doc.close()
+        return meta, pages()
+    
+    if backend == "pypdf":
+        reader = PdfReader(str(path))
+        meta['pages'] = len(reader.pages)
+        return meta, (normalize_text(page.extract_text() or "") for page in reader.pages)
+    
+    if backend == "python-docx":
+        text, meta['pages'] = extract_docx_text(path)
+        return meta, iter([text])
+    
+    meta['pages'] = None
+    return meta, iter([normalize_text(path.read_text(encoding="utf-8", errors="replace"))])
+
+
+class CachedText:
+    """Normalized per-page text in the extracted/text cache, read lazily."""
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._meta = None
+    
+    @property
+    def meta(self) -> Dict:
+        """Header record (pages, content_type, backend); only the first line is read."""
+        if self._meta is None:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                self._meta = json.loads(f.readline())
+        return self._meta
+    
+    def iter_pages(self) -> Iterator[str]:
+        """Yield page texts one at a time."""
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            f.readline()
+            for line in f:
+                yield json.loads(line)
+    
+    @property
+    def text(self) -> str:
+        """Whole-document text (non-empty pages separated by a blank line)."""
+        return "\n\n".join(page for page in self.iter_pages() if page)
+
+
+class TextCache:
+    """
+    Normalized text keyed by file SHA256 and extraction backend.
+    
+    Each entry is a gzip-compressed JSON-lines file: a header record followed
+    by one JSON string per page.
+    """
+    
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+    
+    def path_for(self, file_hash: str, backend: str) -> Path:
+        return self.cache_dir / f"{file_hash}.{backend}.v{TEXT_CACHE_VERSION}.jsonl.gz"
+    
+    def get(self, file_hash: str, backend: str) -> Optional[CachedText]:
+        path = self.path_for(file_hash, backend)
+        return CachedText(path) if path.exists() else None
+    
+    def put(self, file_hash: str, meta: Dict, pages: Iterable[str]) -> CachedText:
+        """Write pages as they are produced (the document is never held whole)."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(file_hash, meta['backend'])
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            for page in pages:
+                f.write(json.dumps(page, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+        return CachedText(path)
+    
+    def get_or_extract(self, file_path: Path, file_hash: str) -> Tuple[CachedText, bool]:
+        """
+        Cached text for a file, extracting it on a miss.
+        
+        Returns:
+            (CachedText, whether it was already cached)
+        """
+        cached = self.get(file_hash, extraction_backend(file_path))
+        if cached is not None:
+            return cached, True
+        meta, pages = extract_pages(file_path)
+        return self.put(file_hash, meta, pages), False
+
+
 def extract_text(path: Path) -> Tuple[str, Optional[int], str]:
     """Extract text from file, detecting format."""
     ext = path.suffix.lower()
@@ -150,70 +298,271 @@ def extract_text(path: Path) -> Tuple[str, Optional[int], str]:
     return text, pages, content_type
 
 
+# Section headers (various formats)
+# Numbered: "1. Introduction", "1.1 Background"
+# Unnumbered: "Introduction", "## Background"
+HEADER_PATTERNS = [re.compile(p) for p in [
+    r'^(#{1,6})\s+(.+)$',  # Markdown headers
+    r'^(\d+(?:\.\d+)*)\s+(.+)$',  # Numbered sections
+    r'^([A-Z][A-Z\s]+)$',  # ALL CAPS headers
+]]
+
+
+def _header_title(line: str) -> Optional[str]:
+    for pattern in HEADER_PATTERNS:
+        match = pattern.match(line.strip())
+        if match:
+            return match.group(match.lastindex).strip()  # Last group is title
+    return None
+
+
+def iter_sections(pages: Iterable[str]) -> Iterator[Dict]:
+    """
+    Detect sections in a stream of page texts.
+    
+    Pages are consumed one at a time and each section is yielded as soon as the
+    next header closes it, so only the current section is held in memory.
+    Line numbers run over the whole document (pages joined by a blank line,
+    blank pages skipped). Besides title/text/start_line/end_line, each section
+    carries start_page/end_page (1-based) and page_starts: (character offset
+    into the section text, page number) pairs, in increasing offset order.
+    """
+    line_no = 0
+    section = None
+    
+    def start_section(title, page_number):
+        return {'title': title, 'lines': [], 'length': 0, 'start_line': line_no,
+                'start_page': page_number, 'page_starts': [(0, page_number)]}
+    
+    def finish(section, end_line):
+        text = "\n".join(section['lines'])
+        if not text.strip():
+            return None
+        return {
+            'title': section['title'],
+            'text': text + "\n",
+            'start_line': section['start_line'],
+            'end_line': end_line,
+            'start_page': section['start_page'],
+            'end_page': section['page_starts'][-1][1],
+            'page_starts': section['page_starts']
+        }
+    
+    first_page = True
+    for page_number, page_text in enumerate(pages, start=1):
+        if not page_text:
+            continue
+        if section is None:
+            section = start_section('Introduction', page_number)
+        lines = page_text.split('\n')
+        if not first_page:
+            # The blank line that separates pages
+            lines.insert(0, '')
+        first_page = False
+        
+        if section['lines'] and section['page_starts'][-1][1] != page_number:
+            section['page_starts'].append((section['length'], page_number))
+        elif not section['lines']:
+            section['page_starts'] = [(0, page_number)]
+            section['start_page'] = page_number
+        
+        for line in lines:
+            title = _header_title(line)
+            if title is not None:
+                done = finish(section, line_no)
+                if done:
+                    yield done
+                section = start_section(title, page_number)
+            else:
+                section['lines'].append(line)
+                section['length'] += len(line) + 1
+            line_no += 1
+    
+    if section is not None:
+        done = finish(section, line_no)
+        if done:
+            yield done
+
+
 def parse_sections(text: str) -> list:
     """Parse document into sections based on headers."""
-    sections = []
-    
-    # Pattern for section headers (various formats)
-    # Numbered: "1. Introduction", "1.1 Background"
-    # Unnumbered: "Introduction", "## Background"
-    header_patterns = [
-        r'^(#{1,6})\s+(.+)$',  # Markdown headers
-        r'^(\d+(?:\.\d+)*)\s+(.+)$',  # Numbered sections
-        r'^([A-Z][A-Z\s]+)$',  # ALL CAPS headers
-    ]
-    
-    lines = text.split('\n')
-    current_section = {
-        'title': 'Introduction',
-        'text': '',
-        'start_line': 0
+    return list(iter_sections([text]))
+
+
+class JsonArrayStream:
+    """
+    Write a JSON array one element at a time, optionally as the last key of an
+    object. The file is written to a temporary path and moved into place on
+    success, so a failed document leaves no partial output.
+    """
+    
+    def __init__(self, path: Path, head: Optional[Dict] = None, key: Optional[str] = None):
+        self.path = Path(path)
+        self.head = head
+        self.key = key
+        self.count = 0
+        self._tmp = self.path.with_name(self.path.name + ".tmp")
+        self._f = None
+    
+    def __enter__(self):
+        self._f = open(self._tmp, 'w', encoding='utf-8')
+        if self.head is not None:
+            head = json.dumps(self.head, indent=2, ensure_ascii=False)
+            self._f.write(head[:-1].rstrip() + f',\n  {json.dumps(self.key)}: [')
+        else:
+            self._f.write('[')
+        return self
+    
+    def write(self, item):
+        self._f.write((',' if self.count else '') + '\n' + json.dumps(item, ensure_ascii=False))
+        self.count += 1
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._f.write('\n]' + ('\n}' if self.head is not None else '') + '\n')
+        self._f.close()
+        if exc_type is None:
+            os.replace(self._tmp, self.path)
+        else:
+            self._tmp.unlink()
+        return False
+
+
+DOCUMENT_SUFFIXES = {'.pdf', '.docx', '.txt'}
+
+
+def extractor_version() -> str:
+    """
+    Version of the extraction pipeline recorded per document.
+    
+    Combines the explicit versions with a fingerprint of the claim and equation
+    pattern tables, so editing a pattern marks every document as stale.
+    """
+    payload = {
+        'ingest': INGEST_VERSION,
+        'claims': [ClaimExtractor.VERSION, ClaimExtractor.CLAIM_PATTERNS,
+                   ClaimExtractor.CONFIDENCE_KEYWORDS, ClaimExtractor.BASE_CONFIDENCE,
+                   ClaimExtractor.CONFIDENCE_ADJUSTMENTS],
+        'equations': [EquationParser.VERSION, EquationParser.MATH_DELIMITERS,
+                      EquationParser.BARE_PATTERNS]
     }
+    fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"{INGEST_VERSION}+{fingerprint[:12]}"
+
+
+def schema_version(schema_path: Optional[Path]) -> Optional[str]:
+    """Content hash of the claim schema (None when running without one)."""
+    if schema_path is None or not schema_path.exists():
+        return None
+    return sha256_file(schema_path)[:12]
+
+
+def remove_document_outputs(output_dir: Path, doc_id: str):
+    """Delete the extracted/canon files of a document that has been superseded."""
+    for path in [output_dir / "extracted" / f"{doc_id}.json",
+                 output_dir / "canon" / "claims" / f"{doc_id}_claims.json",
+                 output_dir / "canon" / "equations" / f"{doc_id}_equations.json",
+                 output_dir / "canon" / "sections" / f"{doc_id}_sections.json"]:
+        if path.exists():
+            path.unlink()
+
+
+def discover_documents(input_path: Path) -> List[Path]:
+    """Documents under input_path (or input_path itself), in stable path order."""
+    if input_path.is_file():
+        return [input_path]
+    return sorted(f for f in input_path.rglob("*")
+                  if f.is_file() and f.suffix.lower() in DOCUMENT_SUFFIXES)
+
+
+def hash_and_extract(file_path: Path, known_hashes: FrozenSet[str] = frozenset(),
+                     text_cache_dir: Optional[Path] = None) -> Dict:
+    """
+    Hash a document and extract its text (the expensive, parallelizable step).
     
-    for i, line in enumerate(lines):
-        is_header = False
-        
-        for pattern in header_patterns:
-            match = re.match(pattern, line.strip())
-            if match:
-                # Save previous section
-                if current_section['text'].strip():
-                    current_section['end_line'] = i
-                    sections.append(current_section)
-                
-                # Start new section
-                title = match.group(-1).strip()  # Last group is title
-                current_section = {
-                    'title': title,
-                    'text': '',
-                    'start_line': i
-                }
-                is_header = True
-                break
-        
-        if not is_header:
-            current_section['text'] += line + '\n'
+    Documents whose hash is in known_hashes are not extracted. With a
+    text_cache_dir the normalized text goes through the TextCache and only the
+    cache path is returned (callers load it lazily); otherwise the text is
+    returned inline.
+    
+    Returns:
+        Dict with path and sha256, plus text_cache (or page_texts/pages/content_type),
+        'skipped' or 'error'
+    """
+    result = {'path': str(file_path), 'sha256': sha256_file(file_path)}
+    if result['sha256'] in known_hashes:
+        result['skipped'] = True
+        return result
+    try:
+        if text_cache_dir:
+            cached, result['text_cached'] = TextCache(text_cache_dir).get_or_extract(
+                file_path, result['sha256'])
+            result['text_cache'] = str(cached.path)
+        else:
+            meta, pages = extract_pages(file_path)
+            result['page_texts'] = list(pages)
+            result['pages'], result['content_type'] = meta['pages'], meta['content_type']
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _hash_and_extract_job(args: Tuple[str, FrozenSet[str], Optional[str]]) -> Dict:
+    path, known_hashes, text_cache_dir = args
+    return hash_and_extract(Path(path), known_hashes,
+                            Path(text_cache_dir) if text_cache_dir else None)
+
+
+def iter_extracted(files: List[Path], known_hashes: FrozenSet[str] = frozenset(),
+                   workers: int = 1, text_cache_dir: Optional[Path] = None) -> Iterator[Dict]:
+    """
+    Yield hash_and_extract results in input order.
     
-    # Add final section
-    if current_section['text'].strip():
-        current_section['end_line'] = len(lines)
-        sections.append(current_section)
+    With workers > 1 documents are extracted in a process pool; at most
+    2 * workers results are in flight, so memory stays bounded by the pool
+    rather than the corpus.
+    """
+    cache_arg = str(text_cache_dir) if text_cache_dir else None
+    jobs = [(str(f), known_hashes, cache_arg) for f in files]
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _hash_and_extract_job(job)
+        return
     
-    return sections
+    jobs_iter = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_hash_and_extract_job, job)
+                        for job in islice(jobs_iter, 2 * workers))
+        while pending:
+            result = pending.popleft().result()
+            for job in islice(jobs_iter, 1):
+                pending.append(pool.submit(_hash_and_extract_job, job))
+            yield result
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Ingest documents into Zora Canon")
-    parser.add_argument("--input", required=True, help="Input file or directory")
-    parser.add_argument("--output-dir", required=True, help="Output directory for canon")
-    parser.add_argument("--schema", help="Path to claim schema YAML")
-    parser.add_argument("--skip-existing", action="store_true", 
-                       help="Skip files that already exist in manifest")
+def ingest_corpus(input_path: Path, output_dir: Path, schema_path: Optional[Path] = None,
+                  skip_existing: bool = False, workers: int = 1, force: bool = False,
+                  link: bool = True) -> Dict:
+    """
+    Ingest a file or directory into the canon under output_dir.
     
-    args = parser.parse_args()
+    Ingestion is incremental: a document is reprocessed only if its content,
+    the extractor version or the claim schema changed since it was ingested
+    (or always, with force; never, with skip_existing, once its hash is known).
+    Reprocessed documents replace their manifest entry. Normalized text is
+    cached per page under extracted/text, so pattern changes don't re-parse
+    documents.
+    
+    Documents are merged into the manifest in sorted path order whatever the
+    number of workers, so the output does not depend on scheduling. When any
+    document changed (and link is set), claims and equations are then
+    re-linked across the whole canon (see canon_link.link_canon).
     
-    input_path = Path(args.input).expanduser().resolve()
-    output_dir = Path(args.output_dir).expanduser().resolve()
+    Returns:
+        Dict with the saved manifest and the number of processed documents
+    """
+    input_path = Path(input_path).expanduser().resolve()
+    output_dir = Path(output_dir).expanduser().resolve()
     output_dir.mkdir(parents=True, exist_ok=True)
     
     # Setup subdirectories
@@ -231,97 +580,131 @@ def main():
     if manifest_path.exists():
         with open(manifest_path, 'r') as f:
             manifest = json.load(f)
-        existing_hashes = {doc['sha256'] for doc in manifest.get('documents', [])}
     else:
         manifest = {
             'version': '0.1',
             'created_at': datetime.now(timezone.utc).isoformat(),
             'documents': []
         }
-        existing_hashes = set()
     
-    # Initialize extractors
-    schema_path = Path(args.schema) if args.schema else output_dir.parent / "claim_schema.yaml"
+    # Initialize extractors. They are reset per document so each document's
+    # claims/equations files hold only its own records; the ID counters continue
+    # from the manifest so IDs stay unique across documents and runs.
+    schema_path = Path(schema_path) if schema_path else output_dir.parent / "claim_schema.yaml"
     claim_extractor = ClaimExtractor(schema_path if schema_path.exists() else None)
     equation_parser = EquationParser()
+    id_counters = manifest.get('id_counters', {})
+    claim_extractor.claim_counter = id_counters.get('claims', 0)
+    equation_parser.equation_counter = id_counters.get('equations', 0)
     
-    # Process input files
-    if input_path.is_file():
-        files_to_process = [input_path]
+    versions = {
+        'extractor_version': extractor_version(),
+        'schema_version': schema_version(schema_path)
+    }
+    
+    # Documents that need no work: same content, same extractor and schema.
+    # (Manifests written before ingestion was incremental may repeat a doc_id;
+    # keep the latest entry.)
+    documents = list({doc['doc_id']: doc for doc in manifest['documents']}.values())
+    manifest['documents'] = documents
+    if force:
+        known_hashes = frozenset()
+    elif skip_existing:
+        known_hashes = frozenset(doc['sha256'] for doc in documents)
     else:
-        files_to_process = list(input_path.rglob("*"))
-        files_to_process = [f for f in files_to_process 
-                           if f.is_file() and f.suffix.lower() in {'.pdf', '.docx', '.txt'}]
+        known_hashes = frozenset(
+            doc['sha256'] for doc in documents
+            if all(doc.get(key) == value for key, value in versions.items())
+        )
+    
+    # ID/section/link indexes over the canon files, updated per document
+    canon_index = CanonIndex.open(canon_dir)
+    
+    # Manifest positions by doc_id and by relpath, for in-place replacement
+    position_by_doc_id = {doc['doc_id']: i for i, doc in enumerate(documents)}
+    position_by_relpath = {doc.get('relpath'): i for i, doc in enumerate(documents)}
+    
+    # Process input files
+    files_to_process = discover_documents(input_path)
     
     processed_count = 0
     
-    for file_path in files_to_process:
+    for extracted in iter_extracted(files_to_process, known_hashes, workers,
+                                    text_cache_dir=extracted_dir / "text"):
+        file_path = Path(extracted['path'])
+        file_hash = extracted['sha256']
         print(f"Processing: {file_path.name}")
         
-        # Compute hash
-        file_hash = sha256_file(file_path)
-        
         # Skip if already processed
-        if args.skip_existing and file_hash in existing_hashes:
-            print(f"  Skipping (already in manifest)")
+        if extracted.get('skipped'):
+            print(f"  Skipping (up to date in manifest)")
             continue
         
+        claim_extractor.reset()
+        equation_parser.reset()
+        
         try:
-            # Extract text
-            text, pages, content_type = extract_text(file_path)
+            if 'error' in extracted:
+                raise RuntimeError(extracted['error'])
+            if 'text_cache' in extracted:
+                cached = CachedText(extracted['text_cache'])
+                page_texts, pages, content_type = cached.iter_pages(), cached.meta['pages'], cached.meta['content_type']
+            else:
+                page_texts, pages, content_type = extracted['page_texts'], extracted['pages'], extracted['content_type']
+            # Only PDF pages are real pages; DOCX/TXT come out as one "page"
+            paginated = content_type == CONTENT_TYPES['.pdf']
             
             # Copy to sources
             sources_file = sources_dir / file_path.name
             if not sources_file.exists():
-                import shutil
                 shutil.copy2(file_path, sources_file)
             
-            # Parse sections
-            sections = parse_sections(text)
-            
-            # Process each section
             doc_id = file_hash[:16]
             doc_claims = []
             doc_equations = []
-            
-            for section in sections:
-                section_title = section['title']
-                section_text = section['text']
-                
-                # Extract equations
-                eqs = equation_parser.extract_equations(
-                    section_text, section_title, pages
-                )
-                doc_equations.extend(eqs)
-                
-                # Extract claims
-                claims = claim_extractor.extract_claims(
-                    section_text, section_title, file_path.name, pages
-                )
-                doc_claims.extend(claims)
-            
-            # Save extracted data
-            extracted_data = {
+            header = {
                 'doc_id': doc_id,
                 'filename': file_path.name,
                 'sha256': file_hash,
                 'pages': pages,
                 'content_type': content_type,
-                'sections': [
-                    {
-                        'title': s['title'],
-                        'text': s['text'],
-                        'start_line': s['start_line'],
-                        'end_line': s.get('end_line', s['start_line'])
-                    }
-                    for s in sections
-                ],
                 'extracted_at': datetime.now(timezone.utc).isoformat()
             }
             
+            # Stream pages through section detection and extraction; each section
+            # is written out as soon as it is complete
             extracted_file = extracted_dir / f"{doc_id}.json"
-            with open(extracted_file, 'w', encoding='utf-8') as f:
-                json.dump(extracted_data, f, indent=2, ensure_ascii=False)
+            sections_file = canon_dir / "sections" / f"{doc_id}_sections.json"
+            with JsonArrayStream(extracted_file, head=header, key='sections') as extracted_out, \
+                    JsonArrayStream(sections_file) as sections_out:
+                for section in iter_sections(page_texts):
+                    section_title = section['title']
+                    section_text = section['text']
+                    page_starts = section['page_starts'] if paginated else None
+                    
+                    # Extract equations
+                    eqs = equation_parser.extract_equations(
+                        section_text, section_title, page_starts=page_starts
+                    )
+                    doc_equations.extend(eqs)
+                    
+                    # Extract claims
+                    claims = claim_extractor.extract_claims(
+                        section_text, section_title, file_path.name, page_starts=page_starts
+                    )
+                    doc_claims.extend(claims)
+                    
+                    record = {
+                        'title': section_title,
+                        'text': section_text,
+                        'start_line': section['start_line'],
+                        'end_line': section['end_line'],
+                        'start_page': section['start_page'] if paginated else None,
+                        'end_page': section['end_page'] if paginated else None
+                    }
+                    extracted_out.write(record)
+                    sections_out.write(record)
+            sections_count = sections_out.count
             
             # Save claims
             claims_file = canon_dir / "claims" / f"{doc_id}_claims.json"
@@ -331,16 +714,15 @@ def main():
             equations_file = canon_dir / "equations" / f"{doc_id}_equations.json"
             equation_parser.export_json(equations_file)
             
-            # Save sections
-            sections_file = canon_dir / "sections" / f"{doc_id}_sections.json"
-            with open(sections_file, 'w', encoding='utf-8') as f:
-                json.dump(extracted_data['sections'], f, indent=2, ensure_ascii=False)
+            canon_index.add_document(doc_id, map(vars, claim_extractor.claims),
+                                     map(vars, equation_parser.equations))
             
             # Update manifest
+            relpath = str(file_path.relative_to(input_path.parent)) if input_path.is_dir() else file_path.name
             doc_meta = {
                 'doc_id': doc_id,
                 'filename': file_path.name,
-                'relpath': str(file_path.relative_to(input_path.parent)) if input_path.is_dir() else file_path.name,
+                'relpath': relpath,
                 'sha256': file_hash,
                 'bytes': file_path.stat().st_size,
                 'mtime_utc': datetime.fromtimestamp(file_path.stat().st_mtime, tz=timezone.utc).isoformat(),
@@ -348,27 +730,85 @@ def main():
                 'content_type': content_type,
                 'claims_count': len(doc_claims),
                 'equations_count': len(doc_equations),
-                'sections_count': len(sections)
+                'sections_count': sections_count,
+                **versions
             }
             
-            manifest['documents'].append(doc_meta)
+            # Replace the entry for the same content, or for an older version of
+            # the same file; otherwise append
+            position = position_by_doc_id.get(doc_id, position_by_relpath.get(relpath))
+            if position is None:
+                position = len(documents)
+                documents.append(doc_meta)
+            else:
+                old_doc_id = documents[position]['doc_id']
+                documents[position] = doc_meta
+                if old_doc_id != doc_id:
+                    del position_by_doc_id[old_doc_id]
+                    remove_document_outputs(output_dir, old_doc_id)
+                    canon_index.remove_document(old_doc_id)
+            position_by_doc_id[doc_id] = position
+            position_by_relpath[relpath] = position
             processed_count += 1
             
-            print(f"  ✓ Extracted {len(sections)} sections, {len(doc_claims)} claims, {len(doc_equations)} equations")
+            print(f"  ✓ Extracted {sections_count} sections, {len(doc_claims)} claims, {len(doc_equations)} equations")
         
         except Exception as e:
             print(f"  ✗ Error processing {file_path.name}: {e}")
             continue
     
+    claim_extractor.reset()
+    equation_parser.reset()
+    
     # Save updated manifest
+    manifest['id_counters'] = {
+        'claims': claim_extractor.claim_counter,
+        'equations': equation_parser.equation_counter
+    }
     manifest['updated_at'] = datetime.now(timezone.utc).isoformat()
     manifest['total_documents'] = len(manifest['documents'])
     
     with open(manifest_path, 'w', encoding='utf-8') as f:
         json.dump(manifest, f, indent=2, ensure_ascii=False)
     
-    print(f"\n✓ Processed {processed_count} documents")
-    print(f"✓ Manifest saved to: {manifest_path}")
+    canon_index.save(canon_dir)
+    
+    links = None
+    if link and processed_count:
+        links = link_canon(canon_dir)
+        print(f"✓ Linked claims to equations: {links['links']} links")
+    
+    return {'manifest': manifest, 'manifest_path': manifest_path, 'processed': processed_count,
+            'links': links}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest documents into Zora Canon")
+    parser.add_argument("--input", required=True, help="Input file or directory")
+    parser.add_argument("--output-dir", required=True, help="Output directory for canon")
+    parser.add_argument("--schema", help="Path to claim schema YAML")
+    parser.add_argument("--skip-existing", action="store_true", 
+                       help="Skip files that already exist in manifest")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Processes used to hash and extract documents in parallel")
+    parser.add_argument("--force", action="store_true",
+                       help="Reprocess every document even if it is up to date")
+    parser.add_argument("--no-link", action="store_true",
+                       help="Skip the claim-equation linking pass")
+    
+    args = parser.parse_args()
+    
+    result = ingest_corpus(
+        Path(args.input), Path(args.output_dir),
+        schema_path=Path(args.schema) if args.schema else None,
+        skip_existing=args.skip_existing,
+        workers=args.workers,
+        force=args.force,
+        link=not args.no_link
+    )
+    
+    print(f"\n✓ Processed {result['processed']} documents")
+    print(f"✓ Manifest saved to: {result['manifest_path']}")
 
 
 if __name__ == '__main__':
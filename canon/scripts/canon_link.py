@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Claim-Equation Linker for Zora Canon
+Post-ingestion stage that links claims to the equations whose symbols they
+mention, through a hash index of the LaTeX symbols each equation defines
+(\\theta_{hc} -> theta_hc, m_c, \\kappa_{cH} -> kappa_cH, ...).
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterator, List, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from canon_index import CanonIndex
+
+# Symbols shared by more equations than this are too generic to link on
+DEFAULT_MAX_EQUATIONS_PER_SYMBOL = 50
+
+GREEK_NAMES = {
+    'alpha', 'beta', 'gamma', 'delta', 'epsilon', 'varepsilon', 'zeta', 'eta', 'theta',
+    'vartheta', 'iota', 'kappa', 'lambda', 'mu', 'nu', 'xi', 'pi', 'rho', 'sigma',
+    'tau', 'upsilon', 'phi', 'varphi', 'chi', 'psi', 'omega',
+}
+
+# Unicode Greek letters -> LaTeX commands (Φ -> \Phi, θ -> \theta)
+GREEK_LETTERS = {}
+for _code in range(0x391, 0x3CA):
+    _name = unicodedata.name(chr(_code), '')
+    if _name.startswith('GREEK ') and 'LETTER' in _name:
+        _letter = _name.split()[-1].lower()
+        if _letter == 'lamda':
+            _letter = 'lambda'
+        GREEK_LETTERS[chr(_code)] = _letter.capitalize() if 'CAPITAL' in _name else _letter
+GREEK_LETTERS.update({'ϕ': 'phi', 'ϑ': 'theta', 'ϵ': 'epsilon'})
+_GREEK_CHARS = re.compile('[' + ''.join(GREEK_LETTERS) + ']')
+
+# A LaTeX or plain-text symbol: optional backslash, a name, an optional subscript
+SYMBOL = re.compile(
+    r'(\\?)(?<![A-Za-z0-9])([A-Za-z]+)'
+    r'(?:_(?:\{((?:[^{}]|\{[^{}]*\})*)\}|([A-Za-z0-9]+)))?'
+)
+
+
+def _normalize_greek(text: str) -> str:
+    return _GREEK_CHARS.sub(lambda m: '\\' + GREEK_LETTERS[m.group()], text)
+
+
+def iter_symbols(text: str) -> Iterator[str]:
+    """
+    Normalized symbols in LaTeX or prose.
+
+    Kept: Greek letters (\\lambda, λ) and subscripted names (m_c, θ_hc,
+    theta_hc, \\kappa_{cH}, L_{\\Phi_c}). Plain words, Greek names written as
+    prose ('beta decay', 'the lambda parameter') and other LaTeX commands are
+    not symbols. Subscripts drop braces and backslashes, so \\theta_{hc} and
+    θ_hc both give 'theta_hc'.
+    """
+    for match in SYMBOL.finditer(_normalize_greek(text)):
+        backslash, name, braced, bare = match.groups()
+        subscript = braced if braced is not None else bare
+        greek = name.lower() in GREEK_NAMES
+        if subscript:
+            if backslash and not greek:
+                continue  # \frac_{...} and friends
+            if not greek and len(name) > 3:
+                continue  # prose identifiers like some_word
+            subscript = re.sub(r'[\\{}\s]', '', subscript)
+            if subscript:
+                yield f"{name}_{subscript}"
+        elif greek and backslash:
+            yield name
+
+
+def equation_symbols(formula: str) -> Set[str]:
+    """Symbols an equation defines or constrains (every symbol in the formula)."""
+    return set(iter_symbols(formula))
+
+
+def _read(path: Path) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write(path: Path, data: Dict):
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def build_symbol_index(canon_dir: Path) -> Tuple[Dict[str, List[str]], Set[str]]:
+    """
+    One pass over equations/: symbol -> equation_ids, and every equation_id.
+    """
+    index: Dict[str, List[str]] = {}
+    equation_ids = set()
+    for path in sorted((Path(canon_dir) / 'equations').glob('*_equations.json')):
+        for equation in _read(path).get('equations', []):
+            equation_ids.add(equation['equation_id'])
+            for symbol in equation_symbols(equation['latex_formula']):
+                index.setdefault(symbol, []).append(equation['equation_id'])
+    return index, equation_ids
+
+
+def link_canon(canon_dir: Path,
+               max_equations_per_symbol: int = DEFAULT_MAX_EQUATIONS_PER_SYMBOL) -> Dict:
+    """
+    Link every claim to the equations defining symbols it mentions.
+
+    Claims are tokenized once and looked up in the symbol index, so the cost
+    is linear in corpus size plus links. Linking is recomputed from scratch:
+    claims' linked_equations are replaced by the symbol links, while their
+    equation_refs (textual references such as EQ_5_1 from "equation (5.1)")
+    are left as extracted. Equations' related_claims are replaced by the
+    claims referring to them either way. The canon index is updated to match.
+
+    Returns:
+        Dict with symbol, claim, equation and link counts
+    """
+    canon_dir = Path(canon_dir)
+    symbol_index, equation_ids = build_symbol_index(canon_dir)
+    symbol_index = {symbol: ids for symbol, ids in symbol_index.items()
+                    if len(ids) <= max_equations_per_symbol}
+
+    claims_by_equation: Dict[str, List[str]] = {}
+    claim_count = 0
+    for path in sorted((canon_dir / 'claims').glob('*_claims.json')):
+        data = _read(path)
+        changed = False
+        for claim in data.get('claims', []):
+            claim_count += 1
+            linked = []
+            for symbol in dict.fromkeys(iter_symbols(claim['statement'])):
+                linked.extend(symbol_index.get(symbol, ()))
+            linked = list(dict.fromkeys(linked))
+            refs = [ref for ref in claim.get('equation_refs') or [] if ref in equation_ids]
+            for equation_id in dict.fromkeys(refs + linked):
+                claims_by_equation.setdefault(equation_id, []).append(claim['claim_id'])
+            if linked != claim.get('linked_equations'):
+                claim['linked_equations'] = linked
+                changed = True
+        if changed:
+            _write(path, data)
+
+    for path in sorted((canon_dir / 'equations').glob('*_equations.json')):
+        data = _read(path)
+        changed = False
+        for equation in data.get('equations', []):
+            related = claims_by_equation.get(equation['equation_id'], [])
+            if related != equation.get('related_claims'):
+                equation['related_claims'] = related
+                changed = True
+        if changed:
+            _write(path, data)
+
+    canon_index = CanonIndex.open(canon_dir)
+    canon_index.clear_links()
+    for equation_id, claim_ids in claims_by_equation.items():
+        for claim_id in claim_ids:
+            canon_index.link(equation_id, claim_id)
+    canon_index.save(canon_dir)
+
+    return {
+        'symbols': len(symbol_index),
+        'claims': claim_count,
+        'equations': len(equation_ids),
+        'links': sum(len(c) for c in claims_by_equation.values())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link canon claims to equations by symbol")
+    parser.add_argument("--canon-dir", required=True, help="Directory holding claims/ and equations/")
+    parser.add_argument("--max-equations-per-symbol", type=int, default=DEFAULT_MAX_EQUATIONS_PER_SYMBOL,
+                        help="Ignore symbols defined by more equations than this")
+    args = parser.parse_args()
+
+    stats = link_canon(Path(args.canon_dir), args.max_equations_per_symbol)
+    print(f"✓ Linked {stats['claims']} claims and {stats['equations']} equations "
+          f"through {stats['symbols']} symbols: {stats['links']} links")
+
+
+if __name__ == '__main__':
+    main()
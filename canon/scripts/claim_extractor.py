@@ -6,11 +6,118 @@ Identifies and classifies claims from extracted text using NLP patterns.
 
 import re
 import json
+import sys
 import yaml
-from typing import List, Dict, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from dataclasses import dataclass, asdict, field
 from pathlib import Path
 
+# Sibling modules (also when imported as canon.scripts.*)
+sys.path.insert(0, str(Path(__file__).parent))
+
+from text_index import LineIndex, iter_sentence_spans, page_at
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """'(?:a|b\\s+c)' -> ['a', 'b\\s+c']"""
+    body = pattern[3:-1] if pattern.startswith('(?:') and pattern.endswith(')') else pattern
+    return body.split('|')
+
+
+def _literal(token: str) -> str:
+    """The phrase a token regex stands for ('b\\s+c' -> 'b c')."""
+    literal = re.sub(r'\\(.)', r'\1', re.sub(r'\\s[+*]', ' ', token)).lower()
+    if not re.fullmatch(token, literal, re.IGNORECASE):
+        raise ValueError(f"Claim pattern alternative is not a literal phrase: {token!r}")
+    return literal
+
+
+def _trie_regex(phrases: Iterable[str]) -> str:
+    """
+    One regex matching any of the phrases, factored as a prefix trie so each
+    position is checked character by character instead of phrase by phrase.
+    Longer phrases win over their prefixes; spaces match any whitespace run.
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+    
+    def build(node: Dict) -> str:
+        branches = [(r'\s+' if ch == ' ' else re.escape(ch)) + build(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A phrase ends here; prefer the longer continuation
+            return '(?:' + body + ')?'
+        return body
+    
+    return build(trie)
+
+
+class ClaimClassifier:
+    """
+    Finds claim-type patterns and confidence keywords in a single regex scan.
+    
+    Every alternative of every claim pattern and every confidence keyword is
+    compiled into one trie-shaped regex over the lowercased sentence. The scan
+    resumes one character after each match start, so it stops at every
+    position where some phrase begins, including phrases overlapping or glued
+    to another ('empirically confirmed' / 'confirmed', 'hypothesisuggests').
+    Patterns are counted from those positions the way their own findall
+    would, so scores and keyword levels equal those of the per-pattern scans.
+    """
+    
+    def __init__(self, claim_patterns: Dict[str, List[str]],
+                 confidence_keywords: Dict[str, List[str]]):
+        self.claim_types = list(claim_patterns)
+        self.confidence_levels = list(confidence_keywords)
+        
+        phrases = {_literal(token) for patterns in claim_patterns.values()
+                   for pattern in patterns for token in _split_alternatives(pattern)}
+        phrases.update(keyword.lower() for keywords in confidence_keywords.values()
+                       for keyword in keywords)
+        self._regex = re.compile(_trie_regex(phrases))
+        
+        # Longest phrase at a position -> ([(claim type, pattern) matching there], {confidence levels})
+        compiled = [(claim_type, re.compile(p, re.IGNORECASE))
+                    for claim_type, patterns in claim_patterns.items() for p in patterns]
+        self._credits: Dict[str, Tuple[List[Tuple[str, re.Pattern]], set]] = {}
+        for phrase in phrases:
+            starting = [(claim_type, p) for claim_type, p in compiled if p.match(phrase)]
+            levels = {level for level, keywords in confidence_keywords.items()
+                      if any(keyword in phrase for keyword in keywords)}
+            self._credits[phrase] = (starting, levels)
+    
+    def scan(self, text: str) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Returns:
+            (match count per claim type, confidence levels whose keywords occur)
+        """
+        text_lower = text.lower()
+        scores = dict.fromkeys(self.claim_types, 0)
+        levels = set()
+        resume_at = {}  # pattern -> end of its last counted match (findall does not overlap)
+        search = self._regex.search
+        match = search(text_lower)
+        while match is not None:
+            start, phrase = match.start(), match.group()
+            credits = self._credits.get(phrase)
+            if credits is None:
+                # Phrase matched across a line break or repeated spaces
+                credits = self._credits[' '.join(phrase.split())]
+            for claim_type, pattern in credits[0]:
+                if start >= resume_at.get(pattern, 0):
+                    scores[claim_type] += 1
+                    resume_at[pattern] = pattern.match(text_lower, start).end()
+            levels |= credits[1]
+            match = search(text_lower, start + 1)
+        return scores, [level for level in self.confidence_levels if level in levels]
+
 
 @dataclass
 class Claim:
@@ -34,6 +141,9 @@ class Claim:
 class ClaimExtractor:
     """Extracts and classifies claims from text."""
     
+    # Bump when extraction logic changes in ways the pattern tables don't show
+    VERSION = "0.3"
+    
     # Patterns for identifying claims
     CLAIM_PATTERNS = {
         'proven': [
@@ -81,9 +191,38 @@ class ClaimExtractor:
         
         self.claims: List[Claim] = []
         self.claim_counter = 0
+        self.classifier = ClaimClassifier(self.CLAIM_PATTERNS, self.CONFIDENCE_KEYWORDS)
+        self._reset_indexes()
+    
+    def _reset_indexes(self):
+        self._by_id: Dict[str, Claim] = {}
+        self._by_section: Dict[str, List[Claim]] = {}
+        self._by_type: Dict[str, List[Claim]] = {}
+    
+    def reset(self):
+        """Drop accumulated claims (e.g. between documents); the ID counter keeps running."""
+        self.claims = []
+        self._reset_indexes()
+    
+    def add_claim(self, claim: Claim):
+        """Append a claim and index it by ID, section and type."""
+        self.claims.append(claim)
+        self._by_id[claim.claim_id] = claim
+        self._by_section.setdefault(claim.source_section, []).append(claim)
+        self._by_type.setdefault(claim.claim_type, []).append(claim)
+    
+    def get_claim(self, claim_id: str) -> Optional[Claim]:
+        return self._by_id.get(claim_id)
+    
+    def get_claims_for_section(self, section: str) -> List[Claim]:
+        return list(self._by_section.get(section, []))
+    
+    def get_claims_by_type(self, claim_type: str) -> List[Claim]:
+        return list(self._by_type.get(claim_type, []))
     
     def extract_claims(self, text: str, section: str, source_doc: str, 
-                      page_number: Optional[int] = None) -> List[Claim]:
+                      page_number: Optional[int] = None,
+                      page_starts: Optional[Sequence[Tuple[int, int]]] = None) -> List[Claim]:
         """
         Extract claims from text.
         
@@ -92,17 +231,17 @@ class ClaimExtractor:
             section: Section name/identifier
             source_doc: Source document name
             page_number: Optional page number
+            page_starts: Optional (character offset, page number) pairs marking
+                where each page begins in text; overrides page_number per match
         
         Returns:
             List of extracted Claim objects
         """
         claims = []
+        lines = LineIndex(text)
         
-        # Split into sentences
-        sentences = re.split(r'[.!?]\s+', text)
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
+        for start, end in iter_sentence_spans(text):
+            sentence = text[start:end]
             if len(sentence) < 20:  # Skip very short sentences
                 continue
             
@@ -127,13 +266,8 @@ class ClaimExtractor:
             # Find scriptural mappings
             scriptural_mapping = self._find_scriptural_mapping(sentence)
             
-            # Find line numbers
-            line_start = text.find(sentence)
-            if line_start >= 0:
-                line_num = text[:line_start].count('\n') + 1
-                line_range = (line_num, line_num)
-            else:
-                line_range = None
+            line_range = (lines.line_of(start), lines.line_of(end - 1))
+            claim_page = page_at(page_starts, start) if page_starts else page_number
             
             claim = Claim(
                 claim_id=claim_id,
@@ -142,7 +276,7 @@ class ClaimExtractor:
                 confidence=confidence,
                 source_document=source_doc,
                 source_section=section,
-                page_number=page_number,
+                page_number=claim_page,
                 line_range=line_range,
                 equation_refs=equation_refs,
                 scriptural_mapping=scriptural_mapping,
@@ -151,73 +285,61 @@ class ClaimExtractor:
             
             claims.append(claim)
         
-        self.claims.extend(claims)
+        for claim in claims:
+            self.add_claim(claim)
         return claims
     
+    # Map to schema claim types
+    TYPE_MAPPING = {
+        'proven': 'Proven',
+        'derived': 'Derived',
+        'modeled': 'Modeled',
+        'conjectural': 'Conjectural',
+        'narrative': 'Narrative',
+    }
+    
+    # Base confidence by type
+    BASE_CONFIDENCE = {
+        'Proven': 0.95,
+        'Derived': 0.75,
+        'Modeled': 0.60,
+        'Conjectural': 0.40,
+        'Narrative': 0.20,
+    }
+    
+    # Confidence adjustment per keyword level (applied once per level)
+    CONFIDENCE_ADJUSTMENTS = {
+        'certain': 0.1,
+        'very_high': 0.05,
+        'high': 0.0,
+        'moderate': -0.1,
+        'low': -0.2,
+        'narrative': -0.1,
+    }
+    
     def _classify_claim(self, text: str) -> Tuple[str, float]:
-        """Classify claim type and confidence."""
-        text_lower = text.lower()
-        
-        # Check each claim type pattern
-        scores = {}
-        for claim_type, patterns in self.CLAIM_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = len(re.findall(pattern, text_lower, re.IGNORECASE))
-                score += matches
-            scores[claim_type] = score
+        """Classify claim type and confidence (one scan of the sentence)."""
+        scores, levels = self.classifier.scan(text)
         
         # Determine claim type
         if max(scores.values()) == 0:
             # Default to derived if no pattern matches
-            claim_type = 'derived'
-            confidence = 0.5
-        else:
-            claim_type = max(scores, key=scores.get)
-            
-            # Map to schema claim types
-            type_mapping = {
-                'proven': 'Proven',
-                'derived': 'Derived',
-                'modeled': 'Modeled',
-                'conjectural': 'Conjectural',
-                'narrative': 'Narrative',
-            }
-            claim_type = type_mapping.get(claim_type, 'Derived')
-            
-            # Determine confidence
-            confidence = self._estimate_confidence(text_lower, claim_type)
+            return 'Derived', 0.5
         
-        return claim_type, confidence
+        claim_type = self.TYPE_MAPPING.get(max(scores, key=scores.get), 'Derived')
+        return claim_type, self._confidence_from_levels(levels, claim_type)
     
-    def _estimate_confidence(self, text: str, claim_type: str) -> float:
-        """Estimate confidence level from text."""
-        # Base confidence by type
-        base_confidence = {
-            'Proven': 0.95,
-            'Derived': 0.75,
-            'Modeled': 0.60,
-            'Conjectural': 0.40,
-            'Narrative': 0.20,
-        }.get(claim_type, 0.50)
-        
-        # Adjust based on confidence keywords
-        for level, keywords in self.CONFIDENCE_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text:
-                    adjustments = {
-                        'certain': 0.1,
-                        'very_high': 0.05,
-                        'high': 0.0,
-                        'moderate': -0.1,
-                        'low': -0.2,
-                        'narrative': -0.1,
-                    }
-                    base_confidence += adjustments.get(level, 0)
-                    break
+    def _confidence_from_levels(self, levels: List[str], claim_type: str) -> float:
+        confidence = self.BASE_CONFIDENCE.get(claim_type, 0.50)
+        for level in levels:
+            confidence += self.CONFIDENCE_ADJUSTMENTS.get(level, 0)
         
         # Clamp to [0, 1]
-        return max(0.0, min(1.0, base_confidence))
+        return max(0.0, min(1.0, confidence))
+    
+    def _estimate_confidence(self, text: str, claim_type: str) -> float:
+        """Estimate confidence level from text."""
+        return self._confidence_from_levels(self.classifier.scan(text)[1], claim_type)
     
     def _extract_tags(self, text: str) -> List[str]:
         """Extract relevant tags from text."""
@@ -291,10 +413,7 @@ class ClaimExtractor:
     
     def _count_by_type(self) -> Dict[str, int]:
         """Count claims by type."""
-        counts = {}
-        for claim in self.claims:
-            counts[claim.claim_type] = counts.get(claim.claim_type, 0) + 1
-        return counts
+        return {claim_type: len(claims) for claim_type, claims in self._by_type.items()}
 
 
 if __name__ == '__main__':
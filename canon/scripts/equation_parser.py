@@ -6,10 +6,107 @@ Extracts LaTeX equations from documents and links them to claims.
 
 import re
 import json
-from typing import List, Dict, Tuple, Optional
+import sys
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
+# Sibling modules (also when imported as canon.scripts.*)
+sys.path.insert(0, str(Path(__file__).parent))
+
+from text_index import LineIndex, page_at
+
+
+def _math_token_regex() -> Tuple[re.Pattern, Dict]:
+    """Compile the outside-math scanner and one closing-delimiter scanner per opener."""
+    delimiters = EquationParser.MATH_DELIMITERS
+    # Longest delimiters first so '$$' is not read as two '$'
+    openers = sorted(delimiters, key=len, reverse=True)
+    outside = '|'.join(
+        [r'(?P<escape>\\[$\\])']
+        + [f'(?P<open{i}>{re.escape(o)})' for i, o in enumerate(openers)]
+        + [f'(?P<bare{i}>{p})' for i, (p, _) in enumerate(EquationParser.BARE_PATTERNS)]
+    )
+    closers = {}
+    for opener, closer in delimiters.items():
+        tokens = [re.escape(closer)]
+        if opener != closer:
+            tokens.append(re.escape(opener))  # nesting of the same environment
+        if opener in ('$', '\\('):
+            tokens.append(r'\n[ \t]*\n')  # inline math never spans a paragraph break
+        tokens.append(r'\\.')  # escaped characters (\$, \\) are content
+        closers[opener] = re.compile('|'.join(tokens))
+    return re.compile(outside), {'openers': openers, 'closers': closers}
+
+
+def iter_math_spans(text: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    Tokenize text in one left-to-right pass and yield (start, end, formula)
+    for every equation, in order and without overlaps.
+    
+    Delimited math ($$, $, \\[, \\(, equation environments) is matched to its
+    own closer, with nested environments balanced and escaped characters
+    skipped, and its contents are never re-scanned. Bare formulas
+    (assignments, fractions, sub/superscripts) are only recognised outside
+    delimited math. An unclosed opener is treated as plain text; once a closer
+    is known to be absent from the rest of the text, or up to a paragraph
+    break, openers before that point are not searched again, so the scan
+    stays linear.
+    """
+    outside, tables = _MATH_SCANNER
+    openers, closers = tables['openers'], tables['closers']
+    no_closer_after = {}
+    no_closer_before = {}
+    pos = 0
+    while True:
+        match = outside.search(text, pos)
+        if match is None:
+            return
+        kind = match.lastgroup
+        if kind.startswith('bare'):
+            yield match.start(), match.end(), match.group()
+            pos = match.end()
+            continue
+        if kind == 'escape':
+            pos = match.end()
+            continue
+        
+        opener = openers[int(kind[4:])]
+        closer = EquationParser.MATH_DELIMITERS[opener]
+        if (match.end() >= no_closer_after.get(opener, len(text) + 1)
+                or match.end() <= no_closer_before.get(opener, -1)):
+            pos = match.end()
+            continue
+        depth, scan = 1, match.end()
+        close = None
+        saw_closer = False
+        while True:
+            token = closers[opener].search(text, scan)
+            if token is None:
+                no_closer_after[opener] = match.end()
+                break
+            scan = token.end()
+            value = token.group()
+            if value == closer:
+                depth -= 1
+                saw_closer = True
+                if depth == 0:
+                    close = token
+                    break
+            elif value == opener:
+                depth += 1
+            elif not value.startswith('\\'):
+                # A paragraph break ends unclosed inline math; with no closer
+                # on the way, every later opener before it ends here too
+                if not saw_closer:
+                    no_closer_before[opener] = token.start()
+                break
+        if close is None:
+            pos = match.end()
+            continue
+        yield match.start(), close.end(), text[match.end():close.start()]
+        pos = close.end()
+
 
 @dataclass
 class Equation:
@@ -30,35 +127,55 @@ class Equation:
 class EquationParser:
     """Parser for extracting equations from text."""
     
-    # Patterns for common equation formats
-    EQUATION_PATTERNS = [
-        # LaTeX inline: $...$ or \(...\)
-        (r'\$([^$]+)\$', 'inline'),
-        (r'\\\(([^)]+)\\\)', 'inline'),
-        
-        # LaTeX display: $$...$$ or \[...\]
-        (r'\$\$([^$]+)\$\$', 'display'),
-        (r'\\\[([^\]]+)\\\]', 'display'),
-        
-        # Numbered equations: \begin{equation}...\end{equation}
-        (r'\\begin\{equation\}(.*?)\\end\{equation\}', 'numbered'),
-        
-        # Simple math expressions (common patterns)
-        (r'([A-Za-z_][A-Za-z0-9_]*\s*=\s*[^\.\n]+)', 'assignment'),
-        
-        # Fraction patterns: a/b or \frac{a}{b}
-        (r'\\(frac\{([^}]+)\}\{([^}]+)\})', 'fraction'),
-        
-        # Subscript/superscript: a_b, a^b
-        (r'([A-Za-z]_\{([^}]+)\})', 'subscript'),
-        (r'([A-Za-z]\^\{([^}]+)\})', 'superscript'),
+    # Bump when extraction logic changes in ways the pattern table doesn't show
+    VERSION = "0.2"
+    
+    # Math delimiters: opener -> closer (environments nest by name)
+    MATH_DELIMITERS = {
+        '$$': '$$',
+        '$': '$',
+        '\\[': '\\]',
+        '\\(': '\\)',
+        '\\begin{equation}': '\\end{equation}',
+        '\\begin{equation*}': '\\end{equation*}',
+    }
+    
+    # Bare math in prose, outside delimiters (first match at a position wins)
+    BARE_PATTERNS = [
+        # Simple math expressions: x = ... up to the end of the clause
+        (r'[A-Za-z_][A-Za-z0-9_]*[ \t]*=[ \t]*(?:[^.\n$\\]|\\(?![(\[]|begin\{))+', 'assignment'),
+        # Fractions: \frac{a}{b}
+        (r'\\frac\{[^{}]+\}\{[^{}]+\}', 'fraction'),
+        # Subscript/superscript: a_{b}, a^{b}
+        (r'[A-Za-z][_^]\{[^{}]+\}', 'script'),
     ]
     
     def __init__(self):
         self.equations: List[Equation] = []
         self.equation_counter = 0
+        self._reset_indexes()
     
-    def extract_equations(self, text: str, section: str, page_number: Optional[int] = None) -> List[Equation]:
+    def _reset_indexes(self):
+        self._by_id: Dict[str, Equation] = {}
+        self._by_section: Dict[str, List[Equation]] = {}
+        # Inverted link index: claim_id -> equation_ids
+        self._by_claim: Dict[str, List[str]] = {}
+    
+    def reset(self):
+        """Drop accumulated equations (e.g. between documents); the ID counter keeps running."""
+        self.equations = []
+        self._reset_indexes()
+    
+    def add_equation(self, equation: Equation):
+        """Append an equation and index it by ID, section and linked claims."""
+        self.equations.append(equation)
+        self._by_id[equation.equation_id] = equation
+        self._by_section.setdefault(equation.section, []).append(equation)
+        for claim_id in equation.related_claims:
+            self._by_claim.setdefault(claim_id, []).append(equation.equation_id)
+    
+    def extract_equations(self, text: str, section: str, page_number: Optional[int] = None,
+                          page_starts: Optional[Sequence[Tuple[int, int]]] = None) -> List[Equation]:
         """
         Extract equations from text.
         
@@ -66,76 +183,69 @@ class EquationParser:
             text: Text to parse
             section: Section name/identifier
             page_number: Optional page number
+            page_starts: Optional (character offset, page number) pairs marking
+                where each page begins in text; overrides page_number per match
         
         Returns:
             List of extracted Equation objects
         """
-        equations = []
-        
-        # Try each pattern
-        for pattern, eq_type in self.EQUATION_PATTERNS:
-            matches = re.finditer(pattern, text, re.MULTILINE | re.DOTALL)
-            
-            for match in matches:
-                # Get formula from first capturing group, or full match if no group
-                try:
-                    formula = match.group(1).strip()
-                except IndexError:
-                    formula = match.group(0).strip()
-                
-                # Skip very short or invalid formulas
-                if len(formula) < 3 or formula.count('{') != formula.count('}'):
-                    continue
-                
-                # Get context (50 chars before and after)
-                start = max(0, match.start() - 50)
-                end = min(len(text), match.end() + 50)
-                context = text[start:end].strip()
-                
-                # Generate equation ID
-                self.equation_counter += 1
-                section_clean = re.sub(r'[^A-Za-z0-9]', '_', section)
-                eq_id = f"EQ_{section_clean}_{self.equation_counter}"
-                
-                # Find line numbers if possible
-                line_start = text[:match.start()].count('\n') + 1
-                line_end = text[:match.end()].count('\n') + 1
-                
-                equation = Equation(
-                    equation_id=eq_id,
-                    latex_formula=formula,
-                    context=context,
-                    section=section,
-                    page_number=page_number,
-                    line_range=(line_start, line_end) if line_start != line_end else None,
-                    related_claims=[]
-                )
-                
-                equations.append(equation)
-        
-        # Remove duplicates (same formula in same section)
+        lines = LineIndex(text)
+        section_clean = re.sub(r'[^A-Za-z0-9]', '_', section)
         seen = set()
         unique_equations = []
-        for eq in equations:
-            key = (eq.latex_formula, eq.section)
-            if key not in seen:
-                seen.add(key)
-                unique_equations.append(eq)
         
-        self.equations.extend(unique_equations)
+        for start, end, formula in iter_math_spans(text):
+            formula = formula.strip()
+            
+            # Skip very short or invalid formulas, and repeats (same formula in same section)
+            if len(formula) < 3 or formula.count('{') != formula.count('}') or formula in seen:
+                continue
+            seen.add(formula)
+            
+            # Get context (50 chars before and after)
+            context = text[max(0, start - 50):min(len(text), end + 50)].strip()
+            
+            # Generate equation ID
+            self.equation_counter += 1
+            eq_id = f"EQ_{section_clean}_{self.equation_counter}"
+            
+            line_start, line_end = lines.line_of(start), lines.line_of(end)
+            
+            unique_equations.append(Equation(
+                equation_id=eq_id,
+                latex_formula=formula,
+                context=context,
+                section=section,
+                page_number=page_at(page_starts, start) if page_starts else page_number,
+                line_range=(line_start, line_end) if line_start != line_end else None,
+                related_claims=[]
+            ))
+        
+        for equation in unique_equations:
+            self.add_equation(equation)
         return unique_equations
     
-    def link_equation_to_claim(self, equation_id: str, claim_id: str):
-        """Link an equation to a claim."""
-        for eq in self.equations:
-            if eq.equation_id == equation_id:
-                if claim_id not in eq.related_claims:
-                    eq.related_claims.append(claim_id)
-                break
+    def link_equation_to_claim(self, equation_id: str, claim_id: str) -> bool:
+        """Link an equation to a claim (returns False if the equation is unknown)."""
+        eq = self._by_id.get(equation_id)
+        if eq is None:
+            return False
+        linked = self._by_claim.setdefault(claim_id, [])
+        if equation_id not in linked:
+            linked.append(equation_id)
+            eq.related_claims.append(claim_id)
+        return True
+    
+    def get_equation(self, equation_id: str) -> Optional[Equation]:
+        return self._by_id.get(equation_id)
     
     def get_equations_for_section(self, section: str) -> List[Equation]:
         """Get all equations for a given section."""
-        return [eq for eq in self.equations if eq.section == section]
+        return list(self._by_section.get(section, []))
+    
+    def get_equations_for_claim(self, claim_id: str) -> List[Equation]:
+        """Equations linked to a claim."""
+        return [self._by_id[eq_id] for eq_id in self._by_claim.get(claim_id, [])]
     
     def export_json(self, output_path: Path):
         """Export equations to JSON."""
@@ -162,6 +272,9 @@ class EquationParser:
             f.write('\n'.join(lines))
 
 
+_MATH_SCANNER = _math_token_regex()
+
+
 if __name__ == '__main__':
     # Test the parser
     parser = EquationParser()
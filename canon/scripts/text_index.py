@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Text Position Helpers for Zora Canon
+Line and page lookups for character offsets, shared by the claim and equation
+extractors so positions are resolved by bisection instead of rescanning text.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from typing import Iterator, Sequence, Tuple
+
+SENTENCE_END = re.compile(r'[.!?]\s+')
+
+
+class LineIndex:
+    """1-based line numbers of character offsets, from a one-pass newline index."""
+
+    def __init__(self, text: str):
+        self.newlines = [m.start() for m in re.finditer('\n', text)]
+
+    def line_of(self, offset: int) -> int:
+        """Line containing text[offset] (same as text[:offset].count('\\n') + 1)."""
+        return bisect_left(self.newlines, offset) + 1
+
+
+def iter_sentence_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) offsets of the sentences of text, whitespace-stripped.
+
+    Sentences are the pieces of re.split(r'[.!?]\\s+', text); empty pieces are
+    skipped.
+    """
+    start = 0
+    ends = [(m.start(), m.end()) for m in SENTENCE_END.finditer(text)]
+    for piece_end, next_start in ends + [(len(text), len(text))]:
+        piece = text[start:piece_end]
+        stripped = piece.strip()
+        if stripped:
+            lead = len(piece) - len(piece.lstrip())
+            yield start + lead, start + lead + len(stripped)
+        start = next_start
+
+
+def page_at(page_starts: Sequence[Tuple[int, int]], offset: int) -> int:
+    """Page number containing a character offset, given (offset, page) starts."""
+    i = bisect_right(page_starts, (offset, float('inf'))) - 1
+    return page_starts[max(i, 0)][1]
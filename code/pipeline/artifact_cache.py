@@ -0,0 +1,271 @@
+"""
+Content-Addressed Artifact Cache
+Stores pipeline stage outputs keyed on the hash of their inputs, parameters and code,
+so unchanged stages can be materialized from the cache instead of recomputed.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Compute SHA256 hash of a file."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        while True:
+            b = f.read(chunk_size)
+            if not b:
+                break
+            h.update(b)
+    return h.hexdigest()
+
+
+def _relpath(path: Path, root: Path) -> str:
+    """Path relative to root (POSIX style) if possible, otherwise absolute."""
+    path = Path(path)
+    try:
+        return path.resolve().relative_to(Path(root).resolve()).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def compute_stage_key(
+    stage_name: str,
+    root: Path,
+    input_paths: Iterable[Path] = (),
+    code_paths: Iterable[Path] = (),
+    params: Optional[Dict] = None
+) -> str:
+    """
+    Compute the cache key for one pipeline stage.
+
+    The key covers the stage name, the content hash of every input and code file
+    (missing files hash to null, so optional inputs still participate), and the
+    JSON-serialized parameters.
+
+    Args:
+        stage_name: Stage identifier
+        root: Project root used to make paths location-independent
+        input_paths: Data files the stage reads
+        code_paths: Source files that implement the stage
+        params: Stage parameters
+
+    Returns:
+        Hex SHA256 stage key
+    """
+    def digest(paths: Iterable[Path]) -> Dict[str, Optional[str]]:
+        out = {}
+        for p in paths:
+            p = Path(p)
+            out[_relpath(p, root)] = sha256_file(p) if p.is_file() else None
+        return out
+
+    payload = {
+        'stage': stage_name,
+        'params': params or {},
+        'inputs': digest(input_paths),
+        'code': digest(code_paths)
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed store for stage outputs with size-based LRU eviction.
+
+    Layout::
+
+        <cache_dir>/objects/<sha[:2]>/<sha>   # output blobs
+        <cache_dir>/index.json                # stage key -> {relpath: sha}
+
+    Identical outputs from different stages or parameter sets share one object.
+    """
+
+    INDEX_VERSION = '1'
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 use_hardlinks: bool = True):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding objects and the index
+            max_bytes: Total object size above which LRU eviction kicks in
+            use_hardlinks: Materialize by hard-link (falls back to copy)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_path = self.cache_dir / "index.json"
+        self.max_bytes = int(max_bytes)
+        self.use_hardlinks = use_hardlinks
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self) -> Dict:
+        """Load the index, starting fresh if missing or unreadable."""
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'r') as f:
+                    index = json.load(f)
+                if index.get('version') == self.INDEX_VERSION:
+                    return index
+            except (OSError, ValueError):
+                pass
+        return {'version': self.INDEX_VERSION, 'entries': {}, 'objects': {}}
+
+    def _save_index(self):
+        """Write the index atomically."""
+        tmp_path = self.index_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
+
+    def _object_path(self, sha: str) -> Path:
+        return self.objects_dir / sha[:2] / sha
+
+    def lookup(self, key: str) -> Optional[Dict[str, str]]:
+        """Return the {relpath: sha} output map for a stage key, if cached."""
+        entry = self.index['entries'].get(key)
+        return dict(entry['outputs']) if entry else None
+
+    def materialize(self, key: str, root: Path) -> bool:
+        """
+        Place the cached outputs of a stage under root.
+
+        Each object is verified against its content hash before being linked,
+        so a blob corrupted through an in-place rewrite of a hard-linked output
+        is treated as a miss and dropped.
+
+        Returns:
+            True if every output was materialized, False on a miss
+        """
+        entry = self.index['entries'].get(key)
+        if not entry:
+            return False
+
+        root = Path(root)
+        for sha in entry['outputs'].values():
+            obj = self._object_path(sha)
+            if not obj.is_file() or sha256_file(obj) != sha:
+                self._drop_entry(key)
+                self._collect_garbage()
+                self._save_index()
+                return False
+
+        for relpath, sha in entry['outputs'].items():
+            dest = root / relpath
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if dest.exists() or dest.is_symlink():
+                dest.unlink()
+            self._place(self._object_path(sha), dest)
+
+        entry['last_used'] = time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        self._save_index()
+        return True
+
+    def _place(self, obj: Path, dest: Path):
+        """Hard-link obj to dest, copying when linking is unavailable."""
+        if self.use_hardlinks:
+            try:
+                os.link(obj, dest)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(obj, dest)
+
+    def store(self, key: str, stage_name: str, root: Path, outputs: Iterable[Path]) -> Dict[str, str]:
+        """
+        Copy stage outputs into the cache and record them under key.
+
+        Outputs are copied (never linked) into the store so that later in-place
+        writes to the working tree cannot reach the cached blob.
+
+        Returns:
+            The {relpath: sha} output map
+        """
+        root = Path(root)
+        output_map = {}
+        for path in outputs:
+            path = Path(path)
+            sha = sha256_file(path)
+            obj = self._object_path(sha)
+            if not obj.is_file():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp_obj = obj.with_name(obj.name + '.tmp')
+                shutil.copyfile(path, tmp_obj)
+                os.replace(tmp_obj, obj)
+            self.index['objects'][sha] = obj.stat().st_size
+            output_map[_relpath(path, root)] = sha
+
+        now = time.time()
+        self.index['entries'][key] = {
+            'stage': stage_name,
+            'outputs': output_map,
+            'created_at': now,
+            'last_used': now,
+            'hits': 0
+        }
+        self.evict()
+        self._save_index()
+        return output_map
+
+    def total_bytes(self) -> int:
+        """Total size of all stored objects."""
+        return sum(self.index['objects'].values())
+
+    def evict(self, max_bytes: Optional[int] = None) -> List[str]:
+        """
+        Evict least-recently-used entries until the store fits in max_bytes.
+
+        Returns:
+            List of evicted stage keys
+        """
+        limit = self.max_bytes if max_bytes is None else int(max_bytes)
+        evicted = []
+        by_age = sorted(self.index['entries'].items(), key=lambda kv: kv[1]['last_used'])
+        for key, _ in by_age:
+            if self.total_bytes() <= limit:
+                break
+            self._drop_entry(key)
+            self._collect_garbage()
+            evicted.append(key)
+        return evicted
+
+    def _drop_entry(self, key: str):
+        self.index['entries'].pop(key, None)
+
+    def _collect_garbage(self):
+        """Delete objects no longer referenced by any entry."""
+        referenced = {sha for entry in self.index['entries'].values()
+                      for sha in entry['outputs'].values()}
+        for sha in list(self.index['objects']):
+            if sha not in referenced:
+                obj = self._object_path(sha)
+                if obj.exists():
+                    obj.unlink()
+                del self.index['objects'][sha]
+
+    def clear(self):
+        """Remove every entry and object."""
+        self.index['entries'] = {}
+        self._collect_garbage()
+        self._save_index()
+
+    def stats(self) -> Dict:
+        """Summary statistics for reporting."""
+        return {
+            'cache_dir': str(self.cache_dir),
+            'entries': len(self.index['entries']),
+            'objects': len(self.index['objects']),
+            'total_bytes': self.total_bytes(),
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,260 @@
+"""
+Constraint Pipeline Stages
+Declares the results/ stages of the constraint pipeline with their inputs, code and
+outputs, and runs them in-process through the content-addressed artifact cache.
+"""
+
+import importlib.util
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from code.pipeline.artifact_cache import ArtifactCache, DEFAULT_MAX_BYTES, compute_stage_key
+
+SCALAR_RESULTS = 'results/scalar_constraints'
+VALIDATION_RESULTS = 'results/empirical_validation'
+EOTWASH_CSV = 'eotwash_prl2016_digitized_contract_READY.csv'
+HYPOTHESIS_CARD = 'data/constraints/minimal_scalar_hypothesis_card_v0.1.yaml'
+
+
+@dataclass
+class PipelineStage:
+    """A cacheable pipeline stage (all paths relative to the project root)."""
+    name: str
+    run: Callable[[Path, Dict], None]
+    outputs: List[str]
+    inputs: List[str] = field(default_factory=list)
+    code: List[str] = field(default_factory=list)
+    params: Dict = field(default_factory=dict)
+    description: str = ''
+
+
+_script_modules: Dict[str, object] = {}
+
+
+def load_script(project_root: Path, relpath: str):
+    """Import a script under scripts/ or experiments/ as a module (memoized)."""
+    path = (Path(project_root) / relpath).resolve()
+    key = str(path)
+    if key not in _script_modules:
+        spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _script_modules[key] = module
+    return _script_modules[key]
+
+
+def _run_fifth_force_ep(project_root: Path, params: Dict):
+    load_script(project_root, 'scripts/generate_fifth_force_ep_bounds.py').main()
+
+
+def _run_clocks(project_root: Path, params: Dict):
+    load_script(project_root, 'scripts/generate_clocks_spectroscopy_bounds.py').main()
+
+
+def _run_joint(project_root: Path, params: Dict):
+    load_script(project_root, 'scripts/generate_joint_scalar_constraints.py').main()
+
+
+def _run_golden(project_root: Path, params: Dict):
+    module = load_script(project_root, 'scripts/generate_golden_plot.py')
+    module.generate_golden_plot(
+        Path(project_root) / SCALAR_RESULTS / 'joint_bounds.csv',
+        Path(project_root) / SCALAR_RESULTS,
+        predicted_theta_range=(params['theta_min'], params['theta_max'])
+    )
+
+
+def _run_toe_predictions(project_root: Path, params: Dict):
+    load_script(project_root, 'experiments/compute_toe_predictions.py').main()
+
+
+STAGES: Dict[str, PipelineStage] = {
+    stage.name: stage for stage in [
+        PipelineStage(
+            name='fifth_force_ep',
+            description='Fifth-force + EP bounds',
+            run=_run_fifth_force_ep,
+            inputs=['results/toe_constraints/theta_max_vs_lambda.csv'],
+            code=['scripts/generate_fifth_force_ep_bounds.py'],
+            outputs=[f'{SCALAR_RESULTS}/fifth_force_ep_bounds.csv']
+        ),
+        PipelineStage(
+            name='clocks_spectroscopy',
+            description='Clocks/spectroscopy bounds',
+            run=_run_clocks,
+            code=['scripts/generate_clocks_spectroscopy_bounds.py'],
+            outputs=[f'{SCALAR_RESULTS}/clocks_spectroscopy_bounds.csv']
+        ),
+        PipelineStage(
+            name='joint',
+            description='Joint constraint fusion',
+            run=_run_joint,
+            inputs=[f'{SCALAR_RESULTS}/fifth_force_ep_bounds.csv',
+                    f'{SCALAR_RESULTS}/collider_higgs_bounds.csv',
+                    f'{SCALAR_RESULTS}/clocks_spectroscopy_bounds.csv'],
+            code=['scripts/generate_joint_scalar_constraints.py',
+                  'code/inference/scalar_constraint_fusion.py'],
+            outputs=[f'{SCALAR_RESULTS}/joint_bounds.csv',
+                     f'{SCALAR_RESULTS}/joint_exclusion_plot.png',
+                     f'{SCALAR_RESULTS}/joint_dashboard.json']
+        ),
+        PipelineStage(
+            name='golden_plot',
+            description='Golden exclusion plot',
+            run=_run_golden,
+            inputs=[f'{SCALAR_RESULTS}/joint_bounds.csv'],
+            code=['scripts/generate_golden_plot.py'],
+            params={'theta_min': 1e-10, 'theta_max': 1e-6},
+            outputs=[f'{SCALAR_RESULTS}/golden_exclusion_plot.png',
+                     f'{SCALAR_RESULTS}/golden_exclusion_plot.pdf',
+                     f'{SCALAR_RESULTS}/golden_plot_summary.json']
+        ),
+        PipelineStage(
+            name='toe_predictions',
+            description='ToE predictions vs. bounds',
+            run=_run_toe_predictions,
+            inputs=[f'{SCALAR_RESULTS}/joint_bounds.csv'],
+            code=['experiments/compute_toe_predictions.py'],
+            outputs=[f'{VALIDATION_RESULTS}/toe_predictions_vs_bounds.png',
+                     f'{VALIDATION_RESULTS}/toe_validation_results.json']
+        ),
+    ]
+}
+
+# Order used by scripts/run_constraint_pipeline.sh (ingestion stays uncached: it
+# updates the data/public registry rather than producing results/ outputs)
+CONSTRAINT_PIPELINE_ORDER = ['fifth_force_ep', 'clocks_spectroscopy', 'joint', 'golden_plot']
+
+
+def default_cache(project_root: Path) -> Optional[ArtifactCache]:
+    """
+    Build the artifact cache from the environment.
+
+    MQGT_ARTIFACT_CACHE=off disables caching; MQGT_ARTIFACT_CACHE_DIR (default
+    <project_root>/.artifact_cache) and MQGT_ARTIFACT_CACHE_MAX_MB configure it.
+    """
+    if os.getenv('MQGT_ARTIFACT_CACHE', 'on').lower() in ('0', 'off', 'false', 'no'):
+        return None
+    cache_dir = Path(os.getenv('MQGT_ARTIFACT_CACHE_DIR', Path(project_root) / '.artifact_cache'))
+    max_mb = os.getenv('MQGT_ARTIFACT_CACHE_MAX_MB')
+    max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return ArtifactCache(cache_dir, max_bytes=max_bytes)
+
+
+def _move_aside(paths: List[Path]) -> Dict[Path, Path]:
+    """Rename existing files to <name>.prev; returns path -> backup."""
+    moved = {}
+    for path in paths:
+        if path.is_file() or path.is_symlink():
+            backup = path.with_name(path.name + '.prev')
+            os.replace(path, backup)
+            moved[path] = backup
+    return moved
+
+
+def run_stage(stage: PipelineStage, project_root: Path,
+              cache: Optional[ArtifactCache] = None) -> Dict:
+    """
+    Run one stage, materializing its outputs from the cache when the key matches.
+
+    Returns:
+        Dict with stage name, cache key, whether it was served from cache,
+        the output paths and the wall-clock duration
+    """
+    project_root = Path(project_root)
+    t0 = time.perf_counter()
+
+    key = None
+    if cache is not None:
+        key = compute_stage_key(
+            stage.name, project_root,
+            input_paths=[project_root / p for p in stage.inputs],
+            code_paths=[project_root / p for p in stage.code],
+            params=stage.params
+        )
+        if cache.materialize(key, project_root):
+            return {
+                'stage': stage.name,
+                'key': key,
+                'cached': True,
+                'outputs': list(stage.outputs),
+                'duration_s': time.perf_counter() - t0
+            }
+
+    # Move the previous outputs aside: only files the stage writes now count as
+    # its outputs (a stage that returns early must not get stale files stored
+    # under the new key), and outputs hard-linked into the cache cannot be
+    # truncated in place. The previous files come back if the stage fails.
+    previous = _move_aside([project_root / p for p in stage.outputs])
+    try:
+        stage.run(project_root, stage.params)
+    except BaseException:
+        for path, backup in previous.items():
+            os.replace(backup, path)
+        raise
+    for backup in previous.values():
+        backup.unlink()
+
+    produced = [project_root / p for p in stage.outputs if (project_root / p).is_file()]
+    missing = [p for p in stage.outputs if not (project_root / p).is_file()]
+    if cache is not None and not missing:
+        cache.store(key, stage.name, project_root, produced)
+
+    result = {
+        'stage': stage.name,
+        'key': key,
+        'cached': False,
+        'outputs': [str(p.relative_to(project_root)) for p in produced],
+        'duration_s': time.perf_counter() - t0
+    }
+    if missing:
+        result['missing_outputs'] = missing
+    return result
+
+
+def run_pipeline(project_root: Path, cache: Optional[ArtifactCache] = None,
+                 stage_names: Optional[List[str]] = None) -> List[Dict]:
+    """Run stages in order (defaults to the constraint pipeline order)."""
+    names = stage_names or CONSTRAINT_PIPELINE_ORDER
+    return [run_stage(STAGES[name], project_root, cache) for name in names]
+
+
+def run_ingest(project_root: Path) -> Optional[Dict]:
+    """
+    Ingest the Eöt-Wash curve into data/public (Step 1 of the shell pipeline).
+
+    A curve whose SHA256 is already registered in the manifest is skipped.
+
+    Returns:
+        Dict with the ingested dataset_ids and skipped files, or None if the
+        curve is absent
+    """
+    project_root = Path(project_root)
+    csv_path = project_root / EOTWASH_CSV
+    if not csv_path.exists():
+        return None
+
+    t0 = time.perf_counter()
+    ingest = load_script(project_root, 'scripts/ingest_experimental_data.py')
+    schema = ingest.load_hypothesis_card(project_root / HYPOTHESIS_CARD)
+    result = ingest.ingest_files([csv_path], schema, project_root / 'data' / 'public')
+    return {
+        'stage': 'ingest',
+        'dataset_ids': [m['dataset_id'] for m in result['ingested']],
+        'skipped': result['skipped'],
+        'duration_s': time.perf_counter() - t0
+    }
+
+
+def run_constraint_pipeline(project_root: Path,
+                            cache: Optional[ArtifactCache] = None) -> List[Dict]:
+    """In-process equivalent of scripts/run_constraint_pipeline.sh."""
+    results = []
+    ingested = run_ingest(project_root)
+    if ingested is not None:
+        results.append(ingested)
+    results.extend(run_pipeline(project_root, cache))
+    return results
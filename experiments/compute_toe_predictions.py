@@ -62,6 +62,41 @@ def compute_toe_alpha_prediction(lambda_m: float, theta_hc: float = 0.01,
     return alpha
 
 
+HBAR_C_GEV_M_APPROX = 1.97e-16  # ħc used by compute_toe_alpha_prediction (GeV·m)
+
+
+def compute_toe_alpha_grid(lambda_values: np.ndarray, theta_values: np.ndarray,
+                           m_h_GeV: float = 125.0, K_ToE: float = 1.0) -> np.ndarray:
+    """
+    Vectorized compute_toe_alpha_prediction over a (λ, θ_hc) grid.
+    
+    Applies the same resonance handling as the scalar function, element-wise.
+    
+    Args:
+        lambda_values: Array of λ values (meters), shape (N,)
+        theta_values: Array of θ_hc values, shape (M,)
+        m_h_GeV: Higgs mass in GeV
+        K_ToE: Normalization constant
+    
+    Returns:
+        Array of predicted α values, shape (N, M)
+    """
+    lambda_values = np.asarray(lambda_values, dtype=float)
+    theta_values = np.asarray(theta_values, dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m_c_GeV = np.where(lambda_values > 0, HBAR_C_GEV_M_APPROX / lambda_values, np.inf)
+        m_c_GeV = np.where(np.abs(m_c_GeV - m_h_GeV) < 0.1, m_h_GeV - 0.1, m_c_GeV)
+        
+        m_h_sq = m_h_GeV ** 2
+        denominator = m_h_sq - m_c_GeV ** 2
+        ratio = m_h_sq / denominator
+        alpha = (theta_values[np.newaxis, :] ** 2 / K_ToE) * (ratio[:, np.newaxis] ** 2)
+    
+    # Near resonance, return large value (would need regularization)
+    return np.where(np.abs(denominator)[:, np.newaxis] < 1e-10, 1e10, alpha)
+
+
 def compute_toe_prediction_band(lambda_values: np.ndarray, 
                                 theta_range: Tuple[float, float] = (1e-4, 0.1),
                                 num_theta_samples: int = 100) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
@@ -78,15 +113,7 @@ def compute_toe_prediction_band(lambda_values: np.ndarray,
     """
     theta_samples = np.logspace(np.log10(theta_range[0]), np.log10(theta_range[1]), num_theta_samples)
     
-    alpha_predictions = []
-    for lambda_val in lambda_values:
-        alphas = []
-        for theta in theta_samples:
-            alpha = compute_toe_alpha_prediction(lambda_val, theta_hc=theta)
-            alphas.append(alpha)
-        alpha_predictions.append(alphas)
-    
-    alpha_predictions = np.array(alpha_predictions)
+    alpha_predictions = compute_toe_alpha_grid(lambda_values, theta_samples)
     
     alpha_min = np.min(alpha_predictions, axis=1)
     alpha_max = np.max(alpha_predictions, axis=1)
@@ -95,59 +122,110 @@ def compute_toe_prediction_band(lambda_values: np.ndarray,
     return alpha_min, alpha_max, alpha_median
 
 
-def compare_predictions_to_bounds(bounds_file: Path, output_dir: Path) -> Dict:
+def compare_prediction_arrays(lambda_values: np.ndarray, theta_max: np.ndarray,
+                              K_ToE: float = 1.0) -> Dict:
     """
-    Compare ToE predictions to experimental bounds.
+    Compare ToE predictions to already-loaded experimental bounds.
+    
+    One vectorized pass: no file I/O and no plotting, so callers that have the
+    bounds in memory (e.g. EmpiricalValidator) can reuse them.
     
     Args:
-        bounds_file: Path to joint_bounds.csv
-        output_dir: Output directory for results
+        lambda_values: λ values of the bounds (meters)
+        theta_max: θ_max bound at each λ
+        K_ToE: Normalization constant for the bound conversion
     
     Returns:
-        Dictionary with comparison results
+        Dictionary with summary, sample violations/validations, prediction and
+        violation statistics, plus the arrays needed for plotting under 'arrays'
     """
-    # Load bounds
-    bounds_df = pd.read_csv(bounds_file)
-    
-    # Extract lambda values
-    lambda_values = bounds_df['lambda_m'].values
+    lambda_values = np.asarray(lambda_values, dtype=float)
+    theta_max = np.asarray(theta_max, dtype=float)
     
-    # Compute ToE predictions
-    print("Computing ToE predictions...")
     alpha_min, alpha_max, alpha_median = compute_toe_prediction_band(lambda_values)
     
     # Get experimental bounds (alpha_max from bounds)
     # Note: bounds file has theta_max, need to convert to alpha_max
     # For now, use a conservative estimate based on theta_max
     # alpha_bound ≈ (theta_max² / K_ToE) for comparison
-    theta_max = bounds_df['theta_max'].values
-    K_ToE = 1.0
     alpha_bound_estimate = (theta_max ** 2) / K_ToE
     
-    # Compare predictions to bounds
-    violations = []
-    validations = []
+    violation_mask = alpha_max > alpha_bound_estimate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        violation_factor = alpha_max / alpha_bound_estimate
+        safety_margin = np.where(alpha_max > 0, alpha_bound_estimate / alpha_max, np.inf)
+    
+    violation_idx = np.flatnonzero(violation_mask)
+    validation_idx = np.flatnonzero(~violation_mask)
+    
+    violations = [{
+        'lambda_m': float(lambda_values[i]),
+        'predicted_alpha_max': float(alpha_max[i]),
+        'bound_alpha': float(alpha_bound_estimate[i]),
+        'violation_factor': float(violation_factor[i])
+    } for i in violation_idx[:10]]
+    validations = [{
+        'lambda_m': float(lambda_values[i]),
+        'predicted_alpha_max': float(alpha_max[i]),
+        'bound_alpha': float(alpha_bound_estimate[i]),
+        'safety_margin': float(safety_margin[i])
+    } for i in validation_idx[:10]]
     
-    for i, lambda_val in enumerate(lambda_values):
-        pred_max = alpha_max[i]
-        bound = alpha_bound_estimate[i]
-        
-        if pred_max > bound:
-            violations.append({
-                'lambda_m': lambda_val,
-                'predicted_alpha_max': pred_max,
-                'bound_alpha': bound,
-                'violation_factor': pred_max / bound
-            })
-        else:
-            validations.append({
-                'lambda_m': lambda_val,
-                'predicted_alpha_max': pred_max,
-                'bound_alpha': bound,
-                'safety_margin': bound / pred_max if pred_max > 0 else np.inf
-            })
+    # Generate summary
+    total_points = len(lambda_values)
+    num_violations = int(violation_mask.sum())
+    num_validations = total_points - num_violations
+    validation_rate = num_validations / total_points if total_points > 0 else 0
+    
+    violation_statistics = {
+        'max_violation_factor': float(violation_factor[violation_idx].max()) if num_violations else None,
+        'median_violation_factor': float(np.median(violation_factor[violation_idx])) if num_violations else None,
+        'violation_lambda_range': [float(lambda_values[violation_idx].min()),
+                                   float(lambda_values[violation_idx].max())] if num_violations else None,
+        'min_safety_margin': float(safety_margin[validation_idx].min()) if num_validations else None
+    }
+    
+    summary = {
+        'total_data_points': int(total_points),
+        'violations': num_violations,
+        'validations': num_validations,
+        'validation_rate': float(validation_rate),
+        'status': 'VALIDATED' if validation_rate > 0.95 else 'PARTIALLY_VALIDATED' if validation_rate > 0.5 else 'FALSIFIED',
+        'interpretation': {
+            'if_validated': 'ToE predictions lie within experimental bounds. Theory is consistent with data.',
+            'if_partial': 'Some ToE predictions exceed bounds. Theory may need parameter adjustment.',
+            'if_falsified': 'ToE predictions violate experimental bounds. Theory needs revision.'
+        }
+    }
+    
+    return {
+        'summary': summary,
+        'violations': violations,  # First 10 violations
+        'sample_validations': validations,  # First 10 validations
+        'prediction_statistics': {
+            'alpha_min': float(np.min(alpha_min)),
+            'alpha_max': float(np.max(alpha_max)),
+            'alpha_median_min': float(np.min(alpha_median)),
+            'alpha_median_max': float(np.max(alpha_median))
+        },
+        'violation_statistics': violation_statistics,
+        'arrays': {
+            'lambda_m': lambda_values,
+            'alpha_min': alpha_min,
+            'alpha_max': alpha_max,
+            'alpha_median': alpha_median,
+            'alpha_bound': alpha_bound_estimate,
+            'violation_mask': violation_mask
+        }
+    }
+
+
+def plot_predictions_vs_bounds(arrays: Dict[str, np.ndarray], plot_file: Path):
+    """Render the predictions-vs-bounds plot from compare_prediction_arrays output."""
+    lambda_values = arrays['lambda_m']
+    alpha_bound_estimate = arrays['alpha_bound']
+    violation_mask = arrays['violation_mask']
     
-    # Create comparison plot
     plt.figure(figsize=(12, 8))
     
     # Plot experimental bounds
@@ -157,16 +235,14 @@ def compare_predictions_to_bounds(bounds_file: Path, output_dir: Path) -> Dict:
                      alpha=0.2, color='red', label='Excluded Region')
     
     # Plot ToE predictions
-    plt.loglog(lambda_values, alpha_median, 'b-', linewidth=2, 
+    plt.loglog(lambda_values, arrays['alpha_median'], 'b-', linewidth=2, 
                label='ToE Prediction (Median)', alpha=0.8)
-    plt.fill_between(lambda_values, alpha_min, alpha_max, 
+    plt.fill_between(lambda_values, arrays['alpha_min'], arrays['alpha_max'], 
                      alpha=0.3, color='blue', label='ToE Prediction Band')
     
     # Mark violations
-    if violations:
-        violation_lambdas = [v['lambda_m'] for v in violations]
-        violation_alphas = [v['predicted_alpha_max'] for v in violations]
-        plt.scatter(violation_lambdas, violation_alphas, 
+    if violation_mask.any():
+        plt.scatter(lambda_values[violation_mask], arrays['alpha_max'][violation_mask], 
                    color='red', marker='x', s=100, label='Violations', zorder=5)
     
     plt.xlabel('Interaction Range λ (m)', fontsize=12)
@@ -176,47 +252,38 @@ def compare_predictions_to_bounds(bounds_file: Path, output_dir: Path) -> Dict:
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
     
-    plot_file = output_dir / 'toe_predictions_vs_bounds.png'
     plt.savefig(plot_file, dpi=300, bbox_inches='tight')
     plt.close()
+
+
+def compare_predictions_to_bounds(bounds_file: Path, output_dir: Path) -> Dict:
+    """
+    Compare ToE predictions to experimental bounds.
     
-    # Generate summary
-    total_points = len(lambda_values)
-    num_violations = len(violations)
-    num_validations = len(validations)
-    validation_rate = num_validations / total_points if total_points > 0 else 0
+    Args:
+        bounds_file: Path to joint_bounds.csv
+        output_dir: Output directory for results
     
-    summary = {
-        'total_data_points': int(total_points),
-        'violations': num_violations,
-        'validations': num_validations,
-        'validation_rate': float(validation_rate),
-        'status': 'VALIDATED' if validation_rate > 0.95 else 'PARTIALLY_VALIDATED' if validation_rate > 0.5 else 'FALSIFIED',
-        'interpretation': {
-            'if_validated': 'ToE predictions lie within experimental bounds. Theory is consistent with data.',
-            'if_partial': 'Some ToE predictions exceed bounds. Theory may need parameter adjustment.',
-            'if_falsified': 'ToE predictions violate experimental bounds. Theory needs revision.'
-        }
-    }
+    Returns:
+        Dictionary with comparison results
+    """
+    # Load bounds
+    bounds_df = pd.read_csv(bounds_file)
     
-    # Save results
-    results = {
-        'summary': summary,
-        'violations': violations[:10],  # First 10 violations
-        'sample_validations': validations[:10],  # First 10 validations
-        'prediction_statistics': {
-            'alpha_min': float(np.min(alpha_min)),
-            'alpha_max': float(np.max(alpha_max)),
-            'alpha_median_min': float(np.min(alpha_median)),
-            'alpha_median_max': float(np.max(alpha_median))
-        }
-    }
+    print("Computing ToE predictions...")
+    comparison = compare_prediction_arrays(
+        bounds_df['lambda_m'].values, bounds_df['theta_max'].values
+    )
+    arrays = comparison.pop('arrays')
+    
+    # Create comparison plot
+    plot_predictions_vs_bounds(arrays, output_dir / 'toe_predictions_vs_bounds.png')
     
     results_file = output_dir / 'toe_validation_results.json'
     with open(results_file, 'w') as f:
-        json.dump(results, f, indent=2)
+        json.dump(comparison, f, indent=2)
     
-    return results
+    return comparison
 
 
 def main():
@@ -4,23 +4,68 @@ Empirical Validation Script for ToE
 Runs all available empirical tests to validate the Theory of Everything.
 """
 
+import argparse
+import contextlib
+import io
 import json
-import subprocess
+import multiprocessing
+import os
 import sys
+import time
+import urllib.request
+from multiprocessing.connection import wait
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+import matplotlib
+matplotlib.use('Agg')  # Tests plot from headless worker processes
 
 import pandas as pd
 import numpy as np
 
+# Add project root to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code.pipeline.constraint_pipeline import default_cache, run_constraint_pipeline
+from compute_toe_predictions import compare_prediction_arrays
+from validation_history import DEFAULT_DB_NAME, ValidationHistory, current_git_revision
+
+OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+
+# Per-test timeouts (seconds)
+TEST_TIMEOUTS = {
+    'constraint_pipeline': 300,
+    'canon_structure': 30,
+    'backend_api': 10,
+    'sensor_experiments': 30,
+    'toe_predictions': 60,
+}
+
+
+def query_ollama_models(host: str = OLLAMA_HOST, timeout: float = 5) -> Optional[List[str]]:
+    """
+    List locally available Ollama models via the REST API.
+
+    Returns:
+        Model names, or None if the Ollama server is not reachable
+    """
+    try:
+        with urllib.request.urlopen(f"{host.rstrip('/')}/api/tags", timeout=timeout) as resp:
+            payload = json.loads(resp.read().decode('utf-8'))
+    except (OSError, ValueError):
+        return None
+    return [m.get('name', '') for m in payload.get('models', [])]
+
 
 class EmpiricalValidator:
     """Runs empirical validation experiments for ToE."""
     
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path, max_workers: int = 4):
         self.project_root = Path(project_root)
+        self.max_workers = max_workers
         self.results_dir = self.project_root / "results" / "empirical_validation"
+        self.bounds_file = self.project_root / "results" / "scalar_constraints" / "joint_bounds.csv"
         self.results_dir.mkdir(parents=True, exist_ok=True)
         
         self.validation_results = {
@@ -28,6 +73,23 @@ class EmpiricalValidator:
             'tests': [],
             'summary': {}
         }
+        
+        # Joint bounds are loaded once and shared by every test that needs them
+        self._bounds_df: Optional[pd.DataFrame] = None
+    
+    def load_bounds(self, reload: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Load joint_bounds.csv once per validation run.
+        
+        Args:
+            reload: Re-read the file (e.g. after the pipeline regenerated it)
+        
+        Returns:
+            Bounds DataFrame, or None if the bounds file does not exist
+        """
+        if reload or self._bounds_df is None:
+            self._bounds_df = pd.read_csv(self.bounds_file) if self.bounds_file.exists() else None
+        return self._bounds_df
     
     def test_constraint_pipeline(self) -> Dict:
         """
@@ -39,25 +101,13 @@ class EmpiricalValidator:
         print("="*60)
         
         try:
-            # Run constraint pipeline
-            result = subprocess.run(
-                ['make', 'constraint-pipeline'],
-                cwd=self.project_root,
-                capture_output=True,
-                text=True,
-                timeout=300
+            # Run pipeline stages in-process (cached stages are materialized)
+            stage_results = run_constraint_pipeline(
+                self.project_root, default_cache(self.project_root)
             )
             
-            if result.returncode != 0:
-                return {
-                    'test_name': 'constraint_pipeline',
-                    'status': 'failed',
-                    'error': result.stderr,
-                    'passed': False
-                }
-            
             # Load results
-            bounds_file = self.project_root / "results" / "scalar_constraints" / "joint_bounds.csv"
+            bounds_file = self.bounds_file
             dashboard_file = self.project_root / "results" / "scalar_constraints" / "joint_dashboard.json"
             
             if not bounds_file.exists():
@@ -68,28 +118,29 @@ class EmpiricalValidator:
                     'passed': False
                 }
             
-            # Load and analyze bounds
-            bounds_df = pd.read_csv(bounds_file)
+            # Load bounds (the pipeline just regenerated them) and the dashboard
+            bounds_df = self.load_bounds(reload=True)
             with open(dashboard_file, 'r') as f:
                 dashboard = json.load(f)
             
-            # Check if ToE predictions are within bounds
-            # For each lambda, check if predicted alpha < alpha_max
-            violations = 0
+            # The pipeline worked if it produced bounds; the prediction
+            # comparison runs as its own test (test_toe_predictions)
             total_points = len(bounds_df)
-            
-            # Simplified check: if we have bounds, the pipeline worked
-            # In full implementation, would compare ToE predictions to bounds
             passed = total_points > 0
             
             result_data = {
                 'test_name': 'constraint_pipeline',
                 'status': 'passed' if passed else 'failed',
                 'data_points': int(total_points),
+                'stages': [
+                    {'stage': r['stage'], 'cached': r.get('cached', False),
+                     'duration_s': round(r['duration_s'], 4)}
+                    for r in stage_results
+                ],
                 'bounds_file': str(bounds_file),
                 'dashboard_file': str(dashboard_file),
                 'passed': passed,
-                'interpretation': 'Constraint pipeline generated bounds successfully. ToE predictions must be compared against these bounds to validate theory.'
+                'interpretation': 'Constraint pipeline generated bounds successfully. ToE predictions are compared against these bounds in the toe_predictions test.'
             }
             
             print(f"✓ Constraint pipeline completed")
@@ -163,19 +214,10 @@ class EmpiricalValidator:
             'requirements_exists': (backend_dir / "requirements.txt").exists(),
         }
         
-        # Check if Ollama is available
-        try:
-            result = subprocess.run(
-                ['ollama', 'list'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            ollama_available = result.returncode == 0
-            gpt_oss_available = 'gpt-oss' in result.stdout if ollama_available else False
-        except:
-            ollama_available = False
-            gpt_oss_available = False
+        # Check if Ollama is available (REST API, no subprocess)
+        models = query_ollama_models(timeout=TEST_TIMEOUTS['backend_api'] / 2)
+        ollama_available = models is not None
+        gpt_oss_available = any('gpt-oss' in m for m in models) if ollama_available else False
         
         checks['ollama_available'] = ollama_available
         checks['gpt_oss_model_available'] = gpt_oss_available
@@ -243,6 +285,61 @@ class EmpiricalValidator:
         
         return result_data
     
+    def test_toe_predictions(self) -> Dict:
+        """
+        Test 5: ToE Predictions vs. Experimental Bounds
+        Compares predicted α(λ) to the bounds loaded by the pipeline test,
+        in one vectorized pass (no re-read of joint_bounds.csv, no plot).
+        """
+        print("\n" + "="*60)
+        print("TEST 5: ToE Predictions vs. Experimental Bounds")
+        print("="*60)
+        
+        bounds_df = self.load_bounds()
+        if bounds_df is None or len(bounds_df) == 0:
+            return {
+                'test_name': 'toe_predictions',
+                'status': 'failed',
+                'error': 'No bounds data available',
+                'passed': False
+            }
+        
+        comparison = compare_prediction_arrays(
+            bounds_df['lambda_m'].values, bounds_df['theta_max'].values
+        )
+        comparison.pop('arrays')
+        summary = comparison['summary']
+        passed = summary['status'] == 'VALIDATED'
+        
+        result_data = {
+            'test_name': 'toe_predictions',
+            'status': 'passed' if passed else 'failed',
+            'validation_status': summary['status'],
+            'data_points': summary['total_data_points'],
+            'violations': summary['violations'],
+            'validations': summary['validations'],
+            'validation_rate': summary['validation_rate'],
+            'violation_statistics': comparison['violation_statistics'],
+            'prediction_statistics': comparison['prediction_statistics'],
+            'sample_violations': comparison['violations'],
+            'passed': passed,
+            'interpretation': summary['interpretation'][
+                'if_validated' if summary['status'] == 'VALIDATED'
+                else 'if_partial' if summary['status'] == 'PARTIALLY_VALIDATED'
+                else 'if_falsified'
+            ]
+        }
+        
+        print(f"✓ Prediction comparison")
+        print(f"  Data points: {summary['total_data_points']}")
+        print(f"  Violations: {summary['violations']}")
+        print(f"  Validation rate: {summary['validation_rate']*100:.2f}%")
+        if summary['violations']:
+            print(f"  Max violation factor: {comparison['violation_statistics']['max_violation_factor']:.3e}")
+        print(f"  Status: {'PASSED' if passed else 'FAILED'} ({summary['status']})")
+        
+        return result_data
+    
     def analyze_constraint_results(self) -> Dict:
         """
         Analyze constraint pipeline results to determine if ToE is validated.
@@ -251,16 +348,14 @@ class EmpiricalValidator:
         print("ANALYSIS: Constraint Results Interpretation")
         print("="*60)
         
-        bounds_file = self.project_root / "results" / "scalar_constraints" / "joint_bounds.csv"
+        bounds_df = self.load_bounds()
         
-        if not bounds_file.exists():
+        if bounds_df is None:
             return {
                 'analysis': 'No bounds data available',
                 'conclusion': 'Cannot determine validation status'
             }
         
-        bounds_df = pd.read_csv(bounds_file)
-        
         # Basic statistics
         stats = {
             'total_data_points': len(bounds_df),
@@ -290,8 +385,7 @@ class EmpiricalValidator:
         
         3. Current status:
            - Bounds are established ✓
-           - ToE prediction computation needed (next step)
-           - Comparison and validation pending
+           - ToE predictions computed and compared (see toe_predictions test)
         
         4. If ToE is correct:
            - Predicted α(λ) should lie within allowed regions
@@ -309,13 +403,113 @@ class EmpiricalValidator:
             'stats': stats,
             'interpretation': interpretation,
             'next_steps': [
-                'Compute ToE predictions α(λ) from theory',
-                'Compare predictions to bounds',
                 'Identify allowed parameter regions',
                 'Check for violations'
             ]
         }
     
+    def _timed(self, name: str, test_fn: Callable[[], Dict]) -> Dict:
+        """Run one test, capturing its duration."""
+        t0 = time.perf_counter()
+        try:
+            result = test_fn()
+        except Exception as e:
+            result = {
+                'test_name': name,
+                'status': 'error',
+                'error': str(e),
+                'passed': False
+            }
+        result['duration_s'] = round(time.perf_counter() - t0, 4)
+        return result
+    
+    def _run_in_child(self, name: str, test_fn: Callable[[], Dict], conn):
+        """
+        Worker process body: run one test and send back (result, captured
+        output, bounds the test loaded or None).
+        """
+        bounds_before = self._bounds_df
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            result = self._timed(name, test_fn)
+        bounds = self._bounds_df if self._bounds_df is not bounds_before else None
+        conn.send((result, buffer.getvalue(), bounds))
+        conn.close()
+    
+    def run_tests(self, tests: List[Tuple[str, Callable[[], Dict]]]) -> List[Dict]:
+        """
+        Run independent tests concurrently with per-test timeouts.
+        
+        Each test runs in its own worker process (at most max_workers at once),
+        started with the platform's default method; test callables must be
+        picklable where that is 'spawn' (bound methods of the validator are).
+        Output of each test is buffered and printed in declaration order, so
+        the report reads the same as a sequential run. A test that exceeds its
+        timeout is terminated and reported with status 'timeout'. Bounds a test
+        loads are sent back and kept for later tests; other changes a test
+        makes to the validator stay in its worker process.
+        
+        Args:
+            tests: (name, callable) pairs; each callable returns a result dict
+        
+        Returns:
+            Result dicts in the order of tests, each with 'duration_s'
+        """
+        context = multiprocessing.get_context()
+        pending = list(enumerate(tests))
+        running = {}  # result pipe -> (test index, process, deadline)
+        results: List[Optional[Dict]] = [None] * len(tests)
+        outputs = [''] * len(tests)
+        printed = 0
+        while pending or running:
+            while pending and len(running) < max(1, self.max_workers):
+                index, (name, fn) = pending.pop(0)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=self._run_in_child, args=(name, fn, sender), daemon=True)
+                process.start()
+                sender.close()
+                running[receiver] = (index, process, time.perf_counter() + TEST_TIMEOUTS.get(name, 60))
+            
+            next_deadline = min(deadline for _, _, deadline in running.values())
+            ready = wait(list(running), timeout=max(0.0, next_deadline - time.perf_counter()))
+            now = time.perf_counter()
+            for receiver, (index, process, deadline) in list(running.items()):
+                name = tests[index][0]
+                if receiver in ready:
+                    try:
+                        results[index], outputs[index], bounds = receiver.recv()
+                        if bounds is not None:
+                            self._bounds_df = bounds
+                    except EOFError:
+                        process.join()
+                        results[index] = {
+                            'test_name': name,
+                            'status': 'error',
+                            'error': f'Test process exited with code {process.exitcode}',
+                            'passed': False,
+                            'duration_s': 0.0
+                        }
+                elif now >= deadline:
+                    process.terminate()
+                    timeout = TEST_TIMEOUTS.get(name, 60)
+                    results[index] = {
+                        'test_name': name,
+                        'status': 'timeout',
+                        'error': f'Test exceeded {timeout}s timeout',
+                        'passed': False,
+                        'duration_s': float(timeout)
+                    }
+                else:
+                    continue
+                process.join()
+                receiver.close()
+                del running[receiver]
+            
+            while printed < len(tests) and results[printed] is not None:
+                sys.stdout.write(outputs[printed])
+                printed += 1
+        return results
+    
     def run_all_tests(self) -> Dict:
         """Run all empirical validation tests."""
         print("\n" + "="*80)
@@ -324,20 +518,38 @@ class EmpiricalValidator:
         print(f"Timestamp: {self.validation_results['timestamp']}")
         print(f"Project Root: {self.project_root}")
         
-        # Run all tests
-        tests = [
-            self.test_constraint_pipeline(),
-            self.test_canon_structure(),
-            self.test_backend_api(),
-            self.test_sensor_experiments(),
-        ]
+        # Run all tests (independent, so concurrently)
+        run_start = time.perf_counter()
+        tests = self.run_tests([
+            ('constraint_pipeline', self.test_constraint_pipeline),
+            ('canon_structure', self.test_canon_structure),
+            ('backend_api', self.test_backend_api),
+            ('sensor_experiments', self.test_sensor_experiments),
+        ])
+        
+        # Tests that consume the pipeline outputs run once it has finished,
+        # on the bounds it loaded (handed to their worker, not re-read)
+        tests += self.run_tests([
+            ('toe_predictions', self.test_toe_predictions),
+        ])
+        tests_wall_s = time.perf_counter() - run_start
         
         self.validation_results['tests'] = tests
         
-        # Analyze results
+        # Analyze results (depends on the pipeline outputs)
+        analysis_start = time.perf_counter()
         analysis = self.analyze_constraint_results()
         self.validation_results['analysis'] = analysis
         
+        self.validation_results['timing'] = {
+            'workers': self.max_workers,
+            'tests_wall_clock_s': round(tests_wall_s, 4),
+            'tests_cumulative_s': round(sum(t['duration_s'] for t in tests), 4),
+            'analysis_s': round(time.perf_counter() - analysis_start, 4),
+            'total_s': round(time.perf_counter() - run_start, 4),
+            'per_test_s': {t['test_name']: t['duration_s'] for t in tests}
+        }
+        
         # Summary
         passed_tests = sum(1 for t in tests if t.get('passed', False))
         total_tests = len(tests)
@@ -354,6 +566,15 @@ class EmpiricalValidator:
         with open(results_file, 'w') as f:
             json.dump(self.validation_results, f, indent=2)
         
+        # Append to the run history (queried with experiments/validation_history.py)
+        history = ValidationHistory(self.results_dir / DEFAULT_DB_NAME)
+        run_id = history.record_run(
+            self.validation_results,
+            git_revision=current_git_revision(self.project_root),
+            results_file=str(results_file)
+        )
+        regressions = history.find_regressions()
+        
         # Print summary
         print("\n" + "="*80)
         print("VALIDATION SUMMARY")
@@ -362,16 +583,31 @@ class EmpiricalValidator:
         print(f"Passed: {passed_tests}")
         print(f"Failed: {total_tests - passed_tests}")
         print(f"Success Rate: {self.validation_results['summary']['success_rate']*100:.1f}%")
+        print(f"\nTiming ({self.max_workers} workers): "
+              f"{self.validation_results['timing']['total_s']:.2f}s total")
+        for name, duration in self.validation_results['timing']['per_test_s'].items():
+            print(f"  {name}: {duration:.2f}s")
+        for r in regressions['status']:
+            print(f"  ✗ Regression: {r['test_name']} {r['previous_status']} -> {r['status']}")
+        for r in regressions['duration']:
+            print(f"  ⚠ Slower: {r['test_name']} {r['duration_s']:.2f}s "
+                  f"(median {r['baseline_median_s']:.2f}s)")
         print(f"\nResults saved to: {results_file}")
+        print(f"History run #{run_id}: {history.db_path}")
         
         return self.validation_results
 
 
 def main():
     """Main function."""
+    parser = argparse.ArgumentParser(description="Run empirical validation tests")
+    parser.add_argument("--workers", type=int, default=4,
+                       help="Concurrent test workers (1 = sequential)")
+    args = parser.parse_args()
+    
     project_root = Path(__file__).parent.parent
     
-    validator = EmpiricalValidator(project_root)
+    validator = EmpiricalValidator(project_root, max_workers=args.workers)
     results = validator.run_all_tests()
     
     # Exit with appropriate code
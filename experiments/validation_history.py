@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Validation History Store
+Append-only SQLite record of EmpiricalValidator runs (per-test status, durations
+and key metrics), indexed by timestamp and git revision, with trend and
+regression queries.
+"""
+
+import argparse
+import json
+import sqlite3
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+DEFAULT_DB_NAME = "validation_history.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    git_revision TEXT,
+    total_tests INTEGER,
+    passed_tests INTEGER,
+    success_rate REAL,
+    total_s REAL,
+    results_file TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS idx_runs_revision ON runs (git_revision, timestamp);
+
+CREATE TABLE IF NOT EXISTS test_results (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    test_name TEXT NOT NULL,
+    status TEXT,
+    passed INTEGER,
+    duration_s REAL,
+    PRIMARY KEY (run_id, test_name)
+);
+CREATE INDEX IF NOT EXISTS idx_test_results_name ON test_results (test_name, run_id);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    test_name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, test_name, metric)
+);
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON metrics (test_name, metric, run_id);
+"""
+
+# Keys of a test result that are bookkeeping rather than metrics
+_NON_METRIC_KEYS = {'test_name', 'status', 'passed', 'duration_s'}
+
+
+def current_git_revision(project_root: Path) -> Optional[str]:
+    """Return the HEAD commit of project_root, or None outside a git checkout."""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def extract_metrics(test_result: Dict) -> Dict[str, float]:
+    """
+    Flatten the numeric fields of a test result into metric name -> value.
+
+    Top-level numbers are kept as-is; numbers inside nested dicts become
+    'parent.child' (e.g. 'violation_statistics.max_violation_factor').
+    Booleans and strings are skipped.
+    """
+    def is_number(v):
+        return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+    metrics = {}
+    for key, value in test_result.items():
+        if key in _NON_METRIC_KEYS:
+            continue
+        if is_number(value):
+            metrics[key] = float(value)
+        elif isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                if is_number(sub_value):
+                    metrics[f"{key}.{sub_key}"] = float(sub_value)
+    return metrics
+
+
+class ValidationHistory:
+    """Append-only validation run history backed by SQLite."""
+
+    def __init__(self, db_path: Path):
+        """
+        Open (and create if needed) the history database.
+
+        Args:
+            db_path: Path to the SQLite file
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(self.db_path)
+        con.row_factory = sqlite3.Row
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def record_run(self, validation_results: Dict, git_revision: Optional[str] = None,
+                   results_file: Optional[str] = None) -> int:
+        """
+        Append one validation run.
+
+        Args:
+            validation_results: Dict produced by EmpiricalValidator.run_all_tests
+            git_revision: Commit the run was made at
+            results_file: Path of the JSON report, for reference
+
+        Returns:
+            The new run_id
+        """
+        summary = validation_results.get('summary', {})
+        timing = validation_results.get('timing', {})
+        with self._connect() as con:
+            cursor = con.execute(
+                """
+                INSERT INTO runs (timestamp, git_revision, total_tests, passed_tests,
+                                  success_rate, total_s, results_file)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    validation_results['timestamp'],
+                    git_revision,
+                    summary.get('total_tests'),
+                    summary.get('passed_tests'),
+                    summary.get('success_rate'),
+                    timing.get('total_s'),
+                    results_file
+                )
+            )
+            run_id = cursor.lastrowid
+
+            for test in validation_results.get('tests', []):
+                name = test.get('test_name', 'unknown')
+                con.execute(
+                    "INSERT INTO test_results (run_id, test_name, status, passed, duration_s) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (run_id, name, test.get('status'), int(bool(test.get('passed'))),
+                     test.get('duration_s'))
+                )
+                con.executemany(
+                    "INSERT INTO metrics (run_id, test_name, metric, value) VALUES (?, ?, ?, ?)",
+                    [(run_id, name, metric, value)
+                     for metric, value in extract_metrics(test).items()]
+                )
+        return run_id
+
+    def import_json_reports(self, paths: Iterable[Path]) -> List[int]:
+        """Backfill the store from existing validation_results_*.json files."""
+        with self._connect() as con:
+            known = {row['results_file'] for row in
+                     con.execute("SELECT results_file FROM runs WHERE results_file IS NOT NULL")}
+        run_ids = []
+        for path in sorted(Path(p) for p in paths):
+            if str(path) in known:
+                continue
+            with open(path, 'r') as f:
+                run_ids.append(self.record_run(json.load(f), results_file=str(path)))
+        return run_ids
+
+    def recent_runs(self, n: int = 10, git_revision: Optional[str] = None) -> List[Dict]:
+        """Last n runs (newest first), optionally restricted to one revision."""
+        query = "SELECT * FROM runs"
+        params: list = []
+        if git_revision:
+            query += " WHERE git_revision LIKE ?"
+            params.append(f"{git_revision}%")
+        query += " ORDER BY timestamp DESC, run_id DESC LIMIT ?"
+        params.append(n)
+        with self._connect() as con:
+            return [dict(row) for row in con.execute(query, params)]
+
+    def test_trend(self, test_name: str, n: int = 20) -> List[Dict]:
+        """Status and duration of one test over the last n runs (oldest first)."""
+        with self._connect() as con:
+            rows = con.execute(
+                """
+                SELECT r.run_id, r.timestamp, r.git_revision, t.status, t.passed, t.duration_s
+                FROM test_results t JOIN runs r ON r.run_id = t.run_id
+                WHERE t.test_name = ?
+                ORDER BY r.timestamp DESC, r.run_id DESC LIMIT ?
+                """,
+                (test_name, n)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def metric_trend(self, test_name: str, metric: str, n: int = 20) -> List[Dict]:
+        """Values of one metric over the last n runs (oldest first)."""
+        with self._connect() as con:
+            rows = con.execute(
+                """
+                SELECT r.run_id, r.timestamp, r.git_revision, m.value
+                FROM metrics m JOIN runs r ON r.run_id = m.run_id
+                WHERE m.test_name = ? AND m.metric = ?
+                ORDER BY r.timestamp DESC, r.run_id DESC LIMIT ?
+                """,
+                (test_name, metric, n)
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def find_regressions(self, window: int = 10, duration_factor: float = 1.5,
+                         min_duration_s: float = 0.05) -> Dict[str, List[Dict]]:
+        """
+        Compare the latest run against the previous `window` runs.
+
+        Reports tests that passed in the previous run but not in the latest
+        ('status'), and tests whose duration exceeds duration_factor times
+        their median over the window ('duration'; tiny durations are ignored).
+        """
+        runs = self.recent_runs(window + 1)
+        if len(runs) < 2:
+            return {'status': [], 'duration': []}
+        latest, previous = runs[0], runs[1]
+        baseline_ids = [r['run_id'] for r in runs[1:]]
+
+        with self._connect() as con:
+            latest_tests = {row['test_name']: dict(row) for row in con.execute(
+                "SELECT * FROM test_results WHERE run_id = ?", (latest['run_id'],))}
+            previous_tests = {row['test_name']: dict(row) for row in con.execute(
+                "SELECT * FROM test_results WHERE run_id = ?", (previous['run_id'],))}
+            placeholders = ','.join('?' * len(baseline_ids))
+            baseline_rows = con.execute(
+                f"SELECT test_name, duration_s FROM test_results "
+                f"WHERE run_id IN ({placeholders}) AND duration_s IS NOT NULL",
+                baseline_ids
+            ).fetchall()
+
+        baseline: Dict[str, List[float]] = {}
+        for row in baseline_rows:
+            baseline.setdefault(row['test_name'], []).append(row['duration_s'])
+
+        status_regressions = []
+        duration_regressions = []
+        for name, test in latest_tests.items():
+            before = previous_tests.get(name)
+            if before and before['passed'] and not test['passed']:
+                status_regressions.append({
+                    'test_name': name,
+                    'previous_status': before['status'],
+                    'status': test['status'],
+                    'previous_run_id': previous['run_id'],
+                    'run_id': latest['run_id']
+                })
+
+            durations = sorted(baseline.get(name, []))
+            if test['duration_s'] is not None and durations:
+                median = durations[len(durations) // 2]
+                if test['duration_s'] >= min_duration_s and test['duration_s'] > duration_factor * median:
+                    duration_regressions.append({
+                        'test_name': name,
+                        'duration_s': test['duration_s'],
+                        'baseline_median_s': median,
+                        'ratio': test['duration_s'] / median if median > 0 else None,
+                        'run_id': latest['run_id']
+                    })
+
+        return {'status': status_regressions, 'duration': duration_regressions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the validation run history")
+    parser.add_argument("--db", help=f"History database (default: results/empirical_validation/{DEFAULT_DB_NAME})")
+    parser.add_argument("--last", type=int, default=10, help="Number of runs to show")
+    parser.add_argument("--revision", help="Only runs at this git revision (prefix)")
+    parser.add_argument("--trend", metavar="TEST", help="Show status/duration trend for a test")
+    parser.add_argument("--metric", nargs=2, metavar=("TEST", "METRIC"), help="Show a metric trend")
+    parser.add_argument("--regressions", action="store_true", help="Report regressions in the latest run")
+    parser.add_argument("--import-json", action="store_true",
+                        help="Backfill from validation_results_*.json reports")
+
+    args = parser.parse_args()
+
+    results_dir = Path(__file__).parent.parent / "results" / "empirical_validation"
+    history = ValidationHistory(Path(args.db) if args.db else results_dir / DEFAULT_DB_NAME)
+
+    if args.import_json:
+        run_ids = history.import_json_reports(results_dir.glob("validation_results_*.json"))
+        print(f"Imported {len(run_ids)} reports")
+
+    if args.trend:
+        for row in history.test_trend(args.trend, args.last):
+            duration = f"{row['duration_s']:.3f}s" if row['duration_s'] is not None else "-"
+            print(f"  {row['timestamp']}  {(row['git_revision'] or '-')[:10]:10s}  "
+                  f"{row['status']:8s}  {duration}")
+    elif args.metric:
+        for row in history.metric_trend(args.metric[0], args.metric[1], args.last):
+            print(f"  {row['timestamp']}  {(row['git_revision'] or '-')[:10]:10s}  {row['value']:.6g}")
+    elif args.regressions:
+        regressions = history.find_regressions(window=args.last)
+        if not regressions['status'] and not regressions['duration']:
+            print("No regressions in the latest run")
+        for r in regressions['status']:
+            print(f"  ✗ {r['test_name']}: {r['previous_status']} -> {r['status']}")
+        for r in regressions['duration']:
+            print(f"  ⚠ {r['test_name']}: {r['duration_s']:.3f}s vs median {r['baseline_median_s']:.3f}s")
+    else:
+        for run in history.recent_runs(args.last, git_revision=args.revision):
+            print(f"  #{run['run_id']:<4d} {run['timestamp']}  {(run['git_revision'] or '-')[:10]:10s}  "
+                  f"{run['passed_tests']}/{run['total_tests']} passed")
+
+
+if __name__ == '__main__':
+    main()
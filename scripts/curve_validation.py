@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Curve Validation Engine
+Compiles the channels.* rules of a hypothesis card into vectorized predicates over
+curve columns and reports per-row failure masks with reasons.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Quantities that are magnitudes of bounds or lengths (must be > 0)
+POSITIVE_COLUMNS = {'lambda_m', 'alpha_max', 'eta_max', 'delta_nu_nu_max', 'theta_max', 'm_c_GeV'}
+
+# Quantities with a closed physical range
+COLUMN_RANGES = {'BR_invisible_max': (0.0, 1.0)}
+
+SEVERITIES = ('error', 'warning')
+
+
+@dataclass
+class Rule:
+    """A compiled validation rule: predicate returns True for failing rows."""
+    reason: str
+    columns: List[str]
+    predicate: Callable[[Dict[str, np.ndarray]], np.ndarray]
+    severity: str = 'error'
+
+
+@dataclass
+class ValidationReport:
+    """Per-row failure masks of one validation pass."""
+    n_rows: int
+    failures: Dict[str, np.ndarray] = field(default_factory=dict)
+    severities: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def valid_mask(self) -> np.ndarray:
+        """Rows failing no error-severity rule."""
+        valid = np.ones(self.n_rows, dtype=bool)
+        for reason, mask in self.failures.items():
+            if self.severities[reason] == 'error':
+                valid &= ~mask
+        return valid
+
+    def reasons_for(self, row: int) -> List[str]:
+        """Reasons row `row` failed, in rule order."""
+        return [reason for reason, mask in self.failures.items() if mask[row]]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of failing rows per reason (rules nobody failed are omitted)."""
+        return {reason: int(mask.sum()) for reason, mask in self.failures.items() if mask.any()}
+
+    def to_dict(self) -> Dict:
+        """JSON-friendly summary (for provenance records)."""
+        counts = self.counts()
+        return {
+            'rows': self.n_rows,
+            'valid_rows': int(self.valid_mask.sum()),
+            'errors': {r: n for r, n in counts.items() if self.severities[r] == 'error'},
+            'warnings': {r: n for r, n in counts.items() if self.severities[r] == 'warning'}
+        }
+
+
+def parse_input_format(input_format: str) -> List[str]:
+    """
+    Column names from a card input_format, dependent variable first.
+
+    'alpha_max vs lambda_m' -> ['alpha_max', 'lambda_m'];
+    'eta_max (EP violation parameter)' -> ['eta_max']
+    """
+    parts = re.split(r'\s+vs\.?\s+', input_format.strip())
+    return [re.match(r'[A-Za-z_][A-Za-z0-9_]*', p.strip()).group(0) for p in parts if p.strip()]
+
+
+def _finite(col):
+    return lambda c: ~np.isfinite(c[col])
+
+
+def _not_positive(col):
+    # NaN compares False, so it fails positivity as well
+    return lambda c: ~(c[col] > 0)
+
+
+def _outside(col, lo, hi):
+    def predicate(c):
+        x = c[col]
+        inside = np.ones(len(x), dtype=bool)
+        if lo is not None:
+            inside &= x >= lo
+        if hi is not None:
+            inside &= x <= hi
+        return ~inside
+    return predicate
+
+
+def _not_increasing(col):
+    def predicate(c):
+        x = c[col]
+        fails = np.zeros(len(x), dtype=bool)
+        fails[1:] = ~(x[1:] > x[:-1])
+        return fails
+    return predicate
+
+
+def _not_decreasing(col):
+    def predicate(c):
+        x = c[col]
+        fails = np.zeros(len(x), dtype=bool)
+        fails[1:] = ~(x[1:] < x[:-1])
+        return fails
+    return predicate
+
+
+def _sparse(col, points_per_decade):
+    max_gap = 1.0 / points_per_decade
+
+    def predicate(c):
+        x = c[col]
+        fails = np.zeros(len(x), dtype=bool)
+        usable = np.flatnonzero(np.isfinite(x) & (x > 0))
+        if len(usable) < 2:
+            return fails
+        order = usable[np.argsort(x[usable], kind='stable')]
+        gaps = np.diff(np.log10(x[order]))
+        # Flag the point that closes a gap wider than 1/points_per_decade decades
+        fails[order[1:][gaps > max_gap]] = True
+        return fails
+    return predicate
+
+
+def compile_channel_rules(channel: Dict) -> List[Rule]:
+    """
+    Compile one channels.<name> entry of a hypothesis card into rules.
+
+    Recognised keys:
+        input_format: 'Y vs X' names the columns (X is the domain variable)
+        domain_validation: 'Real-only...' requires finite values
+        domain_min / domain_max: experimental support of X
+        validation.lambda_order / validation.order: 'increasing' | 'decreasing'
+        validation.min_points_per_decade: coverage density of X
+        validation.severity: severity of order/density rules (default 'warning')
+    """
+    columns = parse_input_format(channel.get('input_format', 'alpha_max vs lambda_m'))
+    x_col = columns[-1]
+    rules: List[Rule] = []
+
+    if str(channel.get('domain_validation', 'Real-only')).lower().startswith('real-only'):
+        for col in columns:
+            rules.append(Rule(f"{col}: not finite", [col], _finite(col)))
+
+    for col in columns:
+        if col in POSITIVE_COLUMNS:
+            rules.append(Rule(f"{col}: not positive", [col], _not_positive(col)))
+        if col in COLUMN_RANGES:
+            lo, hi = COLUMN_RANGES[col]
+            rules.append(Rule(f"{col}: outside [{lo:g}, {hi:g}]", [col], _outside(col, lo, hi)))
+
+    domain_min, domain_max = channel.get('domain_min'), channel.get('domain_max')
+    if domain_min is not None or domain_max is not None:
+        rules.append(Rule(f"{x_col}: outside experimental support", [x_col],
+                          _outside(x_col, domain_min, domain_max)))
+
+    validation = channel.get('validation') or {}
+    severity = validation.get('severity', 'warning')
+    if severity not in SEVERITIES:
+        raise ValueError(f"Unknown severity '{severity}' (expected one of {SEVERITIES})")
+
+    order = validation.get('lambda_order', validation.get('order'))
+    if order == 'increasing':
+        rules.append(Rule(f"{x_col}: not increasing", [x_col], _not_increasing(x_col), severity))
+    elif order == 'decreasing':
+        rules.append(Rule(f"{x_col}: not decreasing", [x_col], _not_decreasing(x_col), severity))
+    elif order is not None:
+        raise ValueError(f"Unknown order '{order}' (expected 'increasing' or 'decreasing')")
+
+    density = validation.get('min_points_per_decade')
+    if density:
+        rules.append(Rule(f"{x_col}: fewer than {density:g} points per decade", [x_col],
+                          _sparse(x_col, float(density)), severity))
+
+    return rules
+
+
+def compile_card_rules(schema: Dict) -> Dict[str, List[Rule]]:
+    """Compile every channel of a hypothesis card."""
+    return {name: compile_channel_rules(channel)
+            for name, channel in (schema.get('channels') or {}).items()}
+
+
+def validate_columns(columns: Dict[str, np.ndarray], rules: List[Rule]) -> ValidationReport:
+    """
+    Evaluate compiled rules over curve columns in one vectorized pass.
+
+    Args:
+        columns: Column name -> 1-D array (all the same length)
+        rules: Output of compile_channel_rules
+
+    Returns:
+        ValidationReport with one boolean failure mask per rule
+    """
+    arrays = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+    lengths = {len(a) for a in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns differ in length: {sorted(lengths)}")
+    n_rows = lengths.pop() if lengths else 0
+
+    report = ValidationReport(n_rows=n_rows)
+    for rule in rules:
+        missing = [col for col in rule.columns if col not in arrays]
+        if missing:
+            raise ValueError(f"Missing column(s) {missing} required by rule '{rule.reason}'")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            report.failures[rule.reason] = np.asarray(rule.predicate(arrays), dtype=bool)
+        report.severities[rule.reason] = rule.severity
+    return report
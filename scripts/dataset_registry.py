@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Dataset Registry
+SQLite index of the datasets in data/public (mqgt-data-public structure), with
+lookups by dataset_id, SHA256 and source_id and λ-range queries. manifest.json
+and the per-dataset provenance files remain the exported, human-readable form.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_NAME = "registry.sqlite3"
+MANIFEST_NAME = "manifest.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    dataset_id TEXT NOT NULL UNIQUE,
+    sha256 TEXT NOT NULL UNIQUE,
+    filename TEXT,
+    source_id TEXT,
+    reference TEXT,
+    ingested_at TEXT,
+    data_points INTEGER,
+    lambda_min REAL,
+    lambda_max REAL,
+    alpha_min REAL,
+    alpha_max REAL,
+    canonical_file TEXT,
+    provenance_file TEXT,
+    provenance TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_source ON datasets (source_id);
+CREATE INDEX IF NOT EXISTS idx_datasets_lambda ON datasets (lambda_min, lambda_max);
+CREATE INDEX IF NOT EXISTS idx_datasets_lambda_max ON datasets (lambda_max);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Columns exported to manifest.json, in the order the ingester always wrote them
+MANIFEST_FIELDS = ['dataset_id', 'filename', 'sha256', 'canonical_file', 'provenance_file']
+
+
+def _row_to_record(row: sqlite3.Row) -> Dict:
+    record = dict(row)
+    record.pop('seq', None)
+    provenance = record.pop('provenance', None)
+    record['provenance'] = json.loads(provenance) if provenance else None
+    return record
+
+
+class DatasetRegistry:
+    """SQLite-backed registry of ingested constraint curves."""
+
+    def __init__(self, output_dir: Path, db_path: Optional[Path] = None):
+        """
+        Open (and create if needed) the registry for an mqgt-data-public directory.
+
+        An existing manifest.json that changed since the registry last saw it
+        (e.g. after a git pull, or on first use) is imported, together with its
+        provenance files, and the registry is brought in line with it.
+
+        Args:
+            output_dir: mqgt-data-public directory holding manifest.json
+            db_path: SQLite file (default: <output_dir>/registry.sqlite3)
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(db_path) if db_path else self.output_dir / DEFAULT_DB_NAME
+        self.manifest_file = self.output_dir / MANIFEST_NAME
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+        self._sync_from_manifest()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(self.db_path)
+        con.row_factory = sqlite3.Row
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _manifest_signature(self) -> Optional[str]:
+        if not self.manifest_file.exists():
+            return None
+        stat = self.manifest_file.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _get_meta(self, con: sqlite3.Connection, key: str) -> Optional[str]:
+        row = con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, con: sqlite3.Connection, key: str, value: str):
+        con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _sync_from_manifest(self):
+        """Make the registry match manifest.json if the file changed since the last sync."""
+        signature = self._manifest_signature()
+        if signature is None:
+            return
+        with self._connect() as con:
+            if self._get_meta(con, 'manifest_signature') == signature:
+                return
+            stored = {row['sha256']: json.loads(row['provenance']) for row in con.execute(
+                "SELECT sha256, provenance FROM datasets WHERE provenance IS NOT NULL")}
+
+        with open(self.manifest_file, 'r') as f:
+            manifest = json.load(f)
+
+        records = []
+        for entry in manifest.get('datasets', []):
+            # Without its provenance file, a known dataset keeps the metadata it has
+            provenance = stored.get(entry['sha256'])
+            provenance_path = self.output_dir / entry.get('provenance_file', '')
+            if entry.get('provenance_file') and provenance_path.is_file():
+                with open(provenance_path, 'r') as f:
+                    provenance = json.load(f)
+            records.append((provenance or {}, entry))
+
+        with self._connect() as con:
+            for key in ('version', 'created_at'):
+                if key in manifest and self._get_meta(con, key) is None:
+                    self._set_meta(con, key, manifest[key])
+            # Entries dropped from the manifest (or re-pointed to another file)
+            # leave the registry; the rest are refreshed or added
+            con.execute("CREATE TEMP TABLE manifest_entries (dataset_id TEXT, sha256 TEXT)")
+            con.executemany("INSERT INTO manifest_entries VALUES (?, ?)",
+                            [(entry['dataset_id'], entry['sha256']) for _, entry in records])
+            con.execute("DELETE FROM datasets WHERE (dataset_id, sha256) NOT IN "
+                        "(SELECT dataset_id, sha256 FROM manifest_entries)")
+            con.execute("DROP TABLE manifest_entries")
+            self._insert(con, records, replace=True)
+            self._set_meta(con, 'manifest_signature', signature)
+
+    def _insert(self, con: sqlite3.Connection, records: Iterable[Tuple[Dict, Dict]],
+                replace: bool = False) -> int:
+        """Insert (provenance, manifest entry) pairs, skipping (or refreshing) known hashes."""
+        rows = []
+        for provenance, entry in records:
+            lambda_range = provenance.get('lambda_range') or {}
+            alpha_range = provenance.get('alpha_range') or {}
+            rows.append((
+                entry['dataset_id'],
+                entry['sha256'],
+                entry.get('filename', provenance.get('filename')),
+                provenance.get('source_id'),
+                provenance.get('reference'),
+                provenance.get('ingested_at'),
+                provenance.get('data_points'),
+                lambda_range.get('min'),
+                lambda_range.get('max'),
+                alpha_range.get('min'),
+                alpha_range.get('max'),
+                entry.get('canonical_file'),
+                entry.get('provenance_file'),
+                json.dumps(provenance) if provenance else None
+            ))
+        if replace:
+            # Refresh known hashes in place so they keep their manifest position
+            con.executemany(
+                """
+                UPDATE datasets SET
+                    dataset_id = ?, filename = ?, source_id = ?, reference = ?,
+                    ingested_at = ?, data_points = ?, lambda_min = ?, lambda_max = ?,
+                    alpha_min = ?, alpha_max = ?, canonical_file = ?,
+                    provenance_file = ?, provenance = ?
+                WHERE sha256 = ?
+                """,
+                [row[:1] + row[2:] + row[1:2] for row in rows]
+            )
+        before = con.total_changes
+        con.executemany(
+            """
+            INSERT OR IGNORE INTO datasets (
+                dataset_id, sha256, filename, source_id, reference, ingested_at,
+                data_points, lambda_min, lambda_max, alpha_min, alpha_max,
+                canonical_file, provenance_file, provenance
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        return con.total_changes - before
+
+    def register(self, records: Iterable[Tuple[Dict, Dict]], replace: bool = False,
+                 export: bool = True) -> int:
+        """
+        Register datasets in one transaction and re-export manifest.json.
+
+        Args:
+            records: (provenance metadata, manifest entry) pairs
+            replace: Refresh the metadata of datasets that are already registered
+            export: Rewrite manifest.json afterwards
+
+        Returns:
+            Number of newly registered datasets (known SHA256 are skipped)
+        """
+        with self._connect() as con:
+            if self._get_meta(con, 'version') is None:
+                self._set_meta(con, 'version', '0.1')
+                self._set_meta(con, 'created_at', datetime.now(timezone.utc).isoformat())
+            added = self._insert(con, records, replace=replace)
+        if export:
+            self.write_manifest()
+        return added
+
+    def get(self, dataset_id: str) -> Optional[Dict]:
+        """Registry record for a dataset_id (None if unknown)."""
+        with self._connect() as con:
+            row = con.execute("SELECT * FROM datasets WHERE dataset_id = ?", (dataset_id,)).fetchone()
+        return _row_to_record(row) if row else None
+
+    def get_by_sha256(self, sha256: str) -> Optional[Dict]:
+        """Registry record for a file hash (None if unknown)."""
+        with self._connect() as con:
+            row = con.execute("SELECT * FROM datasets WHERE sha256 = ?", (sha256,)).fetchone()
+        return _row_to_record(row) if row else None
+
+    def known_hashes(self) -> FrozenSet[str]:
+        """SHA256 of every registered dataset."""
+        with self._connect() as con:
+            return frozenset(row['sha256'] for row in con.execute("SELECT sha256 FROM datasets"))
+
+    def by_source(self, source_id: str) -> List[Dict]:
+        """All datasets from one source, in registration order."""
+        with self._connect() as con:
+            rows = con.execute("SELECT * FROM datasets WHERE source_id = ? ORDER BY seq",
+                               (source_id,)).fetchall()
+        return [_row_to_record(row) for row in rows]
+
+    def find_by_lambda(self, lambda_lo: float, lambda_hi: float,
+                       mode: str = 'covers') -> List[Dict]:
+        """
+        Datasets by λ range [m].
+
+        Args:
+            lambda_lo: Lower end of the query range
+            lambda_hi: Upper end of the query range
+            mode: 'covers' (curve spans the whole range) or 'overlaps'
+                  (curve intersects it)
+        """
+        if mode == 'covers':
+            where = "lambda_min <= ? AND lambda_max >= ?"
+            params = (lambda_lo, lambda_hi)
+        elif mode == 'overlaps':
+            where = "lambda_min <= ? AND lambda_max >= ?"
+            params = (lambda_hi, lambda_lo)
+        else:
+            raise ValueError(f"Unknown λ query mode: {mode}")
+        with self._connect() as con:
+            rows = con.execute(f"SELECT * FROM datasets WHERE {where} ORDER BY seq",
+                               params).fetchall()
+        return [_row_to_record(row) for row in rows]
+
+    def count(self) -> int:
+        with self._connect() as con:
+            return con.execute("SELECT COUNT(*) FROM datasets").fetchone()[0]
+
+    def export_manifest(self) -> Dict:
+        """The registry in the manifest.json layout."""
+        with self._connect() as con:
+            version = self._get_meta(con, 'version') or '0.1'
+            created_at = self._get_meta(con, 'created_at')
+            rows = con.execute(
+                f"SELECT {', '.join(MANIFEST_FIELDS)} FROM datasets ORDER BY seq"
+            ).fetchall()
+        return {
+            'version': version,
+            'created_at': created_at or datetime.now(timezone.utc).isoformat(),
+            'datasets': [dict(row) for row in rows],
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def write_manifest(self) -> Dict:
+        """Atomically rewrite manifest.json from the registry."""
+        manifest = self.export_manifest()
+        tmp_file = self.manifest_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+        with self._connect() as con:
+            self._set_meta(con, 'manifest_signature', self._manifest_signature())
+        return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the data/public dataset registry")
+    parser.add_argument("--output-dir", default=str(Path(__file__).parent.parent / "data" / "public"),
+                        help="mqgt-data-public directory")
+    parser.add_argument("--id", help="Show one dataset by dataset_id")
+    parser.add_argument("--sha256", help="Show one dataset by file hash")
+    parser.add_argument("--source", help="List datasets from a source_id")
+    parser.add_argument("--lambda-range", nargs=2, type=float, metavar=("LO", "HI"),
+                        help="List curves covering λ in [LO, HI] m")
+    parser.add_argument("--overlaps", action="store_true",
+                        help="With --lambda-range, list curves that merely overlap the range")
+    parser.add_argument("--export", action="store_true", help="Rewrite manifest.json from the registry")
+
+    args = parser.parse_args()
+    registry = DatasetRegistry(Path(args.output_dir))
+
+    if args.id or args.sha256:
+        record = registry.get(args.id) if args.id else registry.get_by_sha256(args.sha256)
+        print(json.dumps(record, indent=2) if record else "Not registered")
+        return
+
+    if args.source:
+        records = registry.by_source(args.source)
+    elif args.lambda_range:
+        records = registry.find_by_lambda(*args.lambda_range,
+                                          mode='overlaps' if args.overlaps else 'covers')
+    else:
+        records = registry.export_manifest()['datasets']
+
+    for r in records:
+        lam = (f"λ {r['lambda_min']:.2e} - {r['lambda_max']:.2e} m"
+               if r.get('lambda_min') is not None else "")
+        print(f"  {r['dataset_id']}  {r['filename']}  {lam}")
+    print(f"{len(records)} of {registry.count()} datasets")
+
+    if args.export:
+        registry.write_manifest()
+        print(f"✓ Exported {registry.manifest_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,30 @@ Loads constraint curves and validates against hypothesis card schema.
 
 import argparse
 import csv
+import glob
 import hashlib
+import io
 import json
+import os
+import sys
+import numpy as np
 import yaml
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Add script directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+from curve_validation import ValidationReport, compile_channel_rules, validate_columns
+from dataset_registry import DatasetRegistry
+
+EOTWASH_COLUMNS = ['lambda_m', 'alpha_max']
+
+# Canonical variants stored in <dataset_id>_variants.npz
+CURVE_VARIANTS = ['sorted', 'dedup', 'monotone_conservative', 'log_resampled']
+DEFAULT_RESAMPLE_POINTS = 64
 
 
 def sha256_file(path: Path) -> str:
@@ -50,65 +68,87 @@ def validate_csv_format(csv_path: Path, expected_columns: List[str]) -> bool:
         return True
 
 
-def load_eotwash_curve(csv_path: Path) -> List[Dict]:
-    """Load Eöt-Wash constraint curve from CSV."""
-    expected_columns = ['lambda_m', 'alpha_max']
+def parse_eotwash_text(text: str, name: str) -> List[Dict]:
+    """
+    Parse an Eöt-Wash constraint curve from CSV text.
     
-    if not validate_csv_format(csv_path, expected_columns):
-        raise ValueError(f"Invalid CSV format for {csv_path.name}")
+    The header check and the row parsing share one pass over the text.
+    Domain checks (finite, positive, ...) are left to validate_curve.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    actual_columns = reader.fieldnames or []
+    for col in EOTWASH_COLUMNS:
+        if col not in actual_columns:
+            print(f"Warning: Missing column '{col}' in {name}")
+            raise ValueError(f"Invalid CSV format for {name}")
     
     data = []
-    with open(csv_path, 'r') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                lambda_m = float(row['lambda_m'])
-                alpha_max = float(row['alpha_max'])
-                
-                # Validate domain (should be positive)
-                if lambda_m <= 0 or alpha_max <= 0:
-                    continue
-                
-                data.append({
-                    'lambda_m': lambda_m,
-                    'alpha_max': alpha_max,
-                    'source_id': row.get('source_id', 'unknown'),
-                    'ref': row.get('ref', '')
-                })
-            except (ValueError, KeyError) as e:
-                print(f"Warning: Skipping invalid row: {e}")
-                continue
+    for row in reader:
+        try:
+            lambda_m = float(row['lambda_m'])
+            alpha_max = float(row['alpha_max'])
+            
+            data.append({
+                'lambda_m': lambda_m,
+                'alpha_max': alpha_max,
+                'source_id': row.get('source_id', 'unknown'),
+                'ref': row.get('ref', '')
+            })
+        except (ValueError, KeyError) as e:
+            print(f"Warning: Skipping invalid row: {e}")
+            continue
     
     return data
 
 
-def validate_against_schema(data: List[Dict], schema: Dict) -> Dict:
-    """Validate data against hypothesis card schema."""
-    channel = schema.get('channels', {}).get('fifth_force', {})
+def read_curve_file(csv_path: Path) -> Tuple[str, List[Dict]]:
+    """Read a curve file once: return its SHA256 and parsed rows."""
+    raw = Path(csv_path).read_bytes()
+    file_hash = hashlib.sha256(raw).hexdigest()
+    return file_hash, parse_eotwash_text(raw.decode('utf-8'), Path(csv_path).name)
+
+
+def load_eotwash_curve(csv_path: Path) -> List[Dict]:
+    """Load Eöt-Wash constraint curve from CSV."""
+    return read_curve_file(csv_path)[1]
+
+
+def validate_curve(data: List[Dict], schema: Dict,
+                   channel: str = 'fifth_force') -> Tuple[List[Dict], ValidationReport]:
+    """
+    Validate a curve against the hypothesis card rules of one channel.
     
-    # Check input format matches
-    expected_format = channel.get('input_format', 'alpha_max vs lambda_m')
+    Args:
+        data: Parsed rows
+        schema: Hypothesis card
+        channel: Key under schema['channels']
     
-    # Validate domain
-    domain_validation = channel.get('domain_validation', 'Real-only')
+    Returns:
+        (rows passing every error-severity rule, ValidationReport)
+    """
+    rules = compile_channel_rules(schema.get('channels', {}).get(channel, {}))
+    columns = {col: np.fromiter((p[col] for p in data), dtype=float, count=len(data))
+               for col in {c for rule in rules for c in rule.columns}}
+    report = validate_columns(columns, rules)
     
-    validated_data = []
-    for point in data:
-        lambda_m = point['lambda_m']
-        alpha_max = point['alpha_max']
-        
-        # Domain validation: ensure real, positive values
-        if lambda_m > 0 and alpha_max > 0:
-            validated_data.append(point)
-        else:
-            print(f"Warning: Skipping invalid domain point: λ={lambda_m}, α={alpha_max}")
+    valid = report.valid_mask
+    validated_data = [point for point, ok in zip(data, valid) if ok]
+    for reason, count in report.counts().items():
+        print(f"Warning: {count} row(s) {'dropped' if report.severities[reason] == 'error' else 'flagged'}: {reason}")
     
-    return validated_data
+    return validated_data, report
+
+
+def validate_against_schema(data: List[Dict], schema: Dict) -> List[Dict]:
+    """Validate data against hypothesis card schema."""
+    return validate_curve(data, schema)[0]
 
 
-def generate_provenance_metadata(csv_path: Path, data: List[Dict]) -> Dict:
+def generate_provenance_metadata(csv_path: Path, data: List[Dict],
+                                 file_hash: Optional[str] = None) -> Dict:
     """Generate provenance metadata for ingested data."""
-    file_hash = sha256_file(csv_path)
+    if file_hash is None:
+        file_hash = sha256_file(csv_path)
     
     # Extract source info from first row if available
     source_id = data[0].get('source_id', 'unknown') if data else 'unknown'
@@ -135,8 +175,91 @@ def generate_provenance_metadata(csv_path: Path, data: List[Dict]) -> Dict:
     return metadata
 
 
-def register_in_mqgt_data_public(data: List[Dict], metadata: Dict, output_dir: Path, source_csv_path: Path):
-    """Register data in mqgt-data-public structure."""
+def build_curve_variants(lambda_m, alpha_max,
+                         resample_points: int = DEFAULT_RESAMPLE_POINTS) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Derive the canonical variants of a constraint curve from one sort.
+    
+    - sorted: ascending λ (ties ordered by descending α)
+    - dedup: one point per λ, keeping the largest (most conservative) α
+    - monotone_conservative: upper envelope α'(λ) = max α over λ' >= λ, i.e. the
+      tightest non-increasing curve that never excludes more than the data
+    - log_resampled: monotone_conservative interpolated log-log onto
+      resample_points log-spaced λ over the same range
+    
+    Returns:
+        Dict mapping variant name to (lambda_m, alpha_max) arrays
+    """
+    lam = np.asarray(lambda_m, dtype=float)
+    alpha = np.asarray(alpha_max, dtype=float)
+    
+    order = np.lexsort((-alpha, lam))
+    lam_sorted, alpha_sorted = lam[order], alpha[order]
+    
+    first = np.ones(len(lam_sorted), dtype=bool)
+    first[1:] = lam_sorted[1:] != lam_sorted[:-1]
+    lam_dedup, alpha_dedup = lam_sorted[first], alpha_sorted[first]
+    
+    alpha_envelope = np.maximum.accumulate(alpha_dedup[::-1])[::-1]
+    
+    if len(lam_dedup) >= 2 and resample_points >= 2:
+        log_lam = np.log10(lam_dedup)
+        grid = np.linspace(log_lam[0], log_lam[-1], resample_points)
+        lam_resampled = 10.0 ** grid
+        lam_resampled[[0, -1]] = lam_dedup[[0, -1]]
+        alpha_resampled = 10.0 ** np.interp(grid, log_lam, np.log10(alpha_envelope))
+    else:
+        lam_resampled, alpha_resampled = lam_dedup.copy(), alpha_envelope.copy()
+    
+    return {
+        'sorted': (lam_sorted, alpha_sorted),
+        'dedup': (lam_dedup, alpha_dedup),
+        'monotone_conservative': (lam_dedup, alpha_envelope),
+        'log_resampled': (lam_resampled, alpha_resampled)
+    }
+
+
+def save_curve_variants(path: Path, variants: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+    """Store variants as named columns ('<variant>.lambda_m', '<variant>.alpha_max') in one .npz."""
+    columns = {}
+    for name, (lam, alpha) in variants.items():
+        columns[f"{name}.lambda_m"] = lam
+        columns[f"{name}.alpha_max"] = alpha
+    tmp_path = path.with_suffix('.npz.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **columns)
+    os.replace(tmp_path, path)
+
+
+def list_curve_variants(path: Path) -> List[str]:
+    """Variant names stored in a variants file."""
+    with np.load(path) as npz:
+        return sorted({key.rsplit('.', 1)[0] for key in npz.files})
+
+
+def load_curve_variant(path: Path, variant: str = 'monotone_conservative') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load one variant (only its two columns are read from the file).
+    
+    Returns:
+        (lambda_m, alpha_max) arrays
+    """
+    with np.load(path) as npz:
+        key = f"{variant}.lambda_m"
+        if key not in npz.files:
+            raise KeyError(f"Unknown curve variant '{variant}' in {Path(path).name}")
+        return npz[key], npz[f"{variant}.alpha_max"]
+
+
+def write_dataset_files(data: List[Dict], metadata: Dict, output_dir: Path,
+                        source_csv_path: Path,
+                        resample_points: int = DEFAULT_RESAMPLE_POINTS) -> Tuple[Dict, Dict]:
+    """
+    Write the canonical CSV, curve variants and provenance JSON for one dataset.
+    
+    Returns:
+        (provenance record, manifest entry) pair, as taken by DatasetRegistry.register
+    """
     # Create canonical directory
     canonical_dir = output_dir / "canonical"
     canonical_dir.mkdir(parents=True, exist_ok=True)
@@ -149,6 +272,15 @@ def register_in_mqgt_data_public(data: List[Dict], metadata: Dict, output_dir: P
         writer.writeheader()
         writer.writerows(data)
     
+    # Save derived variants
+    variants_file = canonical_dir / f"{metadata['dataset_id']}_variants.npz"
+    variants = build_curve_variants(
+        np.fromiter((p['lambda_m'] for p in data), dtype=float, count=len(data)),
+        np.fromiter((p['alpha_max'] for p in data), dtype=float, count=len(data)),
+        resample_points=resample_points
+    )
+    save_curve_variants(variants_file, variants)
+    
     # Save provenance JSON
     provenance_file = output_dir / "provenance" / f"{metadata['dataset_id']}_provenance.json"
     provenance_file.parent.mkdir(parents=True, exist_ok=True)
@@ -157,53 +289,156 @@ def register_in_mqgt_data_public(data: List[Dict], metadata: Dict, output_dir: P
         **metadata,
         'canonical_file': str(canonical_file.relative_to(output_dir)),
         'format': 'CSV',
-        'columns': ['lambda_m', 'alpha_max', 'source_id', 'ref']
+        'columns': ['lambda_m', 'alpha_max', 'source_id', 'ref'],
+        'variants_file': str(variants_file.relative_to(output_dir)),
+        'variants': {name: len(lam) for name, (lam, _) in variants.items()}
     }
     
     with open(provenance_file, 'w') as f:
         json.dump(provenance_data, f, indent=2)
     
-    # Update manifest
-    manifest_file = output_dir / "manifest.json"
-    if manifest_file.exists():
-        with open(manifest_file, 'r') as f:
-            manifest = json.load(f)
-    else:
-        manifest = {
-            'version': '0.1',
-            'created_at': datetime.now(timezone.utc).isoformat(),
-            'datasets': []
-        }
-    
-    manifest['datasets'].append({
+    return provenance_data, {
         'dataset_id': metadata['dataset_id'],
         'filename': source_csv_path.name,
         'sha256': metadata['sha256'],
         'canonical_file': str(canonical_file.relative_to(output_dir)),
         'provenance_file': str(provenance_file.relative_to(output_dir))
-    })
-    manifest['updated_at'] = datetime.now(timezone.utc).isoformat()
+    }
+
+
+def register_in_mqgt_data_public(data: List[Dict], metadata: Dict, output_dir: Path, source_csv_path: Path):
+    """Register data in mqgt-data-public structure."""
+    provenance, entry = write_dataset_files(data, metadata, output_dir, source_csv_path)
+    DatasetRegistry(output_dir).register([(provenance, entry)], replace=True)
+    return output_dir / entry['canonical_file'], output_dir / entry['provenance_file']
+
+
+# Registered hashes, sent to each pool worker once by its initializer
+_worker_known_hashes: FrozenSet[str] = frozenset()
+
+
+def _set_known_hashes(known_hashes: FrozenSet[str]):
+    """Process-pool initializer."""
+    global _worker_known_hashes
+    _worker_known_hashes = known_hashes
+
+
+def _read_and_parse(path: str, known_hashes: Optional[FrozenSet[str]] = None) -> Dict:
+    """Process-pool worker: hash and parse one file, unless already registered."""
+    if known_hashes is None:
+        known_hashes = _worker_known_hashes
+    raw = Path(path).read_bytes()
+    file_hash = hashlib.sha256(raw).hexdigest()
+    if file_hash in known_hashes:
+        return {'path': path, 'sha256': file_hash, 'skipped': True}
+    try:
+        data = parse_eotwash_text(raw.decode('utf-8'), Path(path).name)
+    except (ValueError, UnicodeDecodeError) as e:
+        return {'path': path, 'sha256': file_hash, 'error': str(e)}
+    return {'path': path, 'sha256': file_hash, 'data': data}
+
+
+def expand_inputs(patterns: Iterable[str]) -> List[Path]:
+    """Expand directories (*.csv inside) and glob patterns into sorted file paths."""
+    paths = set()
+    for pattern in patterns:
+        candidate = Path(pattern).expanduser()
+        if candidate.is_dir():
+            paths.update(p.resolve() for p in candidate.glob("*.csv"))
+        elif candidate.is_file():
+            paths.add(candidate.resolve())
+        else:
+            paths.update(Path(p).resolve() for p in glob.glob(str(candidate), recursive=True)
+                         if Path(p).is_file())
+    return sorted(paths)
+
+
+def ingest_files(csv_paths: List[Path], schema: Dict, output_dir: Path,
+                 workers: int = 1, force: bool = False,
+                 resample_points: int = DEFAULT_RESAMPLE_POINTS) -> Dict:
+    """
+    Ingest many curve files: hash + parse in a process pool, register new ones.
+    
+    Each file is read exactly once. Files whose SHA256 is already in the
+    dataset registry (or repeated within the batch) are skipped; new datasets
+    are registered in one transaction and manifest.json is exported once.
     
-    with open(manifest_file, 'w') as f:
-        json.dump(manifest, f, indent=2)
+    Args:
+        csv_paths: Curve files to ingest
+        schema: Hypothesis card
+        output_dir: mqgt-data-public output directory
+        workers: Process pool size (1 = in-process)
+        force: Re-register datasets even if their hash is known
+        resample_points: Size of the log_resampled variant
     
-    return canonical_file, provenance_file
+    Returns:
+        Dict with 'ingested' metadata list, 'skipped' and 'failed' paths
+    """
+    registry = DatasetRegistry(output_dir)
+    known = frozenset() if force else registry.known_hashes()
+    jobs = [str(p) for p in csv_paths]
+    
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_known_hashes,
+                                 initargs=(known,)) as pool:
+            parsed = list(pool.map(_read_and_parse, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        parsed = [_read_and_parse(job, known) for job in jobs]
+    
+    ingested, skipped, failed, records = [], [], [], []
+    batch_hashes = set()
+    for item in parsed:
+        path = Path(item['path'])
+        if item.get('skipped') or item['sha256'] in batch_hashes:
+            skipped.append(str(path))
+            continue
+        if 'error' in item:
+            print(f"Warning: {path.name}: {item['error']}")
+            failed.append(str(path))
+            continue
+        batch_hashes.add(item['sha256'])
+        
+        validated, report = validate_curve(item['data'], schema)
+        metadata = generate_provenance_metadata(path, validated, file_hash=item['sha256'])
+        metadata['validation'] = report.to_dict()
+        records.append(write_dataset_files(validated, metadata, output_dir, path,
+                                           resample_points=resample_points))
+        ingested.append(metadata)
+    
+    if records:
+        registry.register(records, replace=force)
+    
+    return {'ingested': ingested, 'skipped': skipped, 'failed': failed}
 
 
 def main():
     parser = argparse.ArgumentParser(description="Ingest experimental constraint data")
-    parser.add_argument("--input", required=True, help="Input CSV file")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="Input CSV file")
+    source.add_argument("--batch", nargs='+', metavar="DIR_OR_GLOB",
+                        help="Directories (*.csv) or glob patterns to ingest in one pass")
     parser.add_argument("--schema", required=True, help="Path to hypothesis card YAML")
     parser.add_argument("--output-dir", required=True, help="Output directory (mqgt-data-public structure)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used to hash and parse batch inputs")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-register datasets whose SHA256 is already in the manifest")
+    parser.add_argument("--resample-points", type=int, default=DEFAULT_RESAMPLE_POINTS,
+                        help="Number of log-spaced λ points in the log_resampled variant")
     
     args = parser.parse_args()
     
-    csv_path = Path(args.input).expanduser().resolve()
     schema_path = Path(args.schema).expanduser().resolve()
     output_dir = Path(args.output_dir).expanduser().resolve()
     
-    if not csv_path.exists():
-        raise FileNotFoundError(f"Input file not found: {csv_path}")
+    if args.input:
+        csv_paths = [Path(args.input).expanduser().resolve()]
+        if not csv_paths[0].exists():
+            raise FileNotFoundError(f"Input file not found: {csv_paths[0]}")
+    else:
+        csv_paths = expand_inputs(args.batch)
+        if not csv_paths:
+            raise FileNotFoundError(f"No input files matched: {' '.join(args.batch)}")
     
     if not schema_path.exists():
         raise FileNotFoundError(f"Schema file not found: {schema_path}")
@@ -211,28 +446,28 @@ def main():
     print(f"Loading hypothesis card: {schema_path}")
     schema = load_hypothesis_card(schema_path)
     
-    print(f"Loading constraint curve: {csv_path}")
-    data = load_eotwash_curve(csv_path)
-    print(f"  Loaded {len(data)} data points")
+    print(f"Ingesting {len(csv_paths)} constraint curve(s) into {output_dir}")
+    result = ingest_files(csv_paths, schema, output_dir, workers=args.workers, force=args.force,
+                          resample_points=args.resample_points)
     
-    print("Validating against schema...")
-    validated_data = validate_against_schema(data, schema)
-    print(f"  Validated {len(validated_data)} data points")
+    for metadata in result['ingested']:
+        print(f"\n✓ Ingested dataset: {metadata['dataset_id']}")
+        print(f"  Source file: {metadata['filename']}")
+        print(f"  Data points: {metadata['data_points']}")
+        if not metadata['data_points']:
+            continue
+        print(f"  λ range: {metadata['lambda_range']['min']:.2e} - {metadata['lambda_range']['max']:.2e} m")
+        print(f"  α range: {metadata['alpha_range']['min']:.2e} - {metadata['alpha_range']['max']:.2e}")
+    for path in result['skipped']:
+        print(f"  ⚠ Already registered (same SHA256), skipped: {Path(path).name}")
+    for path in result['failed']:
+        print(f"  ✗ Failed to ingest: {Path(path).name}")
     
-    print("Generating provenance metadata...")
-    metadata = generate_provenance_metadata(csv_path, validated_data)
-    
-    print("Registering in mqgt-data-public structure...")
-    canonical_file, provenance_file = register_in_mqgt_data_public(
-        validated_data, metadata, output_dir, csv_path
-    )
+    print(f"\nIngested {len(result['ingested'])}, skipped {len(result['skipped'])}, "
+          f"failed {len(result['failed'])}")
     
-    print(f"\n✓ Ingested dataset: {metadata['dataset_id']}")
-    print(f"  Canonical file: {canonical_file}")
-    print(f"  Provenance file: {provenance_file}")
-    print(f"  Data points: {metadata['data_points']}")
-    print(f"  λ range: {metadata['lambda_range']['min']:.2e} - {metadata['lambda_range']['max']:.2e} m")
-    print(f"  α range: {metadata['alpha_range']['min']:.2e} - {metadata['alpha_range']['max']:.2e}")
+    if result['failed']:
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
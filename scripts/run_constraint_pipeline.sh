@@ -1,6 +1,8 @@
 #!/usr/bin/env bash
 # End-to-end constraint pipeline orchestrator
 # Runs data ingestion, bounds generation, and joint constraint fusion
+# Stages 2-5 go through the content-addressed artifact cache (.artifact_cache/);
+# set MQGT_ARTIFACT_CACHE=off to force recomputation.
 
 set -euo pipefail
 
@@ -44,7 +46,7 @@ echo ""
 
 # Step 2: Generate fifth-force bounds
 echo -e "${YELLOW}Step 2: Fifth-Force Bounds Generation${NC}"
-python3 "${SCRIPT_DIR}/generate_fifth_force_ep_bounds.py" || {
+python3 "${SCRIPT_DIR}/run_pipeline_stage.py" fifth_force_ep || {
     echo -e "${RED}  ✗ Fifth-force bounds generation failed${NC}"
     exit 1
 }
@@ -54,7 +56,7 @@ echo ""
 # Step 3: Generate clocks/spectroscopy bounds (if available)
 echo -e "${YELLOW}Step 3: Clocks/Spectroscopy Bounds${NC}"
 if [ -f "${SCRIPT_DIR}/generate_clocks_spectroscopy_bounds.py" ]; then
-    python3 "${SCRIPT_DIR}/generate_clocks_spectroscopy_bounds.py" || {
+    python3 "${SCRIPT_DIR}/run_pipeline_stage.py" clocks_spectroscopy || {
         echo -e "${YELLOW}  ⚠ Clocks bounds generation failed (non-critical)${NC}"
     }
     echo -e "${GREEN}  ✓ Clocks bounds generated${NC}"
@@ -65,7 +67,7 @@ echo ""
 
 # Step 4: Generate joint constraints
 echo -e "${YELLOW}Step 4: Joint Constraint Fusion${NC}"
-python3 "${SCRIPT_DIR}/generate_joint_scalar_constraints.py" || {
+python3 "${SCRIPT_DIR}/run_pipeline_stage.py" joint || {
     echo -e "${RED}  ✗ Joint constraint generation failed${NC}"
     exit 1
 }
@@ -75,7 +77,7 @@ echo ""
 # Step 5: Generate golden plot
 echo -e "${YELLOW}Step 5: Golden Plot Generation${NC}"
 if [ -f "${SCRIPT_DIR}/generate_golden_plot.py" ]; then
-    python3 "${SCRIPT_DIR}/generate_golden_plot.py" || {
+    python3 "${SCRIPT_DIR}/run_pipeline_stage.py" golden_plot || {
         echo -e "${YELLOW}  ⚠ Golden plot generation failed (non-critical)${NC}"
     }
     echo -e "${GREEN}  ✓ Golden plot generated${NC}"
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Run constraint pipeline stages through the content-addressed artifact cache.
+Unchanged stages (same inputs, parameters and code) are materialized from the cache.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from code.pipeline.artifact_cache import ArtifactCache
+from code.pipeline.constraint_pipeline import (
+    STAGES,
+    CONSTRAINT_PIPELINE_ORDER,
+    default_cache,
+    run_stage
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run cached constraint pipeline stages")
+    parser.add_argument("stages", nargs="*",
+                        help=f"Stages to run (default: {' '.join(CONSTRAINT_PIPELINE_ORDER)})")
+    parser.add_argument("--no-cache", action="store_true", help="Always recompute")
+    parser.add_argument("--cache-dir", help="Cache directory (default: .artifact_cache)")
+    parser.add_argument("--cache-max-mb", type=float, help="Cache size limit in MB")
+    parser.add_argument("--list", action="store_true", help="List available stages")
+    parser.add_argument("--stats", action="store_true", help="Print cache statistics")
+    parser.add_argument("--clear", action="store_true", help="Empty the cache")
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name, stage in STAGES.items():
+            print(f"  {name:20s} {stage.description}")
+        return
+
+    if args.no_cache:
+        cache = None
+    else:
+        cache = default_cache(project_root)
+        if cache is not None and (args.cache_dir or args.cache_max_mb):
+            cache = ArtifactCache(
+                Path(args.cache_dir) if args.cache_dir else cache.cache_dir,
+                max_bytes=int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else cache.max_bytes
+            )
+
+    if cache is not None and args.clear:
+        cache.clear()
+        print(f"Cleared artifact cache: {cache.cache_dir}")
+
+    stage_names = args.stages or ([] if (args.stats or args.clear) else CONSTRAINT_PIPELINE_ORDER)
+    for name in stage_names:
+        if name not in STAGES:
+            print(f"Error: Unknown stage '{name}'. Use --list to see available stages.")
+            sys.exit(2)
+
+    for name in stage_names:
+        result = run_stage(STAGES[name], project_root, cache)
+        source = "cache hit" if result['cached'] else "computed"
+        print(f"[{name}] {source} in {result['duration_s']:.2f}s")
+        if result.get('missing_outputs'):
+            print(f"  Warning: outputs not produced (not cached): {result['missing_outputs']}")
+
+    if cache is not None and args.stats:
+        stats = cache.stats()
+        print(f"Artifact cache: {stats['entries']} entries, {stats['objects']} objects, "
+              f"{stats['total_bytes'] / 1e6:.1f} / {stats['max_bytes'] / 1e6:.1f} MB "
+              f"({stats['cache_dir']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the content-addressed pipeline artifact cache.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from code.pipeline.artifact_cache import ArtifactCache, compute_stage_key
+from code.pipeline.constraint_pipeline import PipelineStage, run_stage
+
+
+class TestStageKey(unittest.TestCase):
+    """Test cache key derivation."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.input_file = self.root / 'input.csv'
+        self.input_file.write_text('lambda_m,alpha_max\n1e-4,1e-2\n')
+        self.code_file = self.root / 'stage.py'
+        self.code_file.write_text('print("v1")\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def key(self, params=None):
+        return compute_stage_key('stage', self.root, [self.input_file], [self.code_file], params)
+
+    def test_key_is_stable(self):
+        self.assertEqual(self.key({'a': 1}), self.key({'a': 1}))
+
+    def test_key_changes_with_params_inputs_and_code(self):
+        base = self.key({'a': 1})
+        self.assertNotEqual(base, self.key({'a': 2}))
+
+        self.input_file.write_text('lambda_m,alpha_max\n1e-4,2e-2\n')
+        changed_input = self.key({'a': 1})
+        self.assertNotEqual(base, changed_input)
+
+        self.code_file.write_text('print("v2")\n')
+        self.assertNotEqual(changed_input, self.key({'a': 1}))
+
+    def test_missing_input_participates(self):
+        missing = self.root / 'missing.csv'
+        key_missing = compute_stage_key('stage', self.root, [missing])
+        missing.write_text('x\n')
+        self.assertNotEqual(key_missing, compute_stage_key('stage', self.root, [missing]))
+
+
+class TestArtifactCache(unittest.TestCase):
+    """Test store, materialize and eviction."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.cache = ArtifactCache(self.root / 'cache', max_bytes=10_000)
+        self.out = self.root / 'results' / 'out.csv'
+        self.out.parent.mkdir(parents=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_store_and_materialize(self):
+        self.out.write_text('a,b\n1,2\n')
+        self.cache.store('k1', 'stage', self.root, [self.out])
+        self.out.unlink()
+
+        self.assertTrue(self.cache.materialize('k1', self.root))
+        self.assertEqual(self.out.read_text(), 'a,b\n1,2\n')
+        self.assertFalse(self.cache.materialize('unknown', self.root))
+
+    def test_index_persists(self):
+        self.out.write_text('persist\n')
+        self.cache.store('k1', 'stage', self.root, [self.out])
+        reopened = ArtifactCache(self.root / 'cache')
+        self.assertEqual(reopened.lookup('k1'), {'results/out.csv': self.cache.lookup('k1')['results/out.csv']})
+
+    def test_corrupted_object_is_a_miss(self):
+        self.out.write_text('original\n')
+        self.cache.store('k1', 'stage', self.root, [self.out])
+        self.assertTrue(self.cache.materialize('k1', self.root))
+
+        # Rewriting the hard-linked output in place corrupts the shared blob
+        with open(self.out, 'w') as f:
+            f.write('rewritten\n')
+
+        self.assertFalse(self.cache.materialize('k1', self.root))
+        self.assertIsNone(self.cache.lookup('k1'))
+
+    def test_lru_eviction(self):
+        for i in range(3):
+            self.out.write_text(str(i) * 4000)
+            self.cache.store(f'k{i}', 'stage', self.root, [self.out])
+            # Touch k0 so k1 is the least recently used when k2 arrives
+            if i == 1:
+                self.cache.index['entries']['k0']['last_used'] += 100
+
+        self.assertLessEqual(self.cache.total_bytes(), 10_000)
+        self.assertIsNotNone(self.cache.lookup('k0'))
+        self.assertIsNone(self.cache.lookup('k1'))
+        self.assertIsNotNone(self.cache.lookup('k2'))
+
+    def test_run_stage_uses_cache(self):
+        calls = []
+
+        def produce(project_root, params):
+            calls.append(params['value'])
+            (project_root / 'results' / 'out.csv').write_text(f"value={params['value']}\n")
+
+        stage = PipelineStage(name='toy', run=produce, outputs=['results/out.csv'],
+                              params={'value': 1})
+
+        first = run_stage(stage, self.root, self.cache)
+        second = run_stage(stage, self.root, self.cache)
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(calls, [1])
+
+        stage.params = {'value': 2}
+        third = run_stage(stage, self.root, self.cache)
+        self.assertFalse(third['cached'])
+        self.assertEqual(self.out.read_text(), 'value=2\n')
+
+        # Switching back to the earlier parameter set is served from cache
+        stage.params = {'value': 1}
+        self.assertTrue(run_stage(stage, self.root, self.cache)['cached'])
+        self.assertEqual(self.out.read_text(), 'value=1\n')
+        self.assertEqual(calls, [1, 2])
+
+    def test_failed_stage_keeps_previous_outputs(self):
+        def produce(project_root, params):
+            (project_root / 'results' / 'out.csv').write_text(f"value={params['value']}\n")
+            if params['value'] == 2:
+                raise RuntimeError('stage failed')
+
+        stage = PipelineStage(name='toy', run=produce, outputs=['results/out.csv'],
+                              params={'value': 1})
+        run_stage(stage, self.root, self.cache)
+        self.assertTrue(run_stage(stage, self.root, self.cache)['cached'])
+
+        stage.params = {'value': 2}
+        with self.assertRaises(RuntimeError):
+            run_stage(stage, self.root, self.cache)
+        self.assertEqual(self.out.read_text(), 'value=1\n')
+        # The partial write did not go through the hard link into the cache
+        self.out.unlink()
+        stage.params = {'value': 1}
+        self.assertTrue(run_stage(stage, self.root, self.cache)['cached'])
+        self.assertEqual(self.out.read_text(), 'value=1\n')
+
+    def test_stage_writing_nothing_is_not_cached(self):
+        def produce(project_root, params):
+            if params['value'] == 1:
+                (project_root / 'results' / 'out.csv').write_text("value=1\n")
+
+        stage = PipelineStage(name='toy', run=produce, outputs=['results/out.csv'],
+                              params={'value': 1})
+        run_stage(stage, self.root, self.cache)
+
+        stage.params = {'value': 2}
+        result = run_stage(stage, self.root, self.cache)
+        self.assertEqual(result['missing_outputs'], ['results/out.csv'])
+        self.assertFalse(self.out.exists())
+        result = run_stage(stage, self.root, self.cache)
+        self.assertFalse(result['cached'])
+        self.assertFalse(self.out.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
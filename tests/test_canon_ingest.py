@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the canon ingestion driver (canon/scripts/canon_ingest.py).
+"""
+
+import json
+import os
+import re
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add canon scripts directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'canon', 'scripts'))
+
+import canon_ingest
+from benchmark_claim_classifier import legacy_classify, synthetic_sentences
+from canon_index import CanonIndex
+from canon_link import iter_symbols, link_canon
+from claim_extractor import ClaimClassifier
+from equation_parser import iter_math_spans
+from text_index import LineIndex, iter_sentence_spans
+
+DOCUMENTS = {
+    'b_fifth_force.txt': """1 Fifth Force
+The scalar field couples to the Standard Model via Higgs-portal mixing.
+This coupling predicts a Yukawa-type fifth force, as derived from equation (2.1).
+$\\lambda = \\frac{\\hbar c}{m_c}$ sets the range of the force.
+
+2 Constraints
+Experimental constraints from torsion balance tests limit the coupling strength.
+""",
+    'a_consciousness.txt': """1 Interpretation
+This has profound implications for our understanding of consciousness and awareness.
+The hypothesis suggests that the field may be observable in future experiments.
+$$L = L_{GR} + L_{SM} + L_{\\Phi_c}$$
+""",
+    'nested/c_clocks.txt': """1 Atomic Clocks
+Frequency comparison constraints bound the scalar coupling to photons.
+It is established that the clock bound improves with interrogation time.
+"""
+}
+
+
+def sorted_index(index):
+    """Index contents independent of document order."""
+    return {key: {k: sorted(v) if isinstance(v, list) else v for k, v in value.items()}
+            if isinstance(value, dict) else value
+            for key, value in index.to_dict().items()}
+
+
+def strip_times(manifest):
+    return [{k: v for k, v in doc.items() if k != 'mtime_utc'} for doc in manifest['documents']]
+
+
+class TestCanonIngest(unittest.TestCase):
+    """Test document discovery and parallel ingestion."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.corpus = self.root / 'corpus'
+        for name, text in DOCUMENTS.items():
+            path = self.corpus / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def read_outputs(self, output_dir):
+        outputs = {}
+        for path in sorted((output_dir / 'canon').rglob('*.json')):
+            with open(path) as f:
+                outputs[str(path.relative_to(output_dir))] = json.load(f)
+        return outputs
+
+    def test_discovery_order_is_stable(self):
+        names = [p.name for p in canon_ingest.discover_documents(self.corpus)]
+        self.assertEqual(names, ['a_consciousness.txt', 'b_fifth_force.txt', 'c_clocks.txt'])
+
+    def test_parallel_matches_serial(self):
+        serial = canon_ingest.ingest_corpus(self.corpus, self.root / 'serial', workers=1)
+        parallel = canon_ingest.ingest_corpus(self.corpus, self.root / 'parallel', workers=3)
+
+        self.assertEqual(serial['processed'], 3)
+        self.assertEqual(strip_times(serial['manifest']), strip_times(parallel['manifest']))
+        self.assertEqual(self.read_outputs(self.root / 'serial'),
+                         self.read_outputs(self.root / 'parallel'))
+
+    def test_skip_existing_and_errors(self):
+        canon_ingest.ingest_corpus(self.corpus, self.root / 'out', workers=2)
+        (self.corpus / 'broken.docx').write_bytes(b'not a docx')
+        again = canon_ingest.ingest_corpus(self.corpus, self.root / 'out',
+                                           skip_existing=True, workers=2)
+        self.assertEqual(again['processed'], 0)
+        self.assertEqual(len(again['manifest']['documents']), 3)
+
+    def test_per_document_outputs_and_unique_ids(self):
+        output_dir = self.root / 'out'
+        result = canon_ingest.ingest_corpus(self.corpus, output_dir)
+
+        claim_ids, equation_ids = [], []
+        for doc in result['manifest']['documents']:
+            with open(output_dir / 'canon' / 'claims' / f"{doc['doc_id']}_claims.json") as f:
+                claims = json.load(f)
+            with open(output_dir / 'canon' / 'equations' / f"{doc['doc_id']}_equations.json") as f:
+                equations = json.load(f)
+            # Each document's files hold only its own records
+            self.assertEqual(claims['total_count'], doc['claims_count'])
+            self.assertEqual({c['source_document'] for c in claims['claims']}, {doc['filename']})
+            self.assertEqual(equations['total_count'], doc['equations_count'])
+            claim_ids += [c['claim_id'] for c in claims['claims']]
+            equation_ids += [e['equation_id'] for e in equations['equations']]
+
+        # A later run continues the counters instead of reusing IDs
+        (self.corpus / 'd_new.txt').write_text(DOCUMENTS['b_fifth_force.txt'] + "\nRevised edition.\n")
+        again = canon_ingest.ingest_corpus(self.corpus, output_dir, skip_existing=True)
+        new_doc = again['manifest']['documents'][-1]
+        with open(output_dir / 'canon' / 'claims' / f"{new_doc['doc_id']}_claims.json") as f:
+            claim_ids += [c['claim_id'] for c in json.load(f)['claims']]
+
+        self.assertGreater(len(claim_ids), 3)
+        self.assertEqual(len(claim_ids), len(set(claim_ids)))
+        self.assertEqual(len(equation_ids), len(set(equation_ids)))
+        self.assertEqual(again['manifest']['id_counters']['claims'], len(claim_ids))
+
+    def test_incremental_reingestion(self):
+        output_dir = self.root / 'out'
+        first = canon_ingest.ingest_corpus(self.corpus, output_dir)
+        self.assertEqual(first['processed'], 3)
+        self.assertTrue(all(doc['extractor_version'] == canon_ingest.extractor_version()
+                            for doc in first['manifest']['documents']))
+
+        # Nothing changed: nothing is reprocessed
+        self.assertEqual(canon_ingest.ingest_corpus(self.corpus, output_dir)['processed'], 0)
+
+        # Content change: the file's entry is replaced and its old outputs removed
+        old_doc = next(d for d in first['manifest']['documents'] if d['filename'] == 'c_clocks.txt')
+        (self.corpus / 'nested' / 'c_clocks.txt').write_text(DOCUMENTS['nested/c_clocks.txt'] + "Updated.\n")
+        second = canon_ingest.ingest_corpus(self.corpus, output_dir)
+        self.assertEqual(second['processed'], 1)
+        self.assertEqual(len(second['manifest']['documents']), 3)
+        self.assertNotIn(old_doc['doc_id'], [d['doc_id'] for d in second['manifest']['documents']])
+        self.assertFalse((output_dir / 'canon' / 'claims' / f"{old_doc['doc_id']}_claims.json").exists())
+
+        # Extractor change: everything is reprocessed from cached text, in place
+        original_extract = canon_ingest.extract_pages
+        original_version = canon_ingest.ClaimExtractor.VERSION
+        canon_ingest.extract_pages = lambda path: self.fail(f"re-parsed {path}")
+        canon_ingest.ClaimExtractor.VERSION = original_version + '-test'
+        try:
+            third = canon_ingest.ingest_corpus(self.corpus, output_dir)
+        finally:
+            canon_ingest.extract_pages = original_extract
+            canon_ingest.ClaimExtractor.VERSION = original_version
+        self.assertEqual(third['processed'], 3)
+        self.assertEqual([d['doc_id'] for d in third['manifest']['documents']],
+                         [d['doc_id'] for d in second['manifest']['documents']])
+
+    def test_text_cache_round_trip(self):
+        path = self.corpus / 'b_fifth_force.txt'
+        file_hash = canon_ingest.sha256_file(path)
+        cache = canon_ingest.TextCache(self.root / 'text')
+        self.assertIsNone(cache.get(file_hash, 'text'))
+
+        cached, hit = cache.get_or_extract(path, file_hash)
+        self.assertFalse(hit)
+        self.assertEqual(cached.path, cache.path_for(file_hash, 'text'))
+        self.assertTrue(cached.path.name.endswith('.jsonl.gz'))
+        self.assertEqual(cached.meta['backend'], 'text')
+        self.assertEqual(cached.text, canon_ingest.extract_text(path)[0])
+
+        # Pages are stored separately; blank pages are dropped from the joined text
+        pages = cache.put('f' * 64, {'pages': 3, 'content_type': 'application/pdf',
+                                     'backend': 'pypdf'}, iter(['one', '', 'three']))
+        self.assertEqual(list(canon_ingest.CachedText(pages.path).iter_pages()), ['one', '', 'three'])
+        self.assertEqual(pages.text, 'one\n\nthree')
+        self.assertIsNone(cache.get('f' * 64, 'pymupdf'))
+
+        again, hit = cache.get_or_extract(path, file_hash)
+        self.assertTrue(hit)
+
+    def test_streamed_sections_carry_page_numbers(self):
+        pages = [
+            "1 Fifth Force\nThe scalar field couples to the Standard Model via Higgs-portal mixing.",
+            "",
+            "This coupling predicts a Yukawa-type fifth force, as derived from equation (2.1).\n"
+            "$\\lambda = \\frac{\\hbar c}{m_c}$ sets the range.\n2 Constraints",
+            "Experimental constraints from torsion balance tests limit the coupling strength."
+        ]
+        sections = list(canon_ingest.iter_sections(iter(pages)))
+        self.assertEqual([(s['title'], s['start_page'], s['end_page']) for s in sections],
+                         [('Fifth Force', 1, 3), ('Constraints', 4, 4)])
+
+        # Same sections and line numbers as sectioning the joined text
+        joined = canon_ingest.parse_sections("\n\n".join(p for p in pages if p))
+        self.assertEqual([(s['text'], s['start_line'], s['end_line']) for s in sections],
+                         [(s['text'], s['start_line'], s['end_line']) for s in joined])
+
+        first = sections[0]
+        claims = canon_ingest.ClaimExtractor().extract_claims(
+            first['text'], first['title'], 'paper.pdf', page_starts=first['page_starts'])
+        self.assertEqual([c.page_number for c in claims], [1, 3, 3])
+        equations = canon_ingest.EquationParser().extract_equations(
+            first['text'], first['title'], page_starts=first['page_starts'])
+        self.assertEqual({e.page_number for e in equations}, {3})
+
+    def test_section_outputs_are_valid_json(self):
+        output_dir = self.root / 'out'
+        result = canon_ingest.ingest_corpus(self.corpus, output_dir)
+        doc = result['manifest']['documents'][0]
+        with open(output_dir / 'extracted' / f"{doc['doc_id']}.json") as f:
+            extracted = json.load(f)
+        with open(output_dir / 'canon' / 'sections' / f"{doc['doc_id']}_sections.json") as f:
+            sections = json.load(f)
+        self.assertEqual(extracted['sections'], sections)
+        self.assertEqual(len(sections), doc['sections_count'])
+        # Text files are not paginated
+        self.assertIsNone(sections[0]['start_page'])
+        self.assertEqual(list((output_dir / 'extracted').glob('*.tmp')), [])
+
+
+class TestClaimClassifier(unittest.TestCase):
+    """Test the single-scan claim classifier against the per-pattern scans."""
+
+    def setUp(self):
+        self.extractor = canon_ingest.ClaimExtractor()
+
+    def test_matches_per_pattern_scans(self):
+        sentences = synthetic_sentences(2000, seed=1) + [
+            "It was empirically confirmed and\nexperimentally   verified",
+            "The mayor possibly suggests a model",
+            "The hypothesisuggests a theoremodel",
+            "No keywords at all here whatsoever",
+        ]
+        for sentence in sentences:
+            self.assertEqual(self.extractor._classify_claim(sentence), legacy_classify(sentence))
+
+    def test_overlapping_phrases_score_separately(self):
+        scores, levels = self.extractor.classifier.scan("Empirically confirmed, clearly.")
+        self.assertEqual(scores['proven'], 2)
+        self.assertEqual(levels, ['very_high'])
+        self.assertEqual(self.extractor._classify_claim("Nothing to see"), ('Derived', 0.5))
+
+    def test_glued_phrases_match_per_pattern_scans(self):
+        # 'suggests' shares its 's' with 'hypothesis': the pattern's findall counts
+        # one match, the keyword substring scan still sees both
+        scores, levels = self.extractor.classifier.scan("The hypothesisuggests it")
+        self.assertEqual(scores['conjectural'], 1)
+        self.assertEqual(levels, ['moderate', 'low'])
+        self.assertEqual(self.extractor._classify_claim("The hypothesisuggests it"),
+                         legacy_classify("The hypothesisuggests it"))
+
+    def test_non_literal_pattern_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ClaimClassifier({'proven': [r'(?:pro\w+)']}, {})
+
+
+class TestTextIndex(unittest.TestCase):
+    """Test sentence spans and line lookups."""
+
+    TEXT = ("  The scalar field couples to the Higgs.\nIt is established that the bound holds!  "
+            "\n\nShort. It is established that the bound holds? tail\n")
+
+    def test_sentence_spans_match_split(self):
+        spans = list(iter_sentence_spans(self.TEXT))
+        expected = [p.strip() for p in re.split(r'[.!?]\s+', self.TEXT) if p.strip()]
+        self.assertEqual([self.TEXT[a:b] for a, b in spans], expected)
+
+    def test_line_index_matches_counting(self):
+        lines = LineIndex(self.TEXT)
+        for offset in range(len(self.TEXT) + 1):
+            self.assertEqual(lines.line_of(offset), self.TEXT[:offset].count('\n') + 1)
+
+    def test_repeated_sentences_get_their_own_lines(self):
+        text = "\n".join(["It is established that the clock bound holds."] * 3)
+        claims = canon_ingest.ClaimExtractor().extract_claims(text, 'S', 'doc.txt')
+        self.assertEqual([c.line_range for c in claims], [(1, 1), (2, 2), (3, 3)])
+
+
+class TestMathTokenizer(unittest.TestCase):
+    """Test the single-pass equation tokenizer."""
+
+    TEXT = ("We set x = 5 and $\\alpha_{s}$ with $$E = mc^2$$ and \\[ a = \\frac{b}{c} \\] plus\n"
+            "\\begin{equation}\n f = \\begin{equation} g \\end{equation} h\n\\end{equation}"
+            " costs \\$5. Unclosed $ here.\n\nThen a_{ij} and \\frac{1}{2}.")
+
+    def test_spans_are_ordered_and_disjoint(self):
+        formulas = [f.strip() for _, _, f in iter_math_spans(self.TEXT)]
+        self.assertEqual(formulas, [
+            'x = 5 and', '\\alpha_{s}', 'E = mc^2', 'a = \\frac{b}{c}',
+            'f = \\begin{equation} g \\end{equation} h', 'a_{ij}', '\\frac{1}{2}'])
+        spans = [(a, b) for a, b, _ in iter_math_spans(self.TEXT)]
+        self.assertTrue(all(b1 <= a2 for (_, b1), (a2, _) in zip(spans, spans[1:])))
+
+    def test_equations_are_not_repeated_from_inside_math(self):
+        equations = canon_ingest.EquationParser().extract_equations(self.TEXT, 'S')
+        formulas = [e.latex_formula for e in equations]
+        self.assertNotIn('\\frac{b}{c}', formulas)
+        self.assertEqual(len(formulas), len(set(formulas)))
+        nested = equations[4]
+        self.assertEqual(nested.line_range, (2, 4))
+
+    def test_unclosed_delimiters_scan_linearly(self):
+        self.assertEqual(list(iter_math_spans("\\[ open " * 20000)), [])
+        self.assertEqual(list(iter_math_spans("a $ b\n\n" * 20000)), [])
+        self.assertEqual(list(iter_math_spans("\\( x " * 20000 + "\n\n\\(y\\)")), [(100002, 100007, 'y')])
+
+
+class TestCanonIndex(unittest.TestCase):
+    """Test extractor indexes and the persisted canon index."""
+
+    def test_extractor_indexes(self):
+        parser = canon_ingest.EquationParser()
+        eqs = parser.extract_equations("$$E = mc^2$$ and $a = b + c$", 'Energy')
+        self.assertEqual(parser.get_equation(eqs[1].equation_id), eqs[1])
+        self.assertEqual(parser.get_equations_for_section('Energy'), eqs)
+        self.assertTrue(parser.link_equation_to_claim(eqs[0].equation_id, 'CLAIM_1'))
+        self.assertTrue(parser.link_equation_to_claim(eqs[0].equation_id, 'CLAIM_1'))
+        self.assertFalse(parser.link_equation_to_claim('EQ_missing', 'CLAIM_1'))
+        self.assertEqual(eqs[0].related_claims, ['CLAIM_1'])
+        self.assertEqual(parser.get_equations_for_claim('CLAIM_1'), [eqs[0]])
+
+        extractor = canon_ingest.ClaimExtractor()
+        claims = extractor.extract_claims(
+            "It is established that the clock bound holds. Torsion balance tests limit the coupling strength.",
+            'Clocks', 'doc.txt')
+        self.assertEqual(extractor.get_claim(claims[0].claim_id), claims[0])
+        self.assertEqual(extractor.get_claims_for_section('Clocks'), claims)
+        self.assertEqual(extractor.get_claims_by_type('Modeled'), [claims[1]])
+        parser.reset()
+        self.assertIsNone(parser.get_equation(eqs[0].equation_id))
+
+    def test_index_is_persisted_and_tracks_documents(self):
+        root = Path(tempfile.mkdtemp())
+        try:
+            corpus = root / 'corpus'
+            corpus.mkdir()
+            for name, text in DOCUMENTS.items():
+                (corpus / Path(name).name).write_text(text)
+            result = canon_ingest.ingest_corpus(corpus, root / 'out')
+            canon_dir = root / 'out' / 'canon'
+
+            index = CanonIndex.load(canon_dir)
+            self.assertEqual(sorted_index(index), sorted_index(CanonIndex.build(canon_dir)))
+            self.assertEqual(set(index.documents), {d['doc_id'] for d in result['manifest']['documents']})
+            self.assertEqual(len(index.claims), sum(d['claims_count'] for d in result['manifest']['documents']))
+
+            # A changed document replaces its entries
+            (corpus / 'c_clocks.txt').write_text("1 Clocks\nIt is established that clocks now tick twice.\n")
+            canon_ingest.ingest_corpus(corpus, root / 'out')
+            index = CanonIndex.load(canon_dir)
+            self.assertEqual(sorted_index(index), sorted_index(CanonIndex.build(canon_dir)))
+            self.assertEqual(len(index.documents), 3)
+        finally:
+            shutil.rmtree(root)
+
+    def test_linking_scales_with_links(self):
+        index = CanonIndex()
+        n = 100000
+        index.add_document('d', [{'claim_id': f'C{i}', 'source_section': f'S{i % 100}',
+                                  'claim_type': 'Derived'} for i in range(n)],
+                           [{'equation_id': f'E{i}', 'section': f'S{i % 100}'} for i in range(n)])
+        for i in range(n):
+            index.link(f'E{i}', f'C{(i * 7) % n}')
+        self.assertEqual(index.claim_ids_for_equation('E1'), ['C7'])
+        self.assertEqual(index.equation_ids_for_claim('C7'), ['E1'])
+        self.assertEqual(len(index.claim_ids_for_section('S3')), n // 100)
+        index.remove_document('d')
+        self.assertEqual(index.claims_by_equation, {})
+
+    def test_remove_documents_sharing_ids(self):
+        index = CanonIndex()
+        for doc_id in ('a', 'b'):
+            index.add_document(doc_id, [{'claim_id': 'C1', 'source_section': doc_id}],
+                               [{'equation_id': 'E1', 'section': doc_id}])
+        index.remove_document('a')
+        self.assertEqual(index.claims['C1']['doc_id'], 'b')
+        self.assertEqual(index.equations['E1']['doc_id'], 'b')
+        index.remove_document('b')
+        self.assertEqual((index.claims, index.equations, index.documents), ({}, {}, {}))
+
+
+class TestCanonLink(unittest.TestCase):
+    """Test symbol normalization and the claim-equation linking pass."""
+
+    def setUp(self):
+        self.canon_dir = Path(tempfile.mkdtemp())
+        for kind in ('claims', 'equations'):
+            (self.canon_dir / kind).mkdir()
+        self.write('claims', 'doc1', [
+            {'claim_id': 'C1', 'statement': 'The mixing angle θ_hc sets the coupling κ_cH.',
+             'equation_refs': ['EQ_2_1']},
+            {'claim_id': 'C2', 'statement': 'Nothing symbolic is said here at all.', 'equation_refs': []},
+        ])
+        self.write('claims', 'doc2', [
+            {'claim_id': 'C3', 'statement': 'The range λ grows as the mass m_c falls.', 'equation_refs': []},
+        ])
+        self.write('equations', 'doc1', [
+            {'equation_id': 'E1', 'latex_formula': r'\kappa_{cH} v_c = \theta_{hc} (m_h^2 - m_c^2)',
+             'related_claims': ['stale']},
+            {'equation_id': 'E2', 'latex_formula': r'\lambda = \frac{\hbar c}{m_c}', 'related_claims': []},
+        ])
+
+    def tearDown(self):
+        shutil.rmtree(self.canon_dir)
+
+    def write(self, kind, doc_id, records):
+        with open(self.canon_dir / kind / f'{doc_id}_{kind}.json', 'w') as f:
+            json.dump({kind: records, 'total_count': len(records)}, f)
+
+    def read(self, kind, doc_id):
+        with open(self.canon_dir / kind / f'{doc_id}_{kind}.json') as f:
+            return {r[kind[:-1] + '_id']: r for r in json.load(f)[kind]}
+
+    def test_symbols_normalize_latex_and_unicode(self):
+        self.assertEqual(list(iter_symbols(r'\theta_{hc} + L_{\Phi_c} \frac{a}{b} some_word')),
+                         ['theta_hc', 'L_Phi_c'])
+        self.assertEqual(list(iter_symbols('θ_hc and Φ_c with λ')), ['theta_hc', 'Phi_c', 'lambda'])
+        self.assertEqual(list(iter_symbols('beta decay fixes the lambda parameter and theta_hc')),
+                         ['theta_hc'])
+
+    def test_link_canon(self):
+        stats = link_canon(self.canon_dir)
+        self.assertEqual(stats['links'], 3)
+
+        claims = {**self.read('claims', 'doc1'), **self.read('claims', 'doc2')}
+        self.assertEqual(claims['C1']['equation_refs'], ['EQ_2_1'])
+        self.assertEqual(claims['C1']['linked_equations'], ['E1'])
+        self.assertEqual(claims['C2']['linked_equations'], [])
+        self.assertEqual(claims['C3']['linked_equations'], ['E2', 'E1'])
+        equations = self.read('equations', 'doc1')
+        self.assertEqual(equations['E1']['related_claims'], ['C1', 'C3'])
+        self.assertEqual(equations['E2']['related_claims'], ['C3'])
+
+        index = CanonIndex.load(self.canon_dir)
+        self.assertEqual(sorted(index.equation_ids_for_claim('C3')), ['E1', 'E2'])
+
+        # Idempotent, and generic symbols can be excluded
+        link_canon(self.canon_dir)
+        self.assertEqual(self.read('claims', 'doc2')['C3']['linked_equations'], ['E2', 'E1'])
+        self.assertEqual(link_canon(self.canon_dir, max_equations_per_symbol=1)['links'], 2)
+
+    def test_textual_refs_are_kept(self):
+        self.write('claims', 'doc3', [
+            {'claim_id': 'C4', 'statement': 'As shown in equation (5.1), beta decay fixes the gamma parameter.',
+             'equation_refs': ['EQ_5_1'], 'linked_equations': ['E_deleted']},
+        ])
+        self.write('equations', 'doc3', [
+            {'equation_id': 'EQ_5_1', 'latex_formula': r'\beta = \gamma \mu', 'related_claims': []},
+        ])
+        link_canon(self.canon_dir)
+
+        claim = self.read('claims', 'doc3')['C4']
+        self.assertEqual(claim['equation_refs'], ['EQ_5_1'])
+        self.assertEqual(claim['linked_equations'], [])
+        self.assertEqual(self.read('equations', 'doc3')['EQ_5_1']['related_claims'], ['C4'])
+        self.assertEqual(CanonIndex.load(self.canon_dir).equation_ids_for_claim('C4'), ['EQ_5_1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the EmpiricalValidator test runner.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from functools import partial
+from pathlib import Path
+from unittest import mock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'experiments'))
+
+import numpy as np
+import pandas as pd
+
+import run_empirical_validation
+from run_empirical_validation import EmpiricalValidator
+from compute_toe_predictions import (
+    compute_toe_alpha_prediction,
+    compute_toe_alpha_grid,
+    compare_prediction_arrays
+)
+from validation_history import ValidationHistory, extract_metrics
+
+
+def _barrier_test(name, barrier):
+    # Both tests must be in flight at once to pass the barrier
+    barrier.wait()
+    print(f"output from {name}")
+    return {'test_name': name, 'status': 'passed', 'passed': True}
+
+
+def _broken_test():
+    raise RuntimeError("boom")
+
+
+def _hung_test():
+    time.sleep(60)
+    return {}
+
+
+def _crashing_test():
+    os._exit(3)
+
+
+class TestConcurrentRunner(unittest.TestCase):
+    """Test concurrent execution, timeouts and timing capture."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.validator = EmpiricalValidator(self.root, max_workers=4)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def run_barrier_tests(self):
+        barrier = multiprocessing.get_context().Barrier(2, timeout=5)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            results = self.validator.run_tests([('first', partial(_barrier_test, 'first', barrier)),
+                                                ('second', partial(_barrier_test, 'second', barrier))])
+
+        self.assertEqual([r['test_name'] for r in results], ['first', 'second'])
+        self.assertEqual(output.getvalue(), "output from first\noutput from second\n")
+        for r in results:
+            self.assertTrue(r['passed'])
+            self.assertIn('duration_s', r)
+
+    def test_results_keep_declaration_order_with_durations(self):
+        self.run_barrier_tests()
+
+    def test_spawned_workers(self):
+        spawn = multiprocessing.get_context('spawn')
+        with mock.patch.object(run_empirical_validation.multiprocessing, 'get_context',
+                               lambda method=None: spawn):
+            self.run_barrier_tests()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = self.validator.run_tests([('canon_structure', self.validator.test_canon_structure)])
+        self.assertEqual(results[0]['test_name'], 'canon_structure')
+        self.assertNotIn('error', results[0])
+
+    def test_exception_becomes_error_result(self):
+        results = self.validator.run_tests([('broken', _broken_test)])
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertFalse(results[0]['passed'])
+
+    def test_timeout_terminates_hung_test(self):
+        run_empirical_validation.TEST_TIMEOUTS['hung_test'] = 0.1
+        try:
+            start = time.perf_counter()
+            results = self.validator.run_tests([('hung_test', _hung_test)])
+        finally:
+            del run_empirical_validation.TEST_TIMEOUTS['hung_test']
+
+        self.assertEqual(results[0]['status'], 'timeout')
+        self.assertFalse(results[0]['passed'])
+        # The hung worker is killed rather than waited for
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_crashed_test_becomes_error_result(self):
+        results = self.validator.run_tests([('crash', _crashing_test)])
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertIn('code 3', results[0]['error'])
+
+    def test_run_all_tests_reads_bounds_once(self):
+        scalar_dir = self.root / 'results' / 'scalar_constraints'
+
+        def fake_pipeline(project_root, cache):
+            scalar_dir.mkdir(parents=True, exist_ok=True)
+            pd.DataFrame({'lambda_m': [1e-4, 1e-3], 'theta_max': [1.0, 1.0]}).to_csv(
+                scalar_dir / 'joint_bounds.csv', index=False)
+            (scalar_dir / 'joint_dashboard.json').write_text('{}')
+            return []
+
+        # Forked workers inherit the patches, so their reads land in the log too
+        reads_log = self.root / 'reads.log'
+        read_csv = pd.read_csv
+
+        def logged_read_csv(path, *args, **kwargs):
+            with open(reads_log, 'a') as f:
+                f.write(f"{path}\n")
+            return read_csv(path, *args, **kwargs)
+
+        with mock.patch.object(run_empirical_validation, 'run_constraint_pipeline', fake_pipeline), \
+                mock.patch.object(run_empirical_validation, 'query_ollama_models', lambda **kwargs: None), \
+                mock.patch('pandas.read_csv', logged_read_csv), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = self.validator.run_all_tests()
+
+        tests = {t['test_name']: t for t in results['tests']}
+        self.assertTrue(tests['constraint_pipeline']['passed'])
+        self.assertTrue(tests['toe_predictions']['passed'])
+        self.assertEqual(results['analysis']['stats']['total_data_points'], 2)
+        self.assertEqual(reads_log.read_text().splitlines(), [str(scalar_dir / 'joint_bounds.csv')])
+
+
+class TestPredictionComparison(unittest.TestCase):
+    """Test the vectorized prediction-vs-bound comparison."""
+
+    def test_grid_matches_scalar_prediction(self):
+        lambdas = np.array([1e-18, 1.576e-18, 1e-6, 1e-3, 0.0])
+        thetas = np.array([1e-4, 1e-2, 0.1])
+        grid = compute_toe_alpha_grid(lambdas, thetas)
+        for i, lam in enumerate(lambdas):
+            for j, theta in enumerate(thetas):
+                self.assertEqual(grid[i, j], compute_toe_alpha_prediction(lam, theta_hc=theta))
+
+    def test_violation_statistics(self):
+        lambdas = np.array([1e-4, 1e-3, 1e-2])
+        # Bound alpha = theta_max^2; predicted alpha_max ≈ 0.1^2 = 1e-2
+        comparison = compare_prediction_arrays(lambdas, np.array([1.0, 1e-3, 1.0]))
+        summary = comparison['summary']
+        self.assertEqual(summary['violations'], 1)
+        self.assertEqual(summary['validations'], 2)
+        stats = comparison['violation_statistics']
+        self.assertEqual(stats['violation_lambda_range'], [1e-3, 1e-3])
+        self.assertGreater(stats['max_violation_factor'], 1.0)
+
+    def test_validator_reuses_loaded_bounds(self):
+        root = Path(tempfile.mkdtemp())
+        try:
+            validator = EmpiricalValidator(root)
+            # No joint_bounds.csv on disk: the test must use the in-memory frame
+            validator._bounds_df = pd.DataFrame({'lambda_m': [1e-4, 1e-3],
+                                                 'theta_max': [1.0, 1.0]})
+            result = validator.test_toe_predictions()
+        finally:
+            shutil.rmtree(root)
+
+        self.assertTrue(result['passed'])
+        self.assertEqual(result['violations'], 0)
+        self.assertEqual(result['data_points'], 2)
+
+
+class TestValidationHistory(unittest.TestCase):
+    """Test the append-only validation history store."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.history = ValidationHistory(self.root / 'history.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def make_run(self, minute, passed=True, duration=0.2, violations=0):
+        return {
+            'timestamp': f'2026-01-01T00:{minute:02d}:00+00:00',
+            'tests': [{
+                'test_name': 'toe_predictions',
+                'status': 'passed' if passed else 'failed',
+                'passed': passed,
+                'duration_s': duration,
+                'violations': violations,
+                'violation_statistics': {'max_violation_factor': 2.0, 'violation_lambda_range': None},
+                'interpretation': 'text is not a metric'
+            }],
+            'summary': {'total_tests': 1, 'passed_tests': int(passed), 'success_rate': float(passed)}
+        }
+
+    def test_extract_metrics(self):
+        metrics = extract_metrics(self.make_run(0)['tests'][0])
+        self.assertEqual(metrics, {'violations': 0.0,
+                                   'violation_statistics.max_violation_factor': 2.0})
+
+    def test_recent_runs_and_trends(self):
+        for minute in range(5):
+            self.history.record_run(self.make_run(minute, violations=minute),
+                                    git_revision=f'rev{minute % 2}')
+
+        runs = self.history.recent_runs(3)
+        self.assertEqual([r['timestamp'][14:16] for r in runs], ['04', '03', '02'])
+        self.assertEqual(len(self.history.recent_runs(10, git_revision='rev1')), 2)
+
+        trend = self.history.metric_trend('toe_predictions', 'violations', n=3)
+        self.assertEqual([row['value'] for row in trend], [2.0, 3.0, 4.0])
+        self.assertEqual(len(self.history.test_trend('toe_predictions', n=10)), 5)
+
+    def test_find_regressions(self):
+        for minute in range(4):
+            self.history.record_run(self.make_run(minute, duration=0.2))
+        self.assertEqual(self.history.find_regressions(), {'status': [], 'duration': []})
+
+        self.history.record_run(self.make_run(10, passed=False, duration=1.0))
+        regressions = self.history.find_regressions()
+        self.assertEqual([r['test_name'] for r in regressions['status']], ['toe_predictions'])
+        self.assertEqual([r['test_name'] for r in regressions['duration']], ['toe_predictions'])
+
+    def test_connections_are_closed(self):
+        opened = []
+        connect = sqlite3.connect
+
+        def tracking_connect(*args, **kwargs):
+            opened.append(connect(*args, **kwargs))
+            return opened[-1]
+
+        with mock.patch('validation_history.sqlite3.connect', tracking_connect):
+            self.history.record_run(self.make_run(0))
+            self.history.recent_runs(1)
+        self.assertEqual(len(opened), 2)
+        for con in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                con.execute("SELECT 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
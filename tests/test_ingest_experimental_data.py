@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Unit tests for batch experimental-data ingestion.
+"""
+
+import json
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add scripts directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import numpy as np
+
+import ingest_experimental_data as ingest
+from curve_validation import compile_card_rules, compile_channel_rules, parse_input_format, validate_columns
+from dataset_registry import DatasetRegistry
+
+PROJECT_ROOT = Path(__file__).parent.parent
+EOTWASH_PREFIX = 'eotwash_prl2016_digitized_contract'
+
+SCHEMA = {'channels': {'fifth_force': {'input_format': 'alpha_max vs lambda_m'}}}
+
+
+def curve_csv(scale):
+    rows = ["lambda_m,alpha_max,source_id,ref"]
+    rows += [f"{1e-5 * (i + 1)},{scale * (i + 1)},src,ref" for i in range(5)]
+    return "\n".join(rows) + "\n"
+
+
+class TestBatchIngest(unittest.TestCase):
+    """Test hashing, dedup and manifest handling of ingest_files."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.inputs = self.root / 'inputs'
+        self.inputs.mkdir()
+        self.output_dir = self.root / 'public'
+        for i in range(3):
+            (self.inputs / f'curve_{i}.csv').write_text(curve_csv(10.0 ** -i))
+        # Same content as curve_0 under another name
+        (self.inputs / 'curve_copy.csv').write_text(curve_csv(1.0))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def manifest(self):
+        with open(self.output_dir / 'manifest.json') as f:
+            return json.load(f)
+
+    def test_read_curve_file_hashes_same_bytes(self):
+        path = self.inputs / 'curve_0.csv'
+        file_hash, data = ingest.read_curve_file(path)
+        self.assertEqual(file_hash, ingest.sha256_file(path))
+        self.assertEqual(len(data), 5)
+
+    def test_missing_column_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ingest.parse_eotwash_text("lambda_m,other\n1,2\n", 'bad.csv')
+
+    def test_batch_dedups_within_batch_and_against_manifest(self):
+        paths = ingest.expand_inputs([str(self.inputs)])
+        self.assertEqual(len(paths), 4)
+
+        first = ingest.ingest_files(paths, SCHEMA, self.output_dir, workers=2)
+        self.assertEqual(len(first['ingested']), 3)
+        self.assertEqual(len(first['skipped']), 1)
+        datasets = self.manifest()['datasets']
+        self.assertEqual(len({d['sha256'] for d in datasets}), len(datasets))
+        self.assertEqual(len(datasets), 3)
+
+        second = ingest.ingest_files(paths, SCHEMA, self.output_dir, workers=2)
+        self.assertEqual(second['ingested'], [])
+        self.assertEqual(len(second['skipped']), 4)
+        self.assertEqual(len(self.manifest()['datasets']), 3)
+
+    def test_glob_and_existing_duplicates_collapse(self):
+        entry = {'dataset_id': 'x', 'filename': 'x.csv', 'sha256': 'abc',
+                 'canonical_file': 'c', 'provenance_file': 'p'}
+        self.output_dir.mkdir()
+        with open(self.output_dir / 'manifest.json', 'w') as f:
+            json.dump({'version': '0.1', 'datasets': [entry, dict(entry)]}, f)
+
+        paths = ingest.expand_inputs([str(self.inputs / 'curve_[12].csv')])
+        result = ingest.ingest_files(paths, SCHEMA, self.output_dir, workers=1)
+
+        self.assertEqual(len(result['ingested']), 2)
+        self.assertEqual([d['sha256'] for d in self.manifest()['datasets']][0], 'abc')
+        self.assertEqual(len(self.manifest()['datasets']), 3)
+        self.assertFalse((self.output_dir / 'manifest.json.tmp').exists())
+
+    def test_variants_file_is_registered(self):
+        result = ingest.ingest_files([self.inputs / 'curve_0.csv'], SCHEMA, self.output_dir)
+        record = DatasetRegistry(self.output_dir).get(result['ingested'][0]['dataset_id'])
+        variants_file = self.output_dir / record['provenance']['variants_file']
+
+        self.assertEqual(ingest.list_curve_variants(variants_file), sorted(ingest.CURVE_VARIANTS))
+        lam, alpha = ingest.load_curve_variant(variants_file, 'log_resampled')
+        self.assertEqual(len(lam), ingest.DEFAULT_RESAMPLE_POINTS)
+        with self.assertRaises(KeyError):
+            ingest.load_curve_variant(variants_file, 'unknown')
+
+
+class TestCurveVariants(unittest.TestCase):
+    """Test the derived curve variants against the hand-made Eöt-Wash files."""
+
+    def load(self, suffix):
+        data = ingest.load_eotwash_curve(PROJECT_ROOT / f'{EOTWASH_PREFIX}{suffix}.csv')
+        return (np.array([p['lambda_m'] for p in data]),
+                np.array([p['alpha_max'] for p in data]))
+
+    def test_matches_hand_made_variants(self):
+        variants = ingest.build_curve_variants(*self.load('_READY'))
+        for name, suffix in [('sorted', '_sorted'), ('monotone_conservative', '_monotone_conservative')]:
+            lam, alpha = self.load(suffix)
+            np.testing.assert_array_equal(variants[name][0], lam)
+            np.testing.assert_array_equal(variants[name][1], alpha)
+
+    def test_dedup_keeps_conservative_point_and_resample_is_monotone(self):
+        variants = ingest.build_curve_variants([3e-4, 1e-4, 3e-4, 1e-3], [1.0, 5.0, 2.0, 0.5],
+                                               resample_points=16)
+        np.testing.assert_array_equal(variants['dedup'][0], [1e-4, 3e-4, 1e-3])
+        np.testing.assert_array_equal(variants['dedup'][1], [5.0, 2.0, 0.5])
+
+        lam, alpha = variants['log_resampled']
+        self.assertEqual((lam[0], lam[-1]), (1e-4, 1e-3))
+        self.assertTrue(np.all(np.diff(alpha) <= 0))
+
+
+class TestCurveValidation(unittest.TestCase):
+    """Test compilation of hypothesis-card rules and per-row failure masks."""
+
+    CHANNEL = {
+        'input_format': 'alpha_max vs lambda_m',
+        'domain_validation': 'Real-only: NaN outside experimental λ support',
+        'domain_min': 1e-6,
+        'domain_max': 1e-2,
+        'validation': {'lambda_order': 'increasing', 'min_points_per_decade': 2}
+    }
+
+    def test_parse_input_format(self):
+        self.assertEqual(parse_input_format('alpha_max vs lambda_m'), ['alpha_max', 'lambda_m'])
+        self.assertEqual(parse_input_format('eta_max (EP violation parameter)'), ['eta_max'])
+
+    def test_failure_masks_and_reasons(self):
+        rules = compile_channel_rules(self.CHANNEL)
+        report = validate_columns({
+            'lambda_m': [1e-5, 2e-5, np.nan, 1e-1, 5e-2, 4e-2],
+            'alpha_max': [1.0, -1.0, 1.0, 1.0, 1.0, 1.0]
+        }, rules)
+
+        np.testing.assert_array_equal(report.valid_mask, [True, False, False, False, False, False])
+        self.assertEqual(report.reasons_for(1), ['alpha_max: not positive'])
+        self.assertIn('lambda_m: not finite', report.reasons_for(2))
+        self.assertIn('lambda_m: outside experimental support', report.reasons_for(3))
+        self.assertIn('lambda_m: not increasing', report.reasons_for(5))
+        self.assertEqual(report.to_dict()['warnings']['lambda_m: fewer than 2 points per decade'], 1)
+
+    def test_card_rules_compile_and_eotwash_curve_is_clean(self):
+        schema = ingest.load_hypothesis_card(
+            PROJECT_ROOT / 'data' / 'constraints' / 'minimal_scalar_hypothesis_card_v0.1.yaml')
+        self.assertIn('atomic_clocks', compile_card_rules(schema))
+
+        data = ingest.load_eotwash_curve(PROJECT_ROOT / f'{EOTWASH_PREFIX}_READY.csv')
+        validated, report = ingest.validate_curve(data, schema)
+        self.assertEqual(len(validated), len(data))
+        self.assertEqual(report.counts(), {})
+
+    def test_million_rows(self):
+        n = 1_000_000
+        lam = np.logspace(-6, -2, n)
+        alpha = np.ones(n)
+        alpha[::1000] = np.nan
+        report = validate_columns({'lambda_m': lam, 'alpha_max': alpha},
+                                  compile_channel_rules(self.CHANNEL))
+        self.assertEqual(int(report.valid_mask.sum()), n - 1000)
+
+
+class TestDatasetRegistry(unittest.TestCase):
+    """Test registry lookups, λ-range queries and manifest compatibility."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.registry = DatasetRegistry(self.root)
+        records = []
+        for i, (lo, hi, source) in enumerate([(1e-6, 1e-2, 'a'), (1e-5, 1e-4, 'a'), (1e-3, 1e-1, 'b')]):
+            sha = str(i) * 64
+            metadata = {'dataset_id': sha[:16], 'sha256': sha, 'filename': f'c{i}.csv',
+                        'source_id': source, 'data_points': 10,
+                        'lambda_range': {'min': lo, 'max': hi},
+                        'alpha_range': {'min': 1e-3, 'max': 1.0}}
+            entry = {'dataset_id': sha[:16], 'filename': f'c{i}.csv', 'sha256': sha,
+                     'canonical_file': f'canonical/{sha[:16]}_canonical.csv',
+                     'provenance_file': f'provenance/{sha[:16]}_provenance.json'}
+            records.append((metadata, entry))
+        self.assertEqual(self.registry.register(records), 3)
+        self.assertEqual(self.registry.register(records[:1]), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_lookups(self):
+        sha = '1' * 64
+        self.assertEqual(self.registry.get(sha[:16])['filename'], 'c1.csv')
+        self.assertEqual(self.registry.get_by_sha256(sha)['provenance']['source_id'], 'a')
+        self.assertIsNone(self.registry.get('missing'))
+        self.assertEqual([r['filename'] for r in self.registry.by_source('a')], ['c0.csv', 'c1.csv'])
+
+    def test_lambda_range_queries(self):
+        covering = self.registry.find_by_lambda(1e-5, 1e-3)
+        self.assertEqual([r['filename'] for r in covering], ['c0.csv'])
+        overlapping = self.registry.find_by_lambda(1e-5, 1e-3, mode='overlaps')
+        self.assertEqual([r['filename'] for r in overlapping], ['c0.csv', 'c1.csv', 'c2.csv'])
+
+    def test_manifest_export_round_trip(self):
+        with open(self.root / 'manifest.json') as f:
+            manifest = json.load(f)
+        self.assertEqual(list(manifest['datasets'][0]),
+                         ['dataset_id', 'filename', 'sha256', 'canonical_file', 'provenance_file'])
+
+        # A fresh registry database rebuilds itself from the exported manifest
+        (self.root / 'registry.sqlite3').unlink()
+        rebuilt = DatasetRegistry(self.root)
+        self.assertEqual(rebuilt.count(), 3)
+        self.assertEqual(rebuilt.export_manifest()['datasets'], manifest['datasets'])
+
+    def test_changed_manifest_is_mirrored(self):
+        with open(self.root / 'manifest.json') as f:
+            manifest = json.load(f)
+        # e.g. a git pull drops one dataset and renames another
+        removed = manifest['datasets'].pop(1)
+        manifest['datasets'][0]['filename'] = 'renamed.csv'
+        with open(self.root / 'manifest.json', 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        registry = DatasetRegistry(self.root)
+        self.assertEqual(registry.count(), 2)
+        self.assertIsNone(registry.get(removed['dataset_id']))
+        self.assertEqual(registry.get_by_sha256('0' * 64)['filename'], 'renamed.csv')
+        # Metadata without a provenance file on disk is kept
+        self.assertEqual(registry.get_by_sha256('0' * 64)['source_id'], 'a')
+        registry.write_manifest()
+        with open(self.root / 'manifest.json') as f:
+            self.assertEqual([d['filename'] for d in json.load(f)['datasets']], ['renamed.csv', 'c2.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
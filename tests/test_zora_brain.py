@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Zora Brain canon store (zora-brain-backend/canon_store.py).
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'zora-brain-backend'))
+
+from canon_search import BM25Index, tokenize
+from canon_store import CanonStore, STORE_NAME
+import canon_vectors
+from canon_vectors import HashingEncoder, HybridRetriever, VectorIndex
+from answer_cache import AnswerCache
+from batching import Histogram
+from concurrency import ConcurrencyLimiter, QueueFull
+from ollama_client import OllamaClient, OllamaError
+
+
+def write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+class TestCanonStore(unittest.TestCase):
+    """Packing the ingest output layout into the store."""
+
+    def setUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+        self.canon_dir = self.output_dir / 'canon'
+        write_json(self.canon_dir / 'claims' / 'doc_a_claims.json', {
+            'document_id': 'doc_a',
+            'claims': [
+                {'claim_id': 'A_1', 'statement': 'The scalar field couples to matter.',
+                 'claim_type': 'Derived'},
+                {'claim_id': 'A_2', 'statement': 'Torsion balances bound the coupling.',
+                 'claim_type': 'Proven'},
+            ]
+        })
+        write_json(self.canon_dir / 'equations' / 'doc_a_equations.json', {
+            'document_id': 'doc_a',
+            'equations': [{'equation_id': 'EQ_A_1', 'latex_formula': 'm_c = 1'}]
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_aggregated_layout(self):
+        store = CanonStore(self.output_dir)
+        self.assertEqual(store.canon_dir, self.canon_dir)
+        self.assertEqual(store.count('claim'), 2)
+        self.assertEqual(store.count('equation'), 1)
+        self.assertEqual(list(store), ['A_1', 'A_2', 'EQ_A_1'])
+        self.assertEqual(store['A_2']['claim_type'], 'Proven')
+        self.assertNotIn('A_3', store)
+        self.assertEqual([r['claim_id'] for r in store.get_many(['A_2', 'A_3', 'A_1'])], ['A_2', 'A_1'])
+        self.assertEqual(list(store.iter_statements()),
+                         [('A_1', 'The scalar field couples to matter.'),
+                          ('A_2', 'Torsion balances bound the coupling.')])
+        self.assertTrue((self.canon_dir / STORE_NAME).exists())
+
+    def test_single_record_files(self):
+        write_json(self.canon_dir / 'claims' / 'LEGACY_1.json',
+                   {'statement': 'One claim per file.', 'claim_type': 'Modeled'})
+        store = CanonStore(self.canon_dir)
+        self.assertEqual(store['LEGACY_1']['statement'], 'One claim per file.')
+        self.assertEqual(len(store), 4)
+
+    def test_refresh_only_changed_files(self):
+        store = CanonStore(self.canon_dir)
+        self.assertEqual(CanonStore(self.canon_dir, refresh=False).refresh(), {'updated': 0, 'removed': 0})
+
+        write_json(self.canon_dir / 'claims' / 'doc_a_claims.json', {
+            'claims': [{'claim_id': 'A_3', 'statement': 'Replaced.'}]
+        })
+        os.remove(self.canon_dir / 'equations' / 'doc_a_equations.json')
+        self.assertEqual(store.refresh(), {'updated': 1, 'removed': 1})
+        self.assertEqual(list(store), ['A_3'])
+
+
+class TestBM25Index(unittest.TestCase):
+    """BM25 ranking and persistence."""
+
+    def setUp(self):
+        self.canon_dir = Path(tempfile.mkdtemp())
+        write_json(self.canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_1', 'statement': 'The scalar field has a mass.'},
+            {'claim_id': 'C_2', 'statement': 'The scalar field couples to the Higgs field.'},
+            {'claim_id': 'C_3', 'statement': 'Atomic clocks drift as the scalar field varies slowly over '
+                                             'cosmological time in every model considered here.'},
+        ]})
+        write_json(self.canon_dir / 'equations' / 'doc_equations.json', {'equations': [
+            {'equation_id': 'EQ_1', 'latex_formula': '\\theta_{hc} = m_c / M', 'context': 'mixing angle'},
+        ]})
+        self.store = CanonStore(self.canon_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.canon_dir)
+
+    def ids(self, records):
+        return [r.get('claim_id') or r.get('equation_id') for r in records]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('What is \\theta_{hc} of the Higgs?'), ['theta', 'hc', 'higgs'])
+
+    def test_ranking(self):
+        index = BM25Index(self.store)
+        self.assertEqual(self.ids(index.search_records('Higgs scalar field')), ['C_2', 'C_1', 'C_3'])
+        # Shorter statements win for the same term frequency
+        self.assertEqual(self.ids(index.search_records('scalar', k=2)), ['C_1', 'C_2'])
+        self.assertEqual(index.search('the of what'), [])
+        self.assertEqual(self.ids(index.search_records('theta mixing', kind='equation')), ['EQ_1'])
+        self.assertEqual(self.ids(index.search_records('mixing', kind='claim')), [])
+        self.assertEqual(self.ids(index.search_records('mass theta', kind=None)), ['C_1', 'EQ_1'])
+
+    def test_search_batch(self):
+        index = BM25Index(self.store)
+        queries = ['Higgs scalar field', 'the of what', 'scalar', 'torsion']
+        self.assertEqual(index.search_batch(queries, k=2), [index.search(q, k=2) for q in queries])
+
+    def test_persisted_and_rebuilt_on_change(self):
+        BM25Index(self.store)
+        self.assertFalse(BM25Index(CanonStore(self.canon_dir)).refresh())
+
+        write_json(self.canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_4', 'statement': 'Torsion balances bound the coupling.'},
+        ]})
+        index = BM25Index(CanonStore(self.canon_dir))
+        self.assertEqual(self.ids(index.search_records('scalar')), [])
+        self.assertEqual(self.ids(index.search_records('torsion coupling')), ['C_4'])
+
+
+class TestVectorIndex(unittest.TestCase):
+    """Dense retrieval with the hashing encoder, IVF and hybrid fusion."""
+
+    STATEMENTS = [
+        'The scalar field has a mass of order the Hubble scale.',
+        'Torsion balance experiments bound the fifth force coupling.',
+        'Atomic clock frequency drift limits the field variation.',
+        'The Higgs portal mixing angle sets the coupling to matter.',
+    ]
+
+    def setUp(self):
+        self.canon_dir = Path(tempfile.mkdtemp())
+        write_json(self.canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': f'C_{i}', 'statement': s} for i, s in enumerate(self.STATEMENTS)]})
+        self.store = CanonStore(self.canon_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.canon_dir)
+
+    def ids(self, records):
+        return [r['claim_id'] for r in records]
+
+    def test_hashing_encoder(self):
+        encoder = HashingEncoder(dim=64)
+        encoder.fit(self.STATEMENTS)
+        vectors = encoder.encode(['scalar field mass', 'scalar field mass', ''])
+        self.assertEqual(vectors.shape, (3, 64))
+        self.assertAlmostEqual(float(vectors[0] @ vectors[1]), 1.0, places=5)
+        self.assertEqual(float(abs(vectors[2]).sum()), 0.0)
+
+    def test_search_and_persistence(self):
+        index = VectorIndex(self.store)
+        self.assertEqual(self.ids(index.search_records('clock frequency drift', k=1)), ['C_2'])
+        self.assertTrue((self.canon_dir / 'vectors' / 'claim' / 'embeddings.npy').exists())
+        self.assertFalse(VectorIndex(CanonStore(self.canon_dir)).refresh())
+
+    def test_ivf_matches_exact_when_probing_every_list(self):
+        statements = [f"claim {i} about {' '.join(self.STATEMENTS[i % 4].split()[:i % 7 + 3])}"
+                      for i in range(200)]
+        write_json(self.canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': f'C_{i}', 'statement': s} for i, s in enumerate(statements)]})
+        index = VectorIndex(CanonStore(self.canon_dir), nprobe=2, ivf_min_records=100)
+        collection = index.collections['claim']
+        self.assertEqual(collection.nlist, 14)
+        self.assertEqual(collection.default_nprobe(), canon_vectors.MIN_NPROBE)
+        exact = index.search('torsion balance coupling', k=5, exact=True)
+        self.assertEqual(index.search('torsion balance coupling', k=5, nprobe=14), exact)
+        self.assertEqual(len(index.search('torsion balance coupling', k=5)), 5)
+
+    def test_kmeans(self):
+        rng = np.random.default_rng(0)
+        points = np.repeat(np.eye(3, dtype=np.float32), 20, axis=0) + rng.normal(0, 0.01, (60, 3))
+        centroids, assignment = canon_vectors.kmeans(canon_vectors._normalize(points.astype(np.float32)), 3)
+        # Each axis cluster ends up in one list, with a unit centroid
+        self.assertEqual(sorted(len(set(assignment[i:i + 20])) for i in range(0, 60, 20)), [1, 1, 1])
+        self.assertEqual(len(set(assignment)), 3)
+        np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, rtol=1e-5)
+
+    def test_search_batch(self):
+        index = VectorIndex(self.store)
+        retriever = HybridRetriever(BM25Index(self.store), index)
+        queries = ['clock frequency drift', 'the of', 'higgs portal coupling']
+        for searcher in (index, retriever):
+            self.assertEqual(searcher.search_batch(queries, k=2), [searcher.search(q, k=2) for q in queries])
+
+    def test_hybrid(self):
+        retriever = HybridRetriever(BM25Index(self.store), VectorIndex(self.store))
+        self.assertEqual(self.ids(retriever.search_records('higgs portal', k=2))[0], 'C_3')
+        self.assertEqual(retriever.search('the of', k=2), [])
+
+
+class TestZoraBrainRetrieval(unittest.TestCase):
+    """Keyword retrieval over the store."""
+
+    def setUp(self):
+        self.canon_dir = Path(tempfile.mkdtemp())
+        write_json(self.canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_1', 'statement': 'The scalar field has a mass.'},
+            {'claim_id': 'C_2', 'statement': 'The scalar field couples to the Higgs field.'},
+            {'claim_id': 'C_3', 'statement': 'Clocks drift.'},
+        ]})
+        import zora_brain_api
+        self.brain = zora_brain_api.ZoraBrain(self.canon_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.canon_dir)
+
+    def test_store_opened_lazily(self):
+        self.assertIsNone(self.brain._store)
+        self.assertEqual(len(self.brain.canon_cache), 3)
+
+    def test_retrieve_relevant_claims(self):
+        claims = self.brain._retrieve_relevant_claims("scalar higgs couples", max_results=5)
+        self.assertEqual([c['claim_id'] for c in claims], ['C_2', 'C_1'])
+
+    def test_hybrid_retrieval(self):
+        import zora_brain_api
+        brain = zora_brain_api.ZoraBrain(self.canon_dir, retrieval='hybrid')
+        claims = brain._retrieve_relevant_claims("scalar higgs couples", max_results=2)
+        self.assertEqual(claims[0]['claim_id'], 'C_2')
+        with self.assertRaises(ValueError):
+            zora_brain_api.ZoraBrain(self.canon_dir, retrieval='keyword')
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Streams /api/generate responses like Ollama: one JSON object per line."""
+
+    protocol_version = 'HTTP/1.1'
+    tokens = ['The ', 'scalar ', 'field ', 'has a mass.']
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append((self.client_address, body))
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak_active = max(self.server.peak_active, self.server.active)
+        try:
+            self._respond(body)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _respond(self, body):
+        if body['model'] == 'missing':
+            payload = b'{"error": "model not found"}'
+            self.send_response(404)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for token in self.tokens + [None]:
+            time.sleep(self.delay)
+            chunk = {'model': body['model'], 'response': token or '', 'done': token is None}
+            data = (json.dumps(chunk) + '\n').encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class StubOllamaTestCase(unittest.TestCase):
+    """Runs a local stub Ollama server for the duration of a test."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.requests = []
+        self.server.lock = threading.Lock()
+        self.server.active = self.server.peak_active = 0
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        StubOllamaHandler.delay = 0.0
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestOllamaClient(StubOllamaTestCase):
+    """Streaming, pooling, errors and timeouts against the stub server."""
+
+    def test_stream_and_generate_share_a_connection(self):
+        async def run():
+            client = OllamaClient('gpt-oss:20b', base_url=self.url)
+            tokens = [token async for token in client.stream('hello')]
+            text = await client.generate('hello again')
+            await client.aclose()
+            return tokens, text
+
+        tokens, text = asyncio.run(run())
+        self.assertEqual(tokens, StubOllamaHandler.tokens)
+        self.assertEqual(text, 'The scalar field has a mass.')
+        self.assertEqual([body['prompt'] for _, body in self.server.requests], ['hello', 'hello again'])
+        self.assertTrue(all(body['stream'] for _, body in self.server.requests))
+        # Keep-alive: both requests came from the same client socket
+        self.assertEqual(len({address for address, _ in self.server.requests}), 1)
+
+    def test_errors(self):
+        async def run(client, timeout=None):
+            try:
+                return await client.generate('hello', timeout)
+            finally:
+                await client.aclose()
+
+        with self.assertRaisesRegex(OllamaError, '404'):
+            asyncio.run(run(OllamaClient('missing', base_url=self.url)))
+        StubOllamaHandler.delay = 0.2
+        with self.assertRaisesRegex(OllamaError, 'timeout'):
+            asyncio.run(run(OllamaClient('gpt-oss:20b', base_url=self.url), timeout=0.3))
+        with self.assertRaisesRegex(OllamaError, 'Cannot reach'):
+            asyncio.run(run(OllamaClient('gpt-oss:20b', base_url='127.0.0.1:9', connect_timeout=1)))
+
+    def test_query_stream(self):
+        import zora_brain_api
+        canon_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, canon_dir)
+        write_json(canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_1', 'statement': 'The scalar field has a mass.', 'claim_type': 'Derived',
+             'confidence': 0.9, 'source_document': 'doc', 'source_section': '1'}]})
+        brain = zora_brain_api.ZoraBrain(canon_dir, ollama_url=self.url)
+
+        async def run():
+            events = [event async for event in brain.query_stream('scalar field mass')]
+            response = await brain.query('scalar field mass')
+            await brain.ollama.aclose()
+            return events, response
+
+        events, response = asyncio.run(run())
+        self.assertEqual([e['token'] for e in events[:-1]], StubOllamaHandler.tokens)
+        self.assertTrue(events[-1]['done'])
+        self.assertEqual([c['claim_id'] for c in events[-1]['citations']], ['C_1'])
+        self.assertIn('The scalar field has a mass.', self.server.requests[0][1]['prompt'])
+        self.assertEqual(response.answer, 'The scalar field has a mass.')
+        self.assertEqual(response.confidence, 0.9)
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    """Slots, the bounded wait queue and metrics."""
+
+    def test_limits_and_metrics(self):
+        async def run():
+            limiter = ConcurrencyLimiter(max_active=1, max_waiting=1)
+            order = []
+
+            async def job(name):
+                async with limiter.slot():
+                    order.append(name)
+                    await asyncio.sleep(0.05)
+
+            first = asyncio.create_task(job('first'))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(job('second'))
+            await asyncio.sleep(0)
+            busy = limiter.metrics()
+            with self.assertRaises(QueueFull):
+                await limiter.acquire()
+            await asyncio.gather(first, second)
+            return order, busy, limiter.metrics()
+
+        order, busy, done = asyncio.run(run())
+        self.assertEqual(order, ['first', 'second'])
+        self.assertEqual((busy['active'], busy['waiting']), (1, 1))
+        self.assertEqual(done, {'active': 0, 'waiting': 0, 'max_active': 1, 'max_waiting': 1,
+                                'peak_waiting': 1, 'completed': 2, 'rejected': 1})
+
+
+class TestZoraBrainAPI(StubOllamaTestCase):
+    """Endpoints stay responsive while generations are in flight."""
+
+    def setUp(self):
+        super().setUp()
+        import zora_brain_api
+        self.api = zora_brain_api
+        self.canon_dir = Path(tempfile.mkdtemp())
+        write_json(self.canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_1', 'statement': 'The scalar field has a mass.'}]})
+        self.saved_brain = zora_brain_api.zora_brain
+        zora_brain_api.zora_brain = zora_brain_api.ZoraBrain(
+            self.canon_dir, ollama_url=self.url, max_concurrent=1, max_waiting=0)
+
+    def tearDown(self):
+        self.api.zora_brain = self.saved_brain
+        shutil.rmtree(self.canon_dir)
+        super().tearDown()
+
+    def test_health_while_generating_and_busy_rejection(self):
+        import httpx
+        StubOllamaHandler.delay = 0.2
+
+        async def run():
+            transport = httpx.ASGITransport(app=self.api.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://zora') as client:
+                await client.get('/health')
+                slow = asyncio.create_task(client.post('/query', json={'question': 'scalar mass'}))
+                await asyncio.sleep(0.3)
+                health = await client.get('/health')
+                still_generating = not slow.done()
+                busy = await client.post('/query/stream', json={'question': 'scalar mass'})
+                answer = await slow
+            await self.api.zora_brain.aclose()
+            return health, still_generating, busy, answer
+
+        health, still_generating, busy, answer = asyncio.run(run())
+        self.assertEqual(health.status_code, 200)
+        self.assertTrue(still_generating)
+        self.assertEqual(health.json()['canon_entries'], 1)
+        self.assertEqual(health.json()['queries']['active'], 1)
+        self.assertEqual(health.json()['batching']['generating'], 1)
+        self.assertEqual(busy.status_code, 503)
+        self.assertEqual(answer.status_code, 200)
+        self.assertEqual(answer.json()['answer'], 'The scalar field has a mass.')
+        self.assertEqual(self.api.zora_brain.limiter.metrics()['completed'], 1)
+
+    def test_health_and_cached_answers_during_index_build(self):
+        import httpx
+        brain = self.api.zora_brain
+        brain.answer_cache.put('cached question', None, 5, brain.canon_cache.content_hash(),
+                               {'answer': 'From the cache.', 'confidence': 0.7})
+        building, release, built = threading.Event(), threading.Event(), threading.Event()
+
+        class SlowIndex(BM25Index):
+            def __init__(self, store):
+                building.set()
+                release.wait(10)
+                super().__init__(store)
+                built.set()
+
+        async def run():
+            transport = httpx.ASGITransport(app=self.api.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://zora') as client:
+                slow = asyncio.create_task(client.post('/query', json={'question': 'scalar mass'}))
+                await asyncio.get_running_loop().run_in_executor(None, building.wait, 5)
+                health = await client.get('/health')
+                cached = await client.post('/query', json={'question': 'cached question'})
+                still_building = not built.is_set()
+                release.set()
+                answer = await slow
+            await brain.aclose()
+            return health, cached, still_building, answer
+
+        saved_index = self.api.BM25Index
+        self.api.BM25Index = SlowIndex
+        try:
+            health, cached, still_building, answer = asyncio.run(run())
+        finally:
+            release.set()
+            self.api.BM25Index = saved_index
+        self.assertTrue(still_building)
+        self.assertEqual(health.json()['canon_entries'], 1)
+        self.assertEqual(cached.json()['answer'], 'From the cache.')
+        self.assertEqual(answer.json()['answer'], 'The scalar field has a mass.')
+
+
+class TestAnswerCache(unittest.TestCase):
+    """Keys, invalidation, eviction and similarity lookups."""
+
+    def setUp(self):
+        self.tmp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_exact_lookup_and_invalidation(self):
+        cache = AnswerCache(self.tmp_dir / 'cache.sqlite3')
+        cache.put('What is the scalar mass?', None, 5, 'canon-1', {'answer': 'A'})
+        self.assertEqual(cache.get('  what is the SCALAR mass ', None, 5, 'canon-1'), {'answer': 'A'})
+        self.assertIsNone(cache.get('What is the scalar mass?', 'extra context', 5, 'canon-1'))
+        self.assertIsNone(cache.get('What is the scalar mass?', None, 3, 'canon-1'))
+        self.assertIsNone(cache.get('What is the scalar mass?', None, 5, 'canon-2'))
+        # Writing under a new canon purges the old canon's entries
+        cache.put('Other question', None, 5, 'canon-2', {'answer': 'B'})
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.metrics(), {'entries': 1, 'hits': 1, 'misses': 3})
+        # Another model or retrieval setup does not see these answers
+        other = AnswerCache(self.tmp_dir / 'cache.sqlite3', generator='["other-model", "bm25", null]')
+        self.assertIsNone(other.get('Other question', None, 5, 'canon-2'))
+
+    def test_ttl_and_lru(self):
+        cache = AnswerCache(self.tmp_dir / 'cache.sqlite3', max_entries=2, ttl=1.0)
+        cache.put('q1', None, 5, 'c', {'answer': '1'})
+        cache.put('q2', None, 5, 'c', {'answer': '2'})
+        time.sleep(0.01)
+        cache.get('q1', None, 5, 'c')
+        cache.put('q3', None, 5, 'c', {'answer': '3'})
+        self.assertIsNone(cache.get('q2', None, 5, 'c'))
+        self.assertEqual(cache.get('q1', None, 5, 'c'), {'answer': '1'})
+        time.sleep(1.05)
+        self.assertIsNone(cache.get('q3', None, 5, 'c'))
+
+    def test_similarity_lookup(self):
+        cache = AnswerCache(self.tmp_dir / 'cache.sqlite3', similarity_threshold=0.8,
+                            encoder=HashingEncoder())
+        cache.put('What is the mass of the scalar field?', None, 5, 'c', {'answer': 'A'})
+        self.assertEqual(cache.get('what is the mass of the scalar field please', None, 5, 'c'),
+                         {'answer': 'A'})
+        self.assertIsNone(cache.get('How do atomic clocks constrain the coupling?', None, 5, 'c'))
+        self.assertIsNone(AnswerCache(self.tmp_dir / 'cache.sqlite3', similarity_threshold=0.8,
+                                      encoder=HashingEncoder(), generator='other')
+                          .get('what is the mass of the scalar field please', None, 5, 'c'))
+        with self.assertRaises(ValueError):
+            AnswerCache(self.tmp_dir / 'other.sqlite3', similarity_threshold=0.8)
+
+
+class TestZoraBrainAnswerCache(StubOllamaTestCase):
+    """Repeated questions skip generation until the canon changes."""
+
+    def test_cached_until_canon_changes(self):
+        import zora_brain_api
+        canon_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, canon_dir)
+        claims_file = canon_dir / 'claims' / 'doc_claims.json'
+        write_json(claims_file, {'claims': [{'claim_id': 'C_1', 'statement': 'The scalar field has a mass.'}]})
+
+        async def ask(brain, question):
+            response = await brain.query(question)
+            await brain.ollama.aclose()
+            return response
+
+        brain = zora_brain_api.ZoraBrain(canon_dir, ollama_url=self.url)
+        first = asyncio.run(ask(brain, 'What is the scalar mass?'))
+        again = asyncio.run(ask(brain, 'what is the scalar mass'))
+        self.assertEqual(again, first)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(brain.answer_cache.metrics()['hits'], 1)
+
+        # Another model answers afresh
+        other = zora_brain_api.ZoraBrain(canon_dir, ollama_model='other-model', ollama_url=self.url)
+        self.assertEqual(asyncio.run(ask(other, 'What is the scalar mass?')).model_used, 'other-model')
+        self.assertEqual(len(self.server.requests), 2)
+
+        # A restarted brain sees the rewritten canon and regenerates
+        write_json(claims_file, {'claims': [{'claim_id': 'C_2', 'statement': 'The scalar field is light.'}]})
+        asyncio.run(ask(zora_brain_api.ZoraBrain(canon_dir, ollama_url=self.url), 'What is the scalar mass?'))
+        self.assertEqual(len(self.server.requests), 3)
+
+
+class TestBatching(StubOllamaTestCase):
+    """Histograms and the micro-batching scheduler."""
+
+    def test_histogram(self):
+        histogram = Histogram((1, 10, 100))
+        for value in (0.5, 5, 7, 50, 500):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'], {'1': 1, '10': 3, '100': 4, '+Inf': 5})
+        self.assertEqual((snapshot['count'], snapshot['p50'], snapshot['p95']), (5, 10, None))
+
+    def test_concurrent_queries_share_a_batch(self):
+        import zora_brain_api
+        canon_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, canon_dir)
+        write_json(canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_1', 'statement': 'The scalar field has a mass.'},
+            {'claim_id': 'C_2', 'statement': 'Torsion balances bound the coupling.'}]})
+        brain = zora_brain_api.ZoraBrain(canon_dir, ollama_url=self.url, answer_cache=False,
+                                         batch_window=0.1, max_batch=8, generation_concurrency=2)
+        StubOllamaHandler.delay = 0.02
+        questions = ['scalar mass', 'torsion coupling', 'scalar field', 'torsion balance', 'mass']
+
+        async def run():
+            responses = await asyncio.gather(*(brain.scheduler.submit(q) for q in questions))
+            await brain.aclose()
+            return responses
+
+        responses = asyncio.run(run())
+        self.assertEqual([r.answer for r in responses], ['The scalar field has a mass.'] * 5)
+        prompts = {body['prompt'] for _, body in self.server.requests}
+        self.assertEqual(len(prompts), 5)
+        self.assertTrue(any('Torsion balances' in p for p in prompts))
+        self.assertLessEqual(self.server.peak_active, 2)
+        metrics = brain.scheduler.metrics()
+        self.assertEqual(metrics['batch_size']['count'], 1)
+        self.assertEqual(metrics['batch_size']['sum'], 5)
+        self.assertEqual(metrics['latency_ms']['total']['count'], 5)
+        self.assertEqual(metrics['latency_ms']['retrieval']['count'], 1)
+
+    def test_cancelled_request_skips_generation(self):
+        import zora_brain_api
+        canon_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, canon_dir)
+        write_json(canon_dir / 'claims' / 'doc_claims.json', {'claims': [
+            {'claim_id': 'C_1', 'statement': 'The scalar field has a mass.'}]})
+        brain = zora_brain_api.ZoraBrain(canon_dir, ollama_url=self.url, answer_cache=False,
+                                         generation_concurrency=1)
+        StubOllamaHandler.delay = 0.05
+
+        async def run():
+            first = asyncio.create_task(brain.scheduler.submit('scalar mass'))
+            second = asyncio.create_task(brain.scheduler.submit('scalar field'))
+            while brain.scheduler.load()['waiting_for_model'] == 0:
+                await asyncio.sleep(0.01)
+            load = brain.scheduler.load()
+            second.cancel()
+            response = await first
+            await asyncio.sleep(0.1)
+            await brain.aclose()
+            return load, response, second.cancelled()
+
+        load, response, cancelled = asyncio.run(run())
+        self.assertEqual(load, {'queued': 0, 'retrieving': 0, 'waiting_for_model': 1, 'generating': 1})
+        self.assertEqual(response.answer, 'The scalar field has a mass.')
+        self.assertTrue(cancelled)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(brain.scheduler.load()['generating'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Zora Answer Cache
+SQLite-backed cache of Zora Brain responses keyed on the normalised question,
+context and citation count, the generating model and retrieval setup, and the
+canon's content hash, with LRU and TTL eviction and an optional
+near-duplicate lookup over question embeddings.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+CACHE_NAME = "answer_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL = 24 * 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    key TEXT PRIMARY KEY,
+    canon_hash TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    question TEXT NOT NULL,
+    embedding BLOB,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_scope ON answers (canon_hash, scope);
+CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used);
+"""
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, collapse whitespace and drop surrounding punctuation."""
+    return re.sub(r'\s+', ' ', (text or '').lower()).strip(' \t?!.,;:')
+
+
+class AnswerCache:
+    """
+    Response cache for one canon.
+
+    Entries for another canon hash are never returned and are purged on the
+    next write, so a changed canon invalidates the cache by itself.
+    """
+
+    def __init__(self, path: Path, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl: Optional[float] = DEFAULT_TTL, similarity_threshold: Optional[float] = None,
+                 encoder=None, generator: str = ""):
+        """
+        Args:
+            path: SQLite file
+            max_entries: Entries kept; the least recently used go first
+            ttl: Seconds an entry stays valid (None: forever)
+            similarity_threshold: Cosine similarity at which a cached question
+                counts as the same question (None: exact matches only)
+            encoder: Question encoder with encode(texts) -> unit vectors, needed
+                for similarity lookups
+            generator: Model and retrieval setup producing the answers; answers
+                cached under another one are never returned
+        """
+        if similarity_threshold is not None and encoder is None:
+            raise ValueError("similarity lookups need a question encoder")
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.encoder = encoder
+        self.generator = generator
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as con:
+            con.executescript(SCHEMA)
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection to the cache, committed on success and closed afterwards."""
+        con = sqlite3.connect(self.path)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def scope(self, context: Optional[str], max_citations: int) -> str:
+        """Everything besides the question and canon that a cached answer must match."""
+        return json.dumps([normalize_text(context), max_citations, self.generator])
+
+    def key(self, question: str, context: Optional[str], max_citations: int, canon_hash: str) -> str:
+        material = json.dumps([normalize_text(question), self.scope(context, max_citations), canon_hash])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _embed(self, question: str) -> np.ndarray:
+        return np.asarray(self.encoder.encode([normalize_text(question)])[0], dtype=np.float32)
+
+    def get(self, question: str, context: Optional[str], max_citations: int,
+            canon_hash: str) -> Optional[Dict]:
+        """The cached response dict, or None."""
+        now = time.time()
+        oldest = now - self.ttl if self.ttl is not None else float('-inf')
+        key = self.key(question, context, max_citations, canon_hash)
+        with self.connect() as con:
+            row = con.execute("SELECT key, response FROM answers WHERE key = ? AND created_at >= ?",
+                              (key, oldest)).fetchone()
+            if row is None and self.similarity_threshold is not None:
+                row = self._nearest(con, question, self.scope(context, max_citations), canon_hash, oldest)
+            if row is None:
+                self.misses += 1
+                return None
+            con.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, row[0]))
+        self.hits += 1
+        return json.loads(row[1])
+
+    def _nearest(self, con: sqlite3.Connection, question: str, scope: str, canon_hash: str,
+                 oldest: float):
+        query = self._embed(question)
+        rows = con.execute("SELECT key, embedding FROM answers "
+                           "WHERE canon_hash = ? AND scope = ? AND created_at >= ? AND embedding IS NOT NULL",
+                           (canon_hash, scope, oldest)).fetchall()
+        rows = [(key, blob) for key, blob in rows if len(blob) == query.nbytes]
+        if not rows:
+            return None
+        matrix = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32).reshape(len(rows), -1)
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        return con.execute("SELECT key, response FROM answers WHERE key = ?", (rows[best][0],)).fetchone()
+
+    def put(self, question: str, context: Optional[str], max_citations: int,
+            canon_hash: str, response: Dict):
+        """Cache a response, dropping other canons' entries and the least recently used."""
+        now = time.time()
+        embedding = self._embed(question).tobytes() if self.encoder is not None else None
+        with self.connect() as con:
+            con.execute("DELETE FROM answers WHERE canon_hash != ?", (canon_hash,))
+            if self.ttl is not None:
+                con.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+            con.execute(
+                "INSERT OR REPLACE INTO answers (key, canon_hash, scope, question, embedding, response, "
+                "created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.key(question, context, max_citations, canon_hash), canon_hash,
+                 self.scope(context, max_citations), normalize_text(question), embedding,
+                 json.dumps(response, ensure_ascii=False), now, now))
+            con.execute("DELETE FROM answers WHERE key IN (SELECT key FROM answers "
+                        "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        with self.connect() as con:
+            con.execute("DELETE FROM answers")
+
+    def __len__(self) -> int:
+        with self.connect() as con:
+            return con.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    def metrics(self) -> Dict[str, int]:
+        return {'entries': len(self), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Zora Query Batching
+Micro-batching scheduler for Zora Brain queries. Requests arriving within a
+short window are retrieved together in one batched pass. Their generations
+then run with bounded parallelism against the model server. Latency
+histograms cover each stage.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Optional, Sequence
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, 120000)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style) with approximate quantiles."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty or past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': buckets
+        }
+
+
+@dataclass
+class _Request:
+    question: str
+    context: Optional[str]
+    max_citations: int
+    timeout: Optional[float]
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.perf_counter)
+
+
+def _cancel_if_cancelled(task: asyncio.Task, future: asyncio.Future):
+    """Stop a request's generation once its caller has cancelled the request."""
+    if future.cancelled():
+        task.cancel()
+
+
+class BatchScheduler:
+    """
+    Collects concurrent queries into batches in front of a ZoraBrain.
+
+    A batch closes when max_batch requests are queued or window seconds after
+    its first request arrived. Its retrieval runs as one call on the brain's
+    retrieval threads. Each request's generation then starts as soon as one of
+    the generation_concurrency model slots is free, while the next batch is
+    already being collected. Requests whose caller stopped waiting (client
+    disconnects, outer timeouts) are dropped before retrieval and before
+    taking a model slot, and a generation in flight is cancelled with them.
+    """
+
+    STAGES = ('queue', 'retrieval', 'generation', 'total')
+
+    def __init__(self, brain, window: float = 0.01, max_batch: int = 16, generation_concurrency: int = 4):
+        """
+        Args:
+            brain: ZoraBrain answering the queries
+            window: Seconds to wait for more requests after the first of a batch
+            max_batch: Largest batch
+            generation_concurrency: Generations sent to the model server at once
+        """
+        self.brain = brain
+        self.window = window
+        self.max_batch = max_batch
+        self.generation_concurrency = generation_concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._generation_slots: Optional[asyncio.Semaphore] = None
+        self._generations = set()
+        self._retrieving = 0
+        self._waiting_for_slot = 0
+        self.latency_ms = {stage: Histogram(LATENCY_BUCKETS_MS) for stage in self.STAGES}
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+
+    def _start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._generation_slots = asyncio.Semaphore(self.generation_concurrency)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, question: str, context: Optional[str] = None, max_citations: int = 5,
+                     timeout: Optional[float] = None):
+        """Queue a query and wait for its QueryResponse."""
+        self._start()
+        request = _Request(question, context, max_citations, timeout,
+                           asyncio.get_running_loop().create_future())
+        await self._queue.put(request)
+        return await request.future
+
+    async def _next_batch(self) -> List[_Request]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = [request for request in await self._next_batch() if not request.future.done()]
+            if not batch:
+                continue
+            started = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for request in batch:
+                self.latency_ms['queue'].observe((started - request.enqueued) * 1000)
+            self._retrieving = len(batch)
+            try:
+                claims = await self.brain.run_blocking(
+                    self.brain._retrieve_batch, [r.question for r in batch],
+                    [r.max_citations * 2 for r in batch])
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            finally:
+                self._retrieving = 0
+            self.latency_ms['retrieval'].observe((time.perf_counter() - started) * 1000)
+            for request, relevant_claims in zip(batch, claims):
+                if request.future.done():
+                    continue
+                task = asyncio.get_running_loop().create_task(self._generate(request, relevant_claims))
+                self._generations.add(task)
+                task.add_done_callback(self._generations.discard)
+                request.future.add_done_callback(partial(_cancel_if_cancelled, task))
+
+    async def _generate(self, request: _Request, relevant_claims: List[Dict]):
+        if request.future.done():
+            return
+        self._waiting_for_slot += 1
+        try:
+            await self._generation_slots.acquire()
+        finally:
+            self._waiting_for_slot -= 1
+        try:
+            # The caller may have gone while this request waited for the slot
+            if request.future.done():
+                return
+            started = time.perf_counter()
+            response = await self.brain._answer(request.question, request.context,
+                                                request.max_citations, relevant_claims, request.timeout)
+        except Exception as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+            return
+        finally:
+            self._generation_slots.release()
+        self.latency_ms['generation'].observe((time.perf_counter() - started) * 1000)
+        self.latency_ms['total'].observe((time.perf_counter() - request.enqueued) * 1000)
+        if not request.future.done():
+            request.future.set_result(response)
+
+    async def aclose(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def load(self) -> Dict[str, int]:
+        """
+        Requests inside the scheduler: queued for the next batch, in the batch
+        being retrieved, waiting for a model slot, and generating.
+        """
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'retrieving': self._retrieving,
+            'waiting_for_model': self._waiting_for_slot,
+            'generating': len(self._generations) - self._waiting_for_slot
+        }
+
+    def metrics(self) -> Dict:
+        return {
+            **self.load(),
+            'batch_size': self.batch_sizes.snapshot(),
+            'latency_ms': {stage: histogram.snapshot() for stage, histogram in self.latency_ms.items()}
+        }
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Retrieval Benchmark
+Builds a synthetic canon and reports, for BM25, exact and IVF vector search
+and hybrid fusion, known-item recall@k (queries are noisy word samples of one
+claim) and queries per second; IVF is also scored against exact search.
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from canon_search import BM25Index
+from canon_store import CanonStore
+from canon_vectors import IVF_MIN_RECORDS, HybridRetriever, VectorIndex
+
+VOCABULARY = [
+    "scalar", "field", "mass", "coupling", "higgs", "portal", "mixing", "angle", "torsion",
+    "balance", "fifth", "force", "yukawa", "range", "clock", "drift", "frequency", "atomic",
+    "consciousness", "potential", "vacuum", "energy", "density", "cosmological", "constant",
+    "dark", "matter", "halo", "rotation", "curve", "lensing", "gravity", "metric", "tensor",
+    "lagrangian", "symmetry", "breaking", "phase", "transition", "inflation", "reheating",
+    "neutrino", "oscillation", "decay", "width", "collider", "bound", "limit", "sensitivity",
+]
+
+
+def synthetic_claims(n: int, rng: random.Random) -> List[str]:
+    """Statements drawn from a Zipf-weighted physics vocabulary."""
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    return [" ".join(rng.choices(VOCABULARY, weights, k=rng.randint(8, 20))) for _ in range(n)]
+
+
+def noisy_query(statement: str, rng: random.Random) -> str:
+    """Half of a statement's words plus two random ones."""
+    words = statement.split()
+    return " ".join(rng.sample(words, max(2, len(words) // 2)) + rng.choices(VOCABULARY, k=2))
+
+
+def measure(search: Callable[[str], List[Tuple[float, int]]], queries: List[str]):
+    start = time.perf_counter()
+    results = [[seq for _, seq in search(q)] for q in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark canon retrieval recall@k and throughput")
+    parser.add_argument("--claims", type=int, default=20000, help="Synthetic canon size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, help="IVF lists scanned per query (default: scaled with the list count)")
+    parser.add_argument("--ivf-min-records", type=int, default=IVF_MIN_RECORDS,
+                        help="Smallest collection that gets an IVF index")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    canon_dir = Path(tempfile.mkdtemp())
+    try:
+        statements = synthetic_claims(args.claims, rng)
+        (canon_dir / 'claims').mkdir()
+        with open(canon_dir / 'claims' / 'synthetic_claims.json', 'w', encoding='utf-8') as f:
+            json.dump({'claims': [{'claim_id': f"C_{i}", 'statement': s} for i, s in enumerate(statements)]}, f)
+
+        start = time.perf_counter()
+        store = CanonStore(canon_dir)
+        bm25 = BM25Index(store)
+        vectors = VectorIndex(store, nprobe=args.nprobe, ivf_min_records=args.ivf_min_records)
+        print(f"Canon:   {args.claims} claims, indexed in {time.perf_counter() - start:.1f}s")
+
+        with store.connect() as con:
+            seq_of = dict(con.execute("SELECT record_id, seq FROM records"))
+        targets = rng.sample(range(args.claims), args.queries)
+        queries = [noisy_query(statements[i], rng) for i in targets]
+        expected = [seq_of[f"C_{i}"] for i in targets]
+
+        runs = {
+            'BM25': lambda q: bm25.search(q, args.k),
+            'Vector (exact)': lambda q: vectors.search(q, args.k, exact=True),
+            'Vector (IVF)': lambda q: vectors.search(q, args.k),
+            'Hybrid': lambda q: HybridRetriever(bm25, vectors).search(q, args.k),
+        }
+        results = {}
+        print(f"{'':16}{'recall@' + str(args.k):>12}{'QPS':>10}")
+        for name, search in runs.items():
+            results[name], qps = measure(search, queries)
+            recall = sum(seq in hits for seq, hits in zip(expected, results[name])) / len(queries)
+            print(f"{name:16}{recall:12.3f}{qps:10.0f}")
+
+        overlap = sum(len(set(a) & set(b)) for a, b in zip(results['Vector (IVF)'], results['Vector (exact)']))
+        total = sum(len(b) for b in results['Vector (exact)']) or 1
+        print(f"IVF recall@{args.k} vs exact search: {overlap / total:.3f}")
+    finally:
+        shutil.rmtree(canon_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Zora Canon Search
+BM25 retrieval over the canon store: an inverted index of claim statements and
+equation formulas/contexts, kept in the store file and queried through the
+posting lists of the query terms only.
+"""
+
+import argparse
+import math
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from canon_store import CanonStore
+
+INDEX_VERSION = "1"
+K1 = 1.2
+B = 0.75
+
+TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset("""
+a an and are as at be by does for from has have how in is it its of on or that the
+this to was were what when where which who why will with
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bm25_postings (
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    seqs BLOB NOT NULL,
+    weights BLOB NOT NULL,
+    PRIMARY KEY (kind, term)
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens without stopwords (LaTeX \\theta_{hc} -> theta, hc)."""
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def record_text(kind: str, record: Dict) -> str:
+    """Searchable text of a canon record."""
+    if kind == 'equation':
+        return f"{record.get('latex_formula') or ''} {record.get('context') or ''}"
+    return record.get('statement') or ''
+
+
+class BM25Index:
+    """
+    Okapi BM25 over the claims and equations of a CanonStore.
+
+    Each kind is scored as its own collection. Postings store the full BM25
+    term weight (idf times saturated, length-normalised tf) per record, so a
+    query sums the weights of its terms' postings with numpy and partitions
+    out the top k. Query cost is linear in the total length of its terms'
+    posting lists. The index is rebuilt whenever the store's generation
+    changes.
+    """
+
+    KINDS = ('claim', 'equation')
+
+    def __init__(self, store: CanonStore, k1: float = K1, b: float = B):
+        self.store = store
+        self.k1 = k1
+        self.b = b
+        self.refresh()
+
+    def _signature(self) -> str:
+        return f"{INDEX_VERSION}:{self.store.generation}:{self.k1}:{self.b}"
+
+    def refresh(self) -> bool:
+        """Rebuild the index if the store changed since it was built (returns True if rebuilt)."""
+        signature = self._signature()
+        with self.store.connect() as con:
+            con.executescript(SCHEMA)
+            row = con.execute("SELECT value FROM meta WHERE key = 'bm25'").fetchone()
+        if row is not None and row[0] == signature:
+            return False
+        self.build(signature)
+        return True
+
+    def build(self, signature: Optional[str] = None):
+        """Tokenize every record once and write the posting lists."""
+        rows = []
+        for kind in self.KINDS:
+            rows.extend(self._postings(kind, self.store.iter_records(kind)))
+        with self.store.connect() as con:
+            con.execute("DELETE FROM bm25_postings")
+            con.executemany("INSERT INTO bm25_postings (kind, term, seqs, weights) VALUES (?, ?, ?, ?)",
+                            rows)
+            con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bm25', ?)",
+                        (signature or self._signature(),))
+
+    def _postings(self, kind: str, records: Iterable[Tuple[int, Dict]]):
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = {}
+        for seq, record in records:
+            tokens = tokenize(record_text(kind, record))
+            lengths[seq] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((seq, tf))
+        if not lengths:
+            return
+        n = len(lengths)
+        avgdl = sum(lengths.values()) / n or 1.0
+        for term, entries in postings.items():
+            idf = math.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+            seqs = array('q', (seq for seq, _ in entries))
+            weights = array('d', (
+                idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths[seq] / avgdl))
+                for seq, tf in entries))
+            yield kind, term, seqs.tobytes(), weights.tobytes()
+
+    def search(self, query: str, k: int = 10, kind: Optional[str] = 'claim') -> List[Tuple[float, int]]:
+        """
+        Top-k (score, seq) pairs for a query, best first.
+
+        Args:
+            query: Free-text query
+            k: Number of results
+            kind: 'claim', 'equation', or None for both
+        """
+        return self.search_batch([query], k, kind)[0]
+
+    def search_batch(self, queries: Sequence[str], k: int = 10,
+                     kind: Optional[str] = 'claim') -> List[List[Tuple[float, int]]]:
+        """search() for several queries, reading each distinct term's postings once."""
+        query_terms = [list(dict.fromkeys(tokenize(query))) for query in queries]
+        all_terms = list(dict.fromkeys(term for terms in query_terms for term in terms))
+        kinds = self.KINDS if kind is None else (kind,)
+        postings: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        if all_terms and k > 0:
+            with self.store.connect() as con:
+                for kind_name in kinds:
+                    for start in range(0, len(all_terms), 500):
+                        chunk = all_terms[start:start + 500]
+                        rows = con.execute(
+                            f"SELECT term, seqs, weights FROM bm25_postings "
+                            f"WHERE kind = ? AND term IN ({', '.join('?' * len(chunk))})",
+                            [kind_name] + chunk)
+                        for term, seq_bytes, weight_bytes in rows:
+                            postings.setdefault(term, []).append((
+                                np.frombuffer(seq_bytes, dtype=np.int64),
+                                np.frombuffer(weight_bytes, dtype=np.float64)))
+        return [_top_k([entry for term in terms for entry in postings.get(term, ())], k)
+                for terms in query_terms]
+
+    def search_records(self, query: str, k: int = 10, kind: Optional[str] = 'claim') -> List[Dict]:
+        """Records of the top-k hits, best first."""
+        return self.store.get_by_seq([seq for _, seq in self.search(query, k, kind)])
+
+
+def _top_k(lists: List[Tuple[np.ndarray, np.ndarray]], k: int) -> List[Tuple[float, int]]:
+    """Top-k (score, seq) pairs summed over (seqs, weights) posting lists; ties go to the earlier record."""
+    if not lists or k <= 0:
+        return []
+    all_seqs = np.concatenate([seqs for seqs, _ in lists])
+    all_weights = np.concatenate([weights for _, weights in lists])
+    size = int(all_seqs.max()) + 1
+    if size <= 4 * len(all_seqs):
+        # Dense accumulator indexed by seq; BM25 weights are positive, so 0 means no match
+        scores = np.bincount(all_seqs, weights=all_weights, minlength=size)
+        seqs = np.flatnonzero(scores)
+        scores = scores[seqs]
+    else:
+        seqs, inverse = np.unique(all_seqs, return_inverse=True)
+        scores = np.bincount(inverse.ravel(), weights=all_weights)
+    if len(scores) > k:
+        keep = scores >= np.partition(scores, len(scores) - k)[len(scores) - k]
+        seqs, scores = seqs[keep], scores[keep]
+    order = np.lexsort((seqs, -scores))[:k]
+    return [(float(scores[i]), int(seqs[i])) for i in order]
+
+
+def records_for_hits(store: CanonStore, hit_lists: List[List[Tuple[float, int]]]) -> List[List[Dict]]:
+    """Records of several queries' hits, decoded with one store lookup."""
+    records = store.records_by_seq(list({seq for hits in hit_lists for _, seq in hits}))
+    return [[records[seq] for _, seq in hits if seq in records] for hits in hit_lists]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the Zora canon with BM25")
+    parser.add_argument("--canon-dir", required=True, help="Canon directory (or canon_ingest output directory)")
+    parser.add_argument("--kind", choices=['claim', 'equation', 'all'], default='claim')
+    parser.add_argument("-k", type=int, default=10, help="Number of results")
+    parser.add_argument("query", nargs='?', help="Query (omit to just build the index)")
+    args = parser.parse_args()
+
+    index = BM25Index(CanonStore(Path(args.canon_dir)))
+    if not args.query:
+        print(f"✓ BM25 index up to date in {index.store.store_path}")
+        return
+    hits = index.search(args.query, args.k, None if args.kind == 'all' else args.kind)
+    for (score, _), record in zip(hits, index.store.get_by_seq([seq for _, seq in hits])):
+        kind = 'equation' if 'equation_id' in record else 'claim'
+        print(f"{score:7.3f}  {record[kind + '_id']}  {record_text(kind, record)[:100]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Zora Canon Store
+Packs the canon's claim and equation records into one SQLite file (zlib-
+compressed JSON bodies, memory-mapped reads) with an ID index, refreshed
+per source file, so the Zora Brain opens a large canon without parsing it.
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import zlib
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+STORE_NAME = "canon_store.sqlite3"
+STORE_VERSION = "1"
+RECORD_KINDS = {'claims': 'claim', 'equations': 'equation'}
+MMAP_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    statement TEXT,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_kind ON records (kind);
+CREATE INDEX IF NOT EXISTS idx_records_source ON records (source);
+
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def resolve_canon_dir(canon_dir: Path) -> Path:
+    """
+    The directory holding claims/ and equations/.
+
+    Accepts either that directory or a canon_ingest --output-dir (which keeps
+    them under canon/).
+    """
+    canon_dir = Path(canon_dir)
+    inner = canon_dir / "canon"
+    if not (canon_dir / "claims").exists() and (inner / "claims").exists():
+        return inner
+    return canon_dir
+
+
+def iter_file_records(path: Path, kind_dir: str) -> Iterator[Dict]:
+    """
+    Records of one canon file: the aggregated {claims: [...]} / {equations: [...]}
+    files written by canon_ingest, or a single record per file.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get(kind_dir), list):
+        yield from data[kind_dir]
+    elif isinstance(data, list):
+        yield from data
+    elif isinstance(data, dict):
+        data.setdefault(f"{RECORD_KINDS[kind_dir]}_id", path.stem)
+        yield data
+
+
+def _pack(record: Dict) -> bytes:
+    return zlib.compress(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+
+
+def _unpack(body: bytes) -> Dict:
+    return json.loads(zlib.decompress(body).decode('utf-8'))
+
+
+class CanonStore(Mapping):
+    """
+    Read-mostly store of canon records, keyed by claim_id / equation_id.
+
+    Behaves as a read-only mapping (record_id -> record dict) whose values are
+    decoded only when accessed.
+    """
+
+    def __init__(self, canon_dir: Path, store_path: Optional[Path] = None, refresh: bool = True):
+        """
+        Open the store, creating it if needed.
+
+        Args:
+            canon_dir: Canon directory (or canon_ingest output directory)
+            store_path: SQLite file (default: <canon_dir>/canon_store.sqlite3)
+            refresh: Re-pack source files that changed since the last refresh
+        """
+        self.canon_dir = resolve_canon_dir(canon_dir)
+        self.store_path = Path(store_path) if store_path else self.canon_dir / STORE_NAME
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as con:
+            con.executescript(SCHEMA)
+            row = con.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != STORE_VERSION:
+                con.execute("DELETE FROM records")
+                con.execute("DELETE FROM sources")
+                con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                            (STORE_VERSION,))
+        if refresh:
+            self.refresh()
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection to the store, committed on success and closed afterwards."""
+        con = sqlite3.connect(self.store_path)
+        try:
+            con.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _source_files(self) -> Dict[str, Tuple[Path, str, str]]:
+        """relative path -> (path, kind directory, mtime/size signature)"""
+        files = {}
+        for kind_dir in RECORD_KINDS:
+            directory = self.canon_dir / kind_dir
+            if not directory.exists():
+                continue
+            for path in sorted(directory.glob("*.json")):
+                stat = path.stat()
+                files[f"{kind_dir}/{path.name}"] = (path, kind_dir, f"{stat.st_mtime_ns}:{stat.st_size}")
+        return files
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the store in line with the canon files; only changed, new and
+        deleted files are touched.
+
+        Returns:
+            Dict with the numbers of updated and removed source files
+        """
+        files = self._source_files()
+        with self.connect() as con:
+            known = dict(con.execute("SELECT path, signature FROM sources"))
+            removed = [source for source in known if source not in files]
+            changed = [source for source, (_, _, signature) in files.items()
+                       if known.get(source) != signature]
+            for source in removed + changed:
+                con.execute("DELETE FROM records WHERE source = ?", (source,))
+                con.execute("DELETE FROM sources WHERE path = ?", (source,))
+            if removed or changed:
+                con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                            (str(self._generation(con) + 1),))
+            for source in changed:
+                path, kind_dir, signature = files[source]
+                kind = RECORD_KINDS[kind_dir]
+                rows = []
+                for record in iter_file_records(path, kind_dir):
+                    record_id = record.get(f"{kind}_id")
+                    if record_id:
+                        rows.append((record_id, kind, source, record.get('statement'), _pack(record)))
+                con.executemany(
+                    "INSERT OR REPLACE INTO records (record_id, kind, source, statement, body) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                con.execute("INSERT INTO sources (path, signature) VALUES (?, ?)", (source, signature))
+        return {'updated': len(changed), 'removed': len(removed)}
+
+    @staticmethod
+    def _generation(con: sqlite3.Connection) -> int:
+        row = con.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every refresh that changed the records."""
+        with self.connect() as con:
+            return self._generation(con)
+
+    def content_hash(self) -> str:
+        """Hash of the packed source files' signatures; changes whenever the canon does."""
+        with self.connect() as con:
+            rows = con.execute("SELECT path, signature FROM sources ORDER BY path").fetchall()
+        return hashlib.sha256(json.dumps(rows).encode('utf-8')).hexdigest()
+
+    def __getitem__(self, record_id: str) -> Dict:
+        with self.connect() as con:
+            row = con.execute("SELECT body FROM records WHERE record_id = ?", (record_id,)).fetchone()
+        if row is None:
+            raise KeyError(record_id)
+        return _unpack(row[0])
+
+    def __iter__(self) -> Iterator[str]:
+        with self.connect() as con:
+            ids = [row[0] for row in con.execute("SELECT record_id FROM records ORDER BY seq")]
+        return iter(ids)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __contains__(self, record_id) -> bool:
+        with self.connect() as con:
+            return con.execute("SELECT 1 FROM records WHERE record_id = ?",
+                               (record_id,)).fetchone() is not None
+
+    def count(self, kind: Optional[str] = None) -> int:
+        with self.connect() as con:
+            if kind is None:
+                return con.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            return con.execute("SELECT COUNT(*) FROM records WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def get_many(self, record_ids: List[str]) -> List[Dict]:
+        """Records for several IDs, in the given order (unknown IDs are skipped)."""
+        if not record_ids:
+            return []
+        with self.connect() as con:
+            placeholders = ", ".join("?" * len(record_ids))
+            bodies = dict(con.execute(
+                f"SELECT record_id, body FROM records WHERE record_id IN ({placeholders})",
+                list(record_ids)))
+        return [_unpack(bodies[record_id]) for record_id in record_ids if record_id in bodies]
+
+    def iter_records(self, kind: str) -> Iterator[Tuple[int, Dict]]:
+        """(seq, record) pairs of one kind, decoding every body (for index builds)."""
+        with self.connect() as con:
+            rows = con.execute("SELECT seq, body FROM records WHERE kind = ? ORDER BY seq",
+                               (kind,)).fetchall()
+        for seq, body in rows:
+            yield seq, _unpack(body)
+
+    def records_by_seq(self, seqs: List[int]) -> Dict[int, Dict]:
+        """seq -> record for several row numbers (unknown ones are left out)."""
+        if not seqs:
+            return {}
+        with self.connect() as con:
+            placeholders = ", ".join("?" * len(seqs))
+            bodies = con.execute(f"SELECT seq, body FROM records WHERE seq IN ({placeholders})",
+                                 list(seqs)).fetchall()
+        return {seq: _unpack(body) for seq, body in bodies}
+
+    def get_by_seq(self, seqs: List[int]) -> List[Dict]:
+        """Records for several row numbers, in the given order."""
+        records = self.records_by_seq(seqs)
+        return [records[seq] for seq in seqs if seq in records]
+
+    def iter_statements(self, kind: str = 'claim') -> Iterator[Tuple[str, str]]:
+        """(record_id, statement) pairs without decoding record bodies."""
+        with self.connect() as con:
+            rows = con.execute("SELECT record_id, statement FROM records "
+                               "WHERE kind = ? AND statement IS NOT NULL ORDER BY seq",
+                               (kind,)).fetchall()
+        return iter(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the Zora canon into a single store file")
+    parser.add_argument("--canon-dir", required=True, help="Canon directory (or canon_ingest output directory)")
+    parser.add_argument("--store", help="Store file (default: <canon-dir>/canon_store.sqlite3)")
+    args = parser.parse_args()
+
+    store = CanonStore(Path(args.canon_dir), Path(args.store) if args.store else None, refresh=False)
+    result = store.refresh()
+    print(f"✓ {result['updated']} files packed, {result['removed']} removed")
+    print(f"✓ {store.count('claim')} claims, {store.count('equation')} equations in {store.store_path}")
+
+
+if __name__ == '__main__':
+    main()
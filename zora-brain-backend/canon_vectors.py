@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Zora Canon Vectors
+Offline dense retrieval over the canon store: one embedding per claim and
+equation, kept as a memory-mapped float32 matrix grouped by an IVF
+(inverted-file, k-means) index, plus BM25/vector hybrid fusion.
+"""
+
+import argparse
+import json
+import math
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from canon_search import BM25Index, record_text, tokenize
+from canon_store import CanonStore
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+VECTORS_VERSION = "2"
+VECTORS_DIR = "vectors"
+HASHING_DIM = 768
+# Collections smaller than this are searched exactly (a few ms per query);
+# IVF trades recall for speed only beyond
+IVF_MIN_RECORDS = 50000
+KMEANS_ITERATIONS = 10
+# Share of a collection's IVF lists scanned per query by default, and the floor
+NPROBE_FRACTION = 0.1
+MIN_NPROBE = 16
+DEFAULT_ALPHA = 0.5
+
+
+class HashingEncoder:
+    """
+    TF-IDF over hashed unigrams and bigrams (the hashing trick), L2-normalised.
+
+    Needs no model files. IDF weights are fitted per collection and saved with
+    its vectors so queries are weighted like the records.
+    """
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    @property
+    def name(self) -> str:
+        return f"hashing-{self.dim}"
+
+    def _features(self, text: str) -> Dict[int, float]:
+        tokens = tokenize(text)
+        features: Dict[int, float] = {}
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            h = zlib.crc32(feature.encode('utf-8'))
+            bucket = h % self.dim
+            # A hash bit picks the sign so collisions cancel out on average
+            features[bucket] = features.get(bucket, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        return features
+
+    def fit(self, texts: Sequence[str]):
+        df = np.zeros(self.dim, dtype=np.float64)
+        for text in texts:
+            df[list(self._features(text))] += 1
+        self.idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, value in self._features(text).items():
+                if value:
+                    vectors[row, bucket] = math.copysign(1 + math.log(abs(value)), value)
+        vectors *= self.idf
+        return _normalize(vectors)
+
+    def state(self) -> Dict:
+        return {'idf': self.idf.tolist()}
+
+    def load_state(self, state: Dict):
+        self.idf = np.asarray(state['idf'], dtype=np.float32)
+
+
+class SentenceTransformerEncoder:
+    """A locally available sentence-transformers model."""
+
+    def __init__(self, model_name: str):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError("sentence-transformers is not installed")
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    @property
+    def name(self) -> str:
+        return f"st-{self.model_name}"
+
+    def fit(self, texts: Sequence[str]):
+        pass
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return _normalize(np.asarray(self.model.encode(list(texts), batch_size=64), dtype=np.float32))
+
+    def state(self) -> Dict:
+        return {}
+
+    def load_state(self, state: Dict):
+        pass
+
+
+def make_encoder(model_name: Optional[str] = None):
+    """The named sentence-transformers model if it can be used, else the hashing encoder."""
+    if model_name and SENTENCE_TRANSFORMERS_AVAILABLE:
+        try:
+            return SentenceTransformerEncoder(model_name)
+        except (OSError, ValueError):
+            pass
+    return HashingEncoder()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _save_npy(path: Path, array: np.ndarray):
+    tmp_path = path.with_name(path.name + '.tmp.npy')
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def kmeans(vectors: np.ndarray, nlist: int, iterations: int = KMEANS_ITERATIONS,
+           seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical k-means on unit vectors.
+
+    Returns:
+        (centroids, assignment of each vector)
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    assignment = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(iterations):
+        for start in range(0, len(vectors), 8192):
+            chunk = vectors[start:start + 8192]
+            assignment[start:start + 8192] = np.argmax(chunk @ centroids.T, axis=1)
+        # Sum each cluster's members in one pass over the vectors sorted by cluster
+        # (linear in n, unlike one boolean mask per cluster)
+        order = np.argsort(assignment, kind='stable')
+        sizes = np.bincount(assignment, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        filled = sizes > 0
+        # Empty clusters keep their previous centroid
+        centroids[filled] = np.add.reduceat(vectors[order], starts[filled], axis=0)
+        centroids = _normalize(centroids)
+    return centroids, assignment
+
+
+class VectorCollection:
+    """
+    Embeddings of one record kind under <canon_dir>/vectors/<kind>/.
+
+    embeddings.npy rows are grouped by IVF list (offsets.npy gives each list's
+    row range) and opened with mmap_mode='r'; seqs.npy maps rows back to store
+    row numbers.
+    """
+
+    def __init__(self, directory: Path, encoder, ivf_min_records: int = IVF_MIN_RECORDS):
+        self.directory = Path(directory)
+        self.encoder = encoder
+        self.ivf_min_records = ivf_min_records
+        self.embeddings: Optional[np.ndarray] = None
+        self.seqs = self.centroids = self.offsets = None
+
+    def meta_path(self) -> Path:
+        return self.directory / 'meta.json'
+
+    def load(self, signature: str) -> bool:
+        """Open the saved collection if it was built for this signature."""
+        if not self.meta_path().exists():
+            return False
+        with open(self.meta_path(), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('signature') != signature:
+            return False
+        self.encoder.load_state(meta['encoder_state'])
+        self.embeddings = np.load(self.directory / 'embeddings.npy', mmap_mode='r')
+        self.seqs = np.load(self.directory / 'seqs.npy')
+        self.centroids = np.load(self.directory / 'centroids.npy')
+        self.offsets = np.load(self.directory / 'offsets.npy')
+        return True
+
+    def build(self, records: List[Tuple[int, str]], signature: str):
+        """Embed (seq, text) records, cluster them and write the collection."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        texts = [text for _, text in records]
+        self.encoder.fit(texts)
+        vectors = self.encoder.encode(texts) if texts else np.zeros((0, self.encoder.dim), np.float32)
+        seqs = np.asarray([seq for seq, _ in records], dtype=np.int64)
+
+        nlist = int(np.sqrt(len(vectors))) if len(vectors) >= self.ivf_min_records else 1
+        if nlist > 1:
+            centroids, assignment = kmeans(vectors, nlist)
+        else:
+            centroids = np.zeros((1, self.encoder.dim), dtype=np.float32)
+            assignment = np.zeros(len(vectors), dtype=np.int64)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.searchsorted(assignment[order], np.arange(nlist + 1))
+
+        _save_npy(self.directory / 'embeddings.npy', vectors[order].astype(np.float32))
+        _save_npy(self.directory / 'seqs.npy', seqs[order])
+        _save_npy(self.directory / 'centroids.npy', centroids.astype(np.float32))
+        _save_npy(self.directory / 'offsets.npy', offsets.astype(np.int64))
+        tmp_path = self.meta_path().with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'signature': signature, 'records': len(seqs), 'nlist': nlist,
+                       'encoder_state': self.encoder.state()}, f)
+        os.replace(tmp_path, self.meta_path())
+        self.load(signature)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.offsets) - 1
+
+    def default_nprobe(self) -> int:
+        """NPROBE_FRACTION of the IVF lists, at least MIN_NPROBE."""
+        return max(MIN_NPROBE, math.ceil(NPROBE_FRACTION * self.nlist))
+
+    def search(self, query_vector: np.ndarray, k: int, nprobe: Optional[int] = None,
+               ) -> List[Tuple[float, int]]:
+        """
+        Top-k (cosine, seq) pairs. Only the nprobe lists with the closest
+        centroids are scanned; nprobe=None scans everything.
+        """
+        if self.embeddings is None or not len(self.seqs) or k <= 0:
+            return []
+        if nprobe is None or nprobe >= self.nlist:
+            ranges = [(0, len(self.seqs))]
+        else:
+            lists = np.argpartition(-(self.centroids @ query_vector), nprobe - 1)[:nprobe]
+            ranges = [(self.offsets[i], self.offsets[i + 1]) for i in lists]
+        # Lists are contiguous row ranges, so each is scored on a memmap view
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        scores = np.concatenate([np.asarray(self.embeddings[start:end] @ query_vector)
+                                 for start, end in ranges])
+        return self._top(rows, scores, k)
+
+    def search_batch(self, query_vectors: np.ndarray, k: int, nprobe: Optional[int] = None,
+                     ) -> List[List[Tuple[float, int]]]:
+        """search() for a matrix of query vectors; exact search is one matrix product."""
+        if self.embeddings is None or not len(self.seqs) or k <= 0:
+            return [[] for _ in query_vectors]
+        if nprobe is not None and nprobe < self.nlist:
+            return [self.search(vector, k, nprobe) for vector in query_vectors]
+        scores = np.asarray(self.embeddings @ query_vectors.T)
+        rows = np.arange(len(self.seqs))
+        return [self._top(rows, scores[:, i], k) for i in range(len(query_vectors))]
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[float, int]]:
+        if not len(rows):
+            return []
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        top = top[np.lexsort((self.seqs[rows[top]], -scores[top]))]
+        return [(float(scores[i]), int(self.seqs[rows[i]])) for i in top]
+
+
+class VectorIndex:
+    """
+    Dense retrieval over the claims and equations of a CanonStore.
+
+    Collections of ivf_min_records or more records are split into sqrt(n) IVF
+    lists. A query scans nprobe of them (by default NPROBE_FRACTION of the
+    lists, at least MIN_NPROBE), so recall against exact search stays roughly
+    constant as the canon grows while the rows scanned shrink to about a
+    tenth. Smaller collections are always searched exactly.
+    """
+
+    KINDS = ('claim', 'equation')
+
+    def __init__(self, store: CanonStore, model_name: Optional[str] = None,
+                 nprobe: Optional[int] = None, ivf_min_records: int = IVF_MIN_RECORDS):
+        """
+        Args:
+            store: Canon store to index
+            model_name: Local sentence-transformers model (default: hashing TF-IDF)
+            nprobe: IVF lists scanned per query (None: scaled with each collection's list count)
+            ivf_min_records: Smallest collection that gets an IVF index
+        """
+        self.store = store
+        self.model_name = model_name
+        self.nprobe = nprobe
+        self.ivf_min_records = ivf_min_records
+        self.collections: Dict[str, VectorCollection] = {}
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Rebuild collections whose store generation or encoder changed (returns True if any was rebuilt)."""
+        rebuilt = False
+        model_encoder = make_encoder(self.model_name)
+        for kind in self.KINDS:
+            # Hashing encoders carry per-collection IDF weights; models are shared
+            encoder = (HashingEncoder(model_encoder.dim) if isinstance(model_encoder, HashingEncoder)
+                       else model_encoder)
+            collection = VectorCollection(self.store.canon_dir / VECTORS_DIR / kind, encoder,
+                                          self.ivf_min_records)
+            signature = f"{VECTORS_VERSION}:{self.store.generation}:{encoder.name}:{self.ivf_min_records}"
+            if not collection.load(signature):
+                collection.build([(seq, record_text(kind, record))
+                                  for seq, record in self.store.iter_records(kind)], signature)
+                rebuilt = True
+            self.collections[kind] = collection
+        return rebuilt
+
+    def search(self, query: str, k: int = 10, kind: Optional[str] = 'claim',
+               nprobe: Optional[int] = None, exact: bool = False) -> List[Tuple[float, int]]:
+        """
+        Top-k (cosine, seq) pairs for a query, best first.
+
+        Args:
+            query: Free-text query
+            k: Number of results
+            kind: 'claim', 'equation', or None for both
+            nprobe: IVF lists to scan (default: the index's nprobe)
+            exact: Scan every list
+        """
+        return self.search_batch([query], k, kind, nprobe, exact)[0]
+
+    def search_batch(self, queries: Sequence[str], k: int = 10, kind: Optional[str] = 'claim',
+                     nprobe: Optional[int] = None, exact: bool = False) -> List[List[Tuple[float, int]]]:
+        """search() for several queries, encoded together."""
+        results: List[List[Tuple[float, int]]] = [[] for _ in queries]
+        if not queries:
+            return results
+        for kind_name in (self.KINDS if kind is None else (kind,)):
+            collection = self.collections[kind_name]
+            probe = None if exact else nprobe or self.nprobe or collection.default_nprobe()
+            vectors = collection.encoder.encode(list(queries))
+            # Queries with nothing to match on (e.g. only stopwords) get no hits
+            matchable = np.flatnonzero(vectors.any(axis=1))
+            for i, hits in zip(matchable, collection.search_batch(vectors[matchable], k, probe)):
+                results[i].extend(hits)
+        for hits in results:
+            hits.sort(key=lambda hit: (-hit[0], hit[1]))
+            del hits[k:]
+        return results
+
+    def search_records(self, query: str, k: int = 10, kind: Optional[str] = 'claim') -> List[Dict]:
+        """Records of the top-k hits, best first."""
+        return self.store.get_by_seq([seq for _, seq in self.search(query, k, kind)])
+
+
+def _min_max(hits: List[Tuple[float, int]]) -> Dict[int, float]:
+    if not hits:
+        return {}
+    low = min(score for score, _ in hits)
+    span = max(score for score, _ in hits) - low
+    return {seq: (score - low) / span if span else 1.0 for score, seq in hits}
+
+
+class HybridRetriever:
+    """
+    BM25 and vector retrieval fused as alpha * vector + (1 - alpha) * BM25,
+    each min-max normalised over its own candidates.
+    """
+
+    def __init__(self, bm25: BM25Index, vectors: VectorIndex, alpha: float = DEFAULT_ALPHA,
+                 candidates: int = 4):
+        self.bm25 = bm25
+        self.vectors = vectors
+        self.alpha = alpha
+        # Each retriever contributes candidates * k hits before fusion
+        self.candidates = candidates
+        self.store = bm25.store
+
+    def search(self, query: str, k: int = 10, kind: Optional[str] = 'claim') -> List[Tuple[float, int]]:
+        return self.search_batch([query], k, kind)[0]
+
+    def search_batch(self, queries: Sequence[str], k: int = 10,
+                     kind: Optional[str] = 'claim') -> List[List[Tuple[float, int]]]:
+        depth = k * self.candidates
+        results = []
+        for lexical_hits, dense_hits in zip(self.bm25.search_batch(queries, depth, kind),
+                                            self.vectors.search_batch(queries, depth, kind)):
+            lexical, dense = _min_max(lexical_hits), _min_max(dense_hits)
+            fused = {seq: self.alpha * dense.get(seq, 0.0) + (1 - self.alpha) * lexical.get(seq, 0.0)
+                     for seq in {**lexical, **dense}}
+            ranked = sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:k]
+            results.append([(score, seq) for seq, score in ranked])
+        return results
+
+    def search_records(self, query: str, k: int = 10, kind: Optional[str] = 'claim') -> List[Dict]:
+        return self.store.get_by_seq([seq for _, seq in self.search(query, k, kind)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense and hybrid search over the Zora canon")
+    parser.add_argument("--canon-dir", required=True, help="Canon directory (or canon_ingest output directory)")
+    parser.add_argument("--model", help="Local sentence-transformers model (default: hashing TF-IDF)")
+    parser.add_argument("--mode", choices=['dense', 'hybrid'], default='hybrid')
+    parser.add_argument("--kind", choices=['claim', 'equation', 'all'], default='claim')
+    parser.add_argument("-k", type=int, default=10, help="Number of results")
+    parser.add_argument("query", nargs='?', help="Query (omit to just build the index)")
+    args = parser.parse_args()
+
+    store = CanonStore(Path(args.canon_dir))
+    vectors = VectorIndex(store, args.model)
+    if not args.query:
+        print(f"✓ Vector index up to date in {store.canon_dir / VECTORS_DIR}")
+        return
+    retriever = HybridRetriever(BM25Index(store), vectors) if args.mode == 'hybrid' else vectors
+    hits = retriever.search(args.query, args.k, None if args.kind == 'all' else args.kind)
+    for (score, _), record in zip(hits, store.get_by_seq([seq for _, seq in hits])):
+        kind = 'equation' if 'equation_id' in record else 'claim'
+        print(f"{score:7.3f}  {record[kind + '_id']}  {record_text(kind, record)[:100]}")
+
+
+if __name__ == '__main__':
+    main()
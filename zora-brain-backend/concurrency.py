@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Request Concurrency Limits
+Admission control for the Zora Brain API: at most max_active requests run at
+once, at most max_waiting queue behind them, and the rest are rejected. Queue
+depth and throughput counters are exposed as metrics.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+
+class QueueFull(Exception):
+    """Raised when a request arrives while the wait queue is full."""
+
+
+class ConcurrencyLimiter:
+    """Asyncio semaphore with a bounded wait queue and counters."""
+
+    def __init__(self, max_active: int = 4, max_waiting: Optional[int] = 64):
+        """
+        Args:
+            max_active: Requests allowed to run at once
+            max_waiting: Requests allowed to wait for a slot (None: unbounded)
+        """
+        if max_active < 1:
+            raise ValueError("max_active must be at least 1")
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self._semaphore = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        """
+        Wait for a slot.
+
+        Raises:
+            QueueFull: if max_waiting requests are already waiting
+        """
+        if self._semaphore.locked() and self.max_waiting is not None and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise QueueFull(f"{self.waiting} requests already waiting")
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self) -> Dict[str, Optional[int]]:
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_active': self.max_active,
+            'max_waiting': self.max_waiting,
+            'peak_waiting': self.peak_waiting,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Ollama Client
+Async client for the Ollama REST API (/api/generate) over one pooled
+keep-alive httpx session, with token streaming and per-request timeouts.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_MAX_CONNECTIONS = 16
+
+
+class OllamaError(Exception):
+    """The Ollama server could not be reached, timed out or returned an error."""
+
+
+class OllamaClient:
+    """
+    Generation client for one Ollama model.
+
+    The underlying httpx.AsyncClient is created on first use (inside the
+    running event loop) and reused, so requests share warm connections.
+    """
+
+    def __init__(self, model: str, base_url: str = DEFAULT_BASE_URL,
+                 timeout: float = DEFAULT_TIMEOUT, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        """
+        Args:
+            model: Ollama model name (e.g. gpt-oss:20b)
+            base_url: Ollama server URL (http:// is assumed if no scheme is given)
+            timeout: Default seconds allowed for a whole generation
+            connect_timeout: Seconds allowed to open a connection
+            max_connections: Size of the connection pool
+        """
+        self.model = model
+        # OLLAMA_HOST is often given as host:port
+        self.base_url = (base_url if '://' in base_url else f"http://{base_url}").rstrip('/')
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections))
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Yield response tokens as the model produces them.
+
+        Args:
+            prompt: Prompt to send to the model
+            timeout: Seconds allowed for each read, i.e. until the first token and
+                between tokens (default: the client timeout)
+
+        Raises:
+            OllamaError: on connection failures, timeouts and error responses
+        """
+        request_timeout = httpx.Timeout(timeout or self.timeout, connect=self.connect_timeout)
+        payload = {'model': self.model, 'prompt': prompt, 'stream': True}
+        try:
+            async with self.client.stream('POST', '/api/generate', json=payload,
+                                          timeout=request_timeout) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode('utf-8', 'replace')
+                    raise OllamaError(f"Ollama returned {response.status_code}: {body.strip()}")
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise OllamaError(chunk['error'])
+                    if chunk.get('response'):
+                        yield chunk['response']
+        except httpx.TimeoutException as e:
+            raise OllamaError("Model response timeout") from e
+        except httpx.HTTPError as e:
+            raise OllamaError(f"Cannot reach Ollama at {self.base_url}: {e}") from e
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        The full response text.
+
+        Args:
+            prompt: Prompt to send to the model
+            timeout: Seconds allowed for the whole generation (default: the client timeout)
+
+        Raises:
+            OllamaError: as stream, and when the generation runs past timeout
+        """
+        timeout = timeout or self.timeout
+
+        async def collect():
+            return "".join([token async for token in self.stream(prompt, timeout)])
+
+        try:
+            return await asyncio.wait_for(collect(), timeout)
+        except asyncio.TimeoutError as e:
+            raise OllamaError("Model response timeout") from e
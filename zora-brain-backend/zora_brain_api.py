@@ -4,16 +4,43 @@ Zora Brain Backend API
 Server-side service with gpt-oss-20b (Ollama), RAG over canon, citation checking, and confidence tagging.
 """
 
+import asyncio
 import json
 import os
-import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-app = FastAPI(title="Zora Brain API", version="1.0.0")
+sys.path.insert(0, str(Path(__file__).parent))
+
+from answer_cache import CACHE_NAME, DEFAULT_MAX_ENTRIES, DEFAULT_TTL, AnswerCache
+from batching import BatchScheduler
+from canon_search import BM25Index, records_for_hits
+from canon_store import CanonStore
+from concurrency import ConcurrencyLimiter, QueueFull
+from ollama_client import DEFAULT_BASE_URL, DEFAULT_TIMEOUT, OllamaClient, OllamaError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the canon and build its indexes in the background at startup; close the
+    pooled Ollama connections and worker threads on shutdown.
+    """
+    warm_up = asyncio.create_task(zora_brain.run_blocking(lambda: zora_brain.retriever))
+    yield
+    warm_up.cancel()
+    await zora_brain.aclose()
+
+
+app = FastAPI(title="Zora Brain API", version="1.0.0", lifespan=lifespan)
 
 
 class QueryRequest(BaseModel):
@@ -22,6 +49,7 @@ class QueryRequest(BaseModel):
     context: Optional[str] = Field(None, description="Additional context")
     max_citations: int = Field(5, description="Maximum number of citations to return")
     require_citations: bool = Field(True, description="Require citations in response")
+    timeout: Optional[float] = Field(None, gt=0, description="Seconds allowed for the generation")
 
 
 class Citation(BaseModel):
@@ -47,111 +75,190 @@ class QueryResponse(BaseModel):
 class ZoraBrain:
     """Zora Brain service with RAG and citation checking."""
     
-    def __init__(self, canon_dir: Path, ollama_model: str = "gpt-oss:20b"):
+    RETRIEVAL_MODES = ('bm25', 'dense', 'hybrid')
+    
+    def __init__(self, canon_dir: Path, ollama_model: str = "gpt-oss:20b",
+                 retrieval: str = "bm25", embedding_model: Optional[str] = None,
+                 ollama_url: str = DEFAULT_BASE_URL, timeout: float = DEFAULT_TIMEOUT,
+                 max_concurrent: int = 32, max_waiting: Optional[int] = 64,
+                 retrieval_workers: int = 4, answer_cache: bool = True,
+                 cache_size: int = DEFAULT_MAX_ENTRIES, cache_ttl: Optional[float] = DEFAULT_TTL,
+                 cache_similarity: Optional[float] = None, batch_window: float = 0.01,
+                 max_batch: int = 16, generation_concurrency: int = 4):
         """
         Initialize Zora Brain.
         
         Args:
             canon_dir: Directory containing canon data (claims, equations, definitions)
             ollama_model: Ollama model name
+            retrieval: 'bm25', 'dense' (vector search) or 'hybrid' (both, fused)
+            embedding_model: Local sentence-transformers model for dense retrieval
+                (default: hashing TF-IDF vectors)
+            ollama_url: Ollama server URL
+            timeout: Default seconds allowed for a generation
+            max_concurrent: Queries processed at once
+            max_waiting: Queries allowed to wait for a slot before new ones are
+                rejected (None: unbounded)
+            retrieval_workers: Threads running retrieval off the event loop
+            answer_cache: Cache responses in <canon_dir>/answer_cache.sqlite3
+            cache_size: Cached responses kept (least recently used go first)
+            cache_ttl: Seconds a cached response stays valid (None: until the canon changes)
+            cache_similarity: Reuse answers to questions at least this similar
+                (cosine of hashed question vectors; None: exact matches only)
+            batch_window: Seconds /query waits to batch concurrent requests
+            max_batch: Largest /query batch
+            generation_concurrency: Generations sent to Ollama at once by /query
         """
+        if retrieval not in self.RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
         self.canon_dir = Path(canon_dir)
         self.ollama_model = ollama_model
-        self.canon_cache: Dict = {}
-        self._load_canon()
+        self.ollama = OllamaClient(ollama_model, base_url=ollama_url, timeout=timeout)
+        self.retrieval = retrieval
+        self.embedding_model = embedding_model
+        self.limiter = ConcurrencyLimiter(max_concurrent, max_waiting)
+        self._executor = ThreadPoolExecutor(max_workers=retrieval_workers,
+                                            thread_name_prefix='zora-retrieval')
+        # Answer cache lookups get their own threads so they never queue behind retrieval
+        self._cache_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='zora-cache')
+        # One lock per lazily opened object: a first use waits only for the
+        # build it needs, and readers of already-open objects take no lock
+        self._build_locks = {name: threading.Lock()
+                             for name in ('_store', '_search_index', '_retriever', '_answer_cache')}
+        self.use_answer_cache = answer_cache
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.cache_similarity = cache_similarity
+        self._answer_cache: Optional[AnswerCache] = None
+        self.scheduler = BatchScheduler(self, batch_window, max_batch, generation_concurrency)
+        self._store: Optional[CanonStore] = None
+        self._search_index: Optional[BM25Index] = None
+        self._retriever = None
+        self.canon_entries: Optional[int] = None
     
-    def _load_canon(self):
-        """Load canon data from files."""
-        # Load claims
-        claims_dir = self.canon_dir / "claims"
-        if claims_dir.exists():
-            for claim_file in claims_dir.glob("*.json"):
-                with open(claim_file, 'r') as f:
-                    claim_data = json.load(f)
-                    claim_id = claim_data.get('claim_id', claim_file.stem)
-                    self.canon_cache[claim_id] = claim_data
-        
-        # Load equations
-        equations_dir = self.canon_dir / "equations"
-        if equations_dir.exists():
-            for eq_file in equations_dir.glob("*.json"):
-                with open(eq_file, 'r') as f:
-                    eq_data = json.load(f)
-                    eq_id = eq_data.get('equation_id', eq_file.stem)
-                    self.canon_cache[eq_id] = eq_data
+    def _open(self, name: str, build):
+        """The object in attribute name, built on first use (at most once)."""
+        value = getattr(self, name)
+        if value is None:
+            with self._build_locks[name]:
+                value = getattr(self, name)
+                if value is None:
+                    value = build()
+                    setattr(self, name, value)
+        return value
+    
+    @property
+    def canon_cache(self) -> CanonStore:
+        """
+        Canon records by claim_id / equation_id.
+
+        Opened on first use; the store re-packs only canon files changed since
+        the last start and decodes record bodies on access. canon_entries
+        holds its record count from then on.
+        """
+        def build():
+            store = CanonStore(self.canon_dir)
+            self.canon_entries = len(store)
+            return store
+        return self._open('_store', build)
+
+    @property
+    def search_index(self) -> BM25Index:
+        """BM25 index over the canon store, rebuilt only when the canon changed."""
+        return self._open('_search_index', lambda: BM25Index(self.canon_cache))
+
+    @property
+    def retriever(self):
+        """The configured retriever (BM25, vector or hybrid), built on first use."""
+        def build():
+            if self.retrieval == 'bm25':
+                return self.search_index
+            # The vector index is only loaded for dense retrieval
+            from canon_vectors import HybridRetriever, VectorIndex
+            vectors = VectorIndex(self.canon_cache, self.embedding_model)
+            return vectors if self.retrieval == 'dense' else HybridRetriever(self.search_index, vectors)
+        return self._open('_retriever', build)
+
+    @property
+    def answer_cache(self) -> Optional[AnswerCache]:
+        """Response cache next to the canon store (None if disabled)."""
+        if not self.use_answer_cache:
+            return None
+
+        def build():
+            encoder = None
+            if self.cache_similarity is not None:
+                from canon_vectors import HashingEncoder
+                encoder = HashingEncoder()
+            # Answers from another model or retrieval setup are not reused
+            generator = json.dumps([self.ollama_model, self.retrieval, self.embedding_model])
+            return AnswerCache(self.canon_cache.canon_dir / CACHE_NAME, self.cache_size,
+                               self.cache_ttl, self.cache_similarity, encoder, generator)
+        return self._open('_answer_cache', build)
+
+    def _cached_response(self, question: str, context: Optional[str],
+                         max_citations: int) -> Optional[QueryResponse]:
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.get(question, context, max_citations, self.canon_cache.content_hash())
+        return QueryResponse(**cached) if cached is not None else None
+
+    def _cache_response(self, question: str, context: Optional[str], max_citations: int,
+                        response: QueryResponse):
+        if self.answer_cache is not None:
+            self.answer_cache.put(question, context, max_citations, self.canon_cache.content_hash(),
+                                  response.model_dump())
+
+    async def cached_response(self, question: str, context: Optional[str] = None,
+                              max_citations: int = 5) -> Optional[QueryResponse]:
+        """The cached response to this question for the current canon, or None."""
+        return await self._run_on_cache_threads(self._cached_response, question, context, max_citations)
+
+    async def cache_response(self, question: str, context: Optional[str], max_citations: int,
+                             response: QueryResponse):
+        await self._run_on_cache_threads(self._cache_response, question, context, max_citations, response)
+
+    async def cache_metrics(self) -> Optional[Dict[str, int]]:
+        """Answer cache counters (None if the cache is disabled or not opened yet)."""
+        if self._answer_cache is None:
+            return None
+        return await self._run_on_cache_threads(self._answer_cache.metrics)
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking call (SQLite, index builds, numpy) on the retrieval threads."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _run_on_cache_threads(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._cache_executor, func, *args)
+
+    async def aclose(self):
+        await self.scheduler.aclose()
+        await self.ollama.aclose()
+        self._executor.shutdown(wait=False)
+        self._cache_executor.shutdown(wait=False)
     
     def _retrieve_relevant_claims(self, question: str, max_results: int = 10) -> List[Dict]:
         """
-        Simple keyword-based retrieval (can be upgraded to vector search).
+        Retrieve claims with the configured retriever (BM25 by default).
         
         Args:
             question: User question
             max_results: Maximum number of results
         
         Returns:
-            List of relevant claim dictionaries
+            List of relevant claim dictionaries, best match first
         """
-        question_lower = question.lower()
-        keywords = question_lower.split()
-        
-        relevant = []
-        for claim_id, claim_data in self.canon_cache.items():
-            if 'statement' in claim_data:
-                statement = claim_data['statement'].lower()
-                score = sum(1 for kw in keywords if kw in statement)
-                if score > 0:
-                    relevant.append((score, claim_data))
-        
-        # Sort by relevance score
-        relevant.sort(key=lambda x: x[0], reverse=True)
-        return [claim for _, claim in relevant[:max_results]]
+        return self.retriever.search_records(question, k=max_results, kind='claim')
     
-    def _query_ollama(self, prompt: str) -> str:
-        """
-        Query Ollama model.
-        
-        Args:
-            prompt: Prompt to send to model
-        
-        Returns:
-            Model response
-        """
-        try:
-            # Use Ollama API via subprocess (can be upgraded to HTTP API)
-            cmd = ['ollama', 'run', self.ollama_model, prompt]
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120,
-                check=True
-            )
-            return result.stdout.strip()
-        except subprocess.TimeoutExpired:
-            return "Error: Model response timeout"
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e.stderr}"
-        except FileNotFoundError:
-            return "Error: Ollama not found. Please install Ollama and ensure 'ollama' is in PATH."
+    def _retrieve_batch(self, questions: List[str], max_results: List[int]) -> List[List[Dict]]:
+        """_retrieve_relevant_claims for several questions in one retriever pass."""
+        hit_lists = self.retriever.search_batch(questions, k=max(max_results, default=0), kind='claim')
+        claims = records_for_hits(self.canon_cache, hit_lists)
+        return [found[:k] for found, k in zip(claims, max_results)]
     
-    def query(self, question: str, context: Optional[str] = None, 
-              max_citations: int = 5, require_citations: bool = True) -> QueryResponse:
-        """
-        Process a query with RAG and citation checking.
-        
-        Args:
-            question: User question
-            context: Additional context
-            max_citations: Maximum citations to return
-            require_citations: Whether to require citations
-        
-        Returns:
-            QueryResponse with answer and citations
-        """
-        # Retrieve relevant canon entries
-        relevant_claims = self._retrieve_relevant_claims(question, max_results=max_citations * 2)
-        
-        # Build RAG prompt
+    def _build_prompt(self, question: str, context: Optional[str],
+                      relevant_claims: List[Dict], max_citations: int) -> str:
+        """RAG prompt with the top retrieved claims."""
         canon_context = ""
         if relevant_claims:
             canon_context = "\n\nRelevant claims from Zora Canon:\n"
@@ -159,7 +266,6 @@ class ZoraBrain:
                 canon_context += f"{i}. [{claim.get('claim_type', 'Unknown')}] {claim.get('statement', '')}\n"
                 canon_context += f"   Source: {claim.get('source_document', 'Unknown')} - {claim.get('source_section', 'Unknown')}\n"
         
-        # Build full prompt
         prompt = f"""You are Zora, an AI assistant grounded in the MQGT-SCF Theory of Everything.
 
 {canon_context}
@@ -172,16 +278,15 @@ User Question: {question}
         prompt += """
 Please provide a clear, accurate answer based on the canon claims above. If you reference specific claims, cite them by number.
 """
-        
-        # Query model
-        answer = self._query_ollama(prompt)
-        
-        # Extract citations from answer
+        return prompt
+    
+    def _build_response(self, answer: str, relevant_claims: List[Dict],
+                        max_citations: int) -> QueryResponse:
+        """Match citations in the answer to the retrieved claims."""
         citations = []
         claim_types = set()
         confidence = 0.7  # Default confidence
         
-        # Match citations in answer to relevant claims
         for claim in relevant_claims[:max_citations]:
             if claim.get('statement', '').lower() in answer.lower():
                 citations.append(Citation(
@@ -203,11 +308,96 @@ Please provide a clear, accurate answer based on the canon claims above. If you
             claim_types=list(claim_types),
             model_used=self.ollama_model
         )
+    
+    async def query(self, question: str, context: Optional[str] = None, 
+                    max_citations: int = 5, require_citations: bool = True,
+                    timeout: Optional[float] = None, check_cache: bool = True) -> QueryResponse:
+        """
+        Process a query with RAG and citation checking.
+        
+        Args:
+            question: User question
+            context: Additional context
+            max_citations: Maximum citations to return
+            require_citations: Whether to require citations
+            timeout: Seconds allowed for the generation
+            check_cache: Look the question up in the answer cache first (new
+                answers are cached either way)
+        
+        Returns:
+            QueryResponse with answer and citations
+        """
+        cached = await self.cached_response(question, context, max_citations) if check_cache else None
+        if cached is not None:
+            return cached
+        relevant_claims = await self.run_blocking(self._retrieve_relevant_claims, question, max_citations * 2)
+        return await self._answer(question, context, max_citations, relevant_claims, timeout)
+    
+    async def _answer(self, question: str, context: Optional[str], max_citations: int,
+                      relevant_claims: List[Dict], timeout: Optional[float] = None) -> QueryResponse:
+        """Generate, check citations and cache the answer for retrieved claims."""
+        prompt = self._build_prompt(question, context, relevant_claims, max_citations)
+        try:
+            answer = (await self.ollama.generate(prompt, timeout)).strip()
+        except OllamaError as e:
+            return self._build_response(f"Error: {e}", relevant_claims, max_citations)
+        response = self._build_response(answer, relevant_claims, max_citations)
+        await self.cache_response(question, context, max_citations, response)
+        return response
+    
+    async def query_stream(self, question: str, context: Optional[str] = None,
+                           max_citations: int = 5, timeout: Optional[float] = None,
+                           check_cache: bool = True) -> AsyncIterator[Dict]:
+        """
+        Process a query, yielding the answer as it is generated.
+        
+        Yields {'token': ...} events, then one final event holding the
+        QueryResponse fields with 'done': True (or {'error': ...} if the model
+        fails). A cached answer arrives as a single token.
+        """
+        cached = await self.cached_response(question, context, max_citations) if check_cache else None
+        if cached is not None:
+            yield {'token': cached.answer}
+            yield {**cached.model_dump(), 'done': True}
+            return
+        relevant_claims = await self.run_blocking(self._retrieve_relevant_claims, question, max_citations * 2)
+        prompt = self._build_prompt(question, context, relevant_claims, max_citations)
+        tokens = []
+        try:
+            async for token in self.ollama.stream(prompt, timeout):
+                tokens.append(token)
+                yield {'token': token}
+        except OllamaError as e:
+            yield {'error': str(e), 'done': True}
+            return
+        response = self._build_response("".join(tokens).strip(), relevant_claims, max_citations)
+        await self.cache_response(question, context, max_citations, response)
+        yield {**response.model_dump(), 'done': True}
 
 
 # Initialize Zora Brain
 CANON_DIR = Path(os.getenv('ZORA_CANON_DIR', '../canon'))
-zora_brain = ZoraBrain(canon_dir=CANON_DIR)
+zora_brain = ZoraBrain(
+    canon_dir=CANON_DIR,
+    retrieval=os.getenv('ZORA_RETRIEVAL', 'bm25'),
+    embedding_model=os.getenv('ZORA_EMBEDDING_MODEL'),
+    ollama_url=os.getenv('OLLAMA_HOST', DEFAULT_BASE_URL),
+    timeout=float(os.getenv('ZORA_TIMEOUT', DEFAULT_TIMEOUT)),
+    max_concurrent=int(os.getenv('ZORA_MAX_CONCURRENT', 32)),
+    max_waiting=int(os.getenv('ZORA_MAX_WAITING', 64)),
+    retrieval_workers=int(os.getenv('ZORA_RETRIEVAL_WORKERS', 4)),
+    answer_cache=os.getenv('ZORA_ANSWER_CACHE', '1') != '0',
+    cache_size=int(os.getenv('ZORA_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+    cache_ttl=float(os.getenv('ZORA_CACHE_TTL', DEFAULT_TTL)),
+    cache_similarity=float(os.environ['ZORA_CACHE_SIMILARITY']) if os.getenv('ZORA_CACHE_SIMILARITY') else None,
+    batch_window=float(os.getenv('ZORA_BATCH_WINDOW_MS', 10)) / 1000,
+    max_batch=int(os.getenv('ZORA_MAX_BATCH', 16)),
+    generation_concurrency=int(os.getenv('ZORA_GENERATION_CONCURRENCY', 4))
+)
+
+
+def _queue_full(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=503, detail=f"Server busy: {e}", headers={"Retry-After": "1"})
 
 
 @app.get("/")
@@ -217,10 +407,9 @@ async def root():
         "service": "Zora Brain API",
         "version": "1.0.0",
         "model": zora_brain.ollama_model,
-        "canon_loaded": len(zora_brain.canon_cache) > 0
+        "canon_loaded": bool(zora_brain.canon_entries)
     }
 
-
 @app.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
     """
@@ -233,25 +422,94 @@ async def query(request: QueryRequest):
       -d '{"question": "What is the unified Lagrangian?"}'
     ```
     """
+    # Cached answers skip the queue
+    cached = await zora_brain.cached_response(request.question, request.context, request.max_citations)
+    if cached is not None:
+        return cached
     try:
-        response = zora_brain.query(
+        await zora_brain.limiter.acquire()
+    except QueueFull as e:
+        raise _queue_full(e)
+    try:
+        # Concurrent queries are retrieved as a batch, then generated in parallel
+        response = await zora_brain.scheduler.submit(
             question=request.question,
             context=request.context,
             max_citations=request.max_citations,
-            require_citations=request.require_citations
+            timeout=request.timeout
         )
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        zora_brain.limiter.release()
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """
+    Query Zora Brain, streaming the answer as newline-delimited JSON.
+    
+    Each line is {"token": "..."}; the last line carries the citations,
+    confidence and claim types with "done": true. The request holds a query
+    slot until the stream ends; cached answers are streamed without one.
+    
+    Example:
+    ```bash
+    curl -N -X POST http://localhost:8001/query/stream \\
+      -H "Content-Type: application/json" \\
+      -d '{"question": "What is the unified Lagrangian?"}'
+    ```
+    """
+    cached = await zora_brain.cached_response(request.question, request.context, request.max_citations)
+    if cached is not None:
+        lines = [{'token': cached.answer}, {**cached.model_dump(), 'done': True}]
+        return StreamingResponse((json.dumps(line, ensure_ascii=False) + "\n" for line in lines),
+                                 media_type="application/x-ndjson")
+    try:
+        await zora_brain.limiter.acquire()
+    except QueueFull as e:
+        raise _queue_full(e)
+    events = zora_brain.query_stream(
+        question=request.question,
+        context=request.context,
+        max_citations=request.max_citations,
+        timeout=request.timeout,
+        check_cache=False
+    )
+    
+    async def ndjson():
+        try:
+            async for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            zora_brain.limiter.release()
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
+    """Health check endpoint; never waits for the canon to open or for retrieval threads."""
     return {
         "status": "healthy",
-        "canon_entries": len(zora_brain.canon_cache),
-        "ollama_model": zora_brain.ollama_model
+        "canon_entries": zora_brain.canon_entries,
+        "ollama_model": zora_brain.ollama_model,
+        "queries": zora_brain.limiter.metrics(),
+        # Admitted /query requests are counted in queries.active while they
+        # wait inside the scheduler for retrieval or a model slot
+        "batching": zora_brain.scheduler.load(),
+        "answer_cache": await zora_brain.cache_metrics()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Query slots, answer cache, and /query batch sizes and per-stage latency histograms."""
+    return {
+        "queries": zora_brain.limiter.metrics(),
+        "answer_cache": await zora_brain.cache_metrics(),
+        "batching": zora_brain.scheduler.metrics()
     }
 
 